@@ -0,0 +1,79 @@
+"""Synthetic XML corpus for benchmarks."""
+
+import random
+from collections.abc import Iterator
+from typing import NamedTuple
+
+
+class DocumentShape(NamedTuple):
+    """The shape of synthetic documents.
+
+    Attributes:
+        name (str): The name of the shape, used in benchmark results.
+        records (int): Number of record elements below the root.
+        depth (int): Nesting depth of every record.
+        text_length (int): Length of the text content of every leaf.
+    """
+
+    name: str
+    records: int
+    depth: int
+    text_length: int
+
+
+SHAPES = {
+    "small-shallow": DocumentShape("small-shallow", records=10, depth=1, text_length=20),
+    "small-deep": DocumentShape("small-deep", records=2, depth=40, text_length=20),
+    "medium-shallow": DocumentShape("medium-shallow", records=500, depth=2, text_length=40),
+    "medium-deep": DocumentShape("medium-deep", records=50, depth=60, text_length=40),
+    "large-shallow": DocumentShape("large-shallow", records=20_000, depth=2, text_length=60),
+    "huge-shallow": DocumentShape("huge-shallow", records=200_000, depth=2, text_length=60),
+}
+
+_WORDS = ["ductus", "saxon", "stylesheet", "record", "pipeline", "value", "node", "tree"]
+
+
+def generate_document(shape: DocumentShape, seed: int = 0) -> str:
+    """Generate a synthetic XML document.
+
+    Args:
+        shape (DocumentShape): The shape of the document.
+        seed (int): The seed for the generated text, so documents are reproducible.
+
+    Returns:
+        str: The XML document.
+    """
+    rng = random.Random(seed)
+    parts = ['<?xml version="1.0" encoding="UTF-8"?><corpus>']
+
+    for index in range(shape.records):
+        parts.append(f'<record id="r{index}" lang="{rng.choice(["de", "en", "fr"])}">')
+        parts.extend(f'<level n="{level}">' for level in range(shape.depth))
+        parts.append(f"<text>{_text(rng, shape.text_length)}</text>")
+        parts.extend("</level>" for _ in range(shape.depth))
+        parts.append("</record>")
+
+    parts.append("</corpus>")
+    return "".join(parts)
+
+
+def generate_corpus(shape: DocumentShape, documents: int, seed: int = 0) -> Iterator[str]:
+    """Generate a batch of synthetic XML documents.
+
+    Args:
+        shape (DocumentShape): The shape of the documents.
+        documents (int): The number of documents.
+        seed (int): The seed of the first document.
+
+    Yields:
+        str: The XML documents.
+    """
+    for index in range(documents):
+        yield generate_document(shape, seed=seed + index)
+
+
+def _text(rng: random.Random, length: int) -> str:
+    words: list[str] = []
+    while sum(len(word) + 1 for word in words) < length:
+        words.append(rng.choice(_WORDS))
+    return " ".join(words)
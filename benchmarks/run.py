@@ -0,0 +1,237 @@
+"""Benchmark XSL pipelines across document sizes, batch sizes and chain lengths.
+
+Every scenario runs in a fresh worker process, so compile times are cold and the
+peak RSS belongs to the scenario alone. Results are written as JSON and can be
+compared with an earlier run:
+
+    python benchmarks/run.py --output reports/benchmark.json
+    python benchmarks/run.py --quick --baseline reports/benchmark.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from datetime import UTC, datetime
+from importlib.metadata import version
+from pathlib import Path
+from typing import Any, NamedTuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from corpus import SHAPES, generate_corpus
+
+from py_ductus.instrumentation import MetricsCollector
+from py_ductus.main import process
+from py_ductus.steps.xsl import XSL, SaxonSession, XSLAtomicParam
+
+IDENTITY = """<xsl:stylesheet version="3.0" xmlns:xsl="http://www.w3.org/1999/XSL/Transform">
+  <xsl:mode on-no-match="shallow-copy"/>
+</xsl:stylesheet>"""
+
+ANNOTATE = """<xsl:stylesheet version="3.0" xmlns:xsl="http://www.w3.org/1999/XSL/Transform">
+  <xsl:param name="profile" select="'default'"/>
+  <xsl:mode on-no-match="shallow-copy"/>
+  <xsl:template match="record">
+    <xsl:copy>
+      <xsl:attribute name="profile" select="$profile"/>
+      <xsl:apply-templates select="@* | node()"/>
+    </xsl:copy>
+  </xsl:template>
+</xsl:stylesheet>"""
+
+
+class Scenario(NamedTuple):
+    """A benchmark scenario.
+
+    Attributes:
+        name (str): The name of the pipeline.
+        shape (str): The name of the document shape.
+        documents (int): The batch size.
+        chain_length (int): The number of XSL steps.
+        params (str): "none", "static" or "dynamic".
+    """
+
+    name: str
+    shape: str
+    documents: int
+    chain_length: int
+    params: str
+
+
+def build_steps(scenario: Scenario) -> list[XSL]:
+    """Build the XSL steps of a scenario.
+
+    Args:
+        scenario (Scenario): The scenario.
+
+    Returns:
+        list[XSL]: The steps.
+    """
+    if scenario.params == "static":
+        last = XSL(xslt=ANNOTATE, params=XSLAtomicParam(name="profile", value="static"))
+    elif scenario.params == "dynamic":
+        last = XSL(
+            xslt=ANNOTATE, dynamic_params=lambda: XSLAtomicParam(name="profile", value="dynamic")
+        )
+    else:
+        last = XSL(xslt=IDENTITY)
+
+    # Distinct stylesheet texts, so every step of a chain is compiled
+    chain = [XSL(xslt=IDENTITY + f"<!-- {index} -->") for index in range(scenario.chain_length - 1)]
+    return [*chain, last]
+
+
+def run_scenario(scenario: Scenario) -> dict[str, Any]:
+    """Run a scenario; meant to be called in a fresh worker process.
+
+    Args:
+        scenario (Scenario): The scenario.
+
+    Returns:
+        dict[str, Any]: The measurements.
+    """
+    documents = list(generate_corpus(SHAPES[scenario.shape], scenario.documents))
+    input_bytes = sum(len(document.encode("utf-8")) for document in documents)
+    steps = build_steps(scenario)
+    collector = MetricsCollector()
+
+    with SaxonSession() as session:
+        started = time.perf_counter()
+        session.executables([step.xslt for step in steps])
+        compile_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        process(documents, steps=steps, session=session, observer=collector)
+        wall_seconds = time.perf_counter() - started
+
+    phases: dict[str, float] = {}
+    for metrics in collector.steps.values():
+        for phase, seconds in metrics.phases.items():
+            phases[phase] = phases.get(phase, 0.0) + seconds
+
+    return {
+        **scenario._asdict(),
+        "input_bytes": input_bytes,
+        "compile_seconds": compile_seconds,
+        "wall_seconds": wall_seconds,
+        "transform_seconds_per_document": phases.get("transform", 0.0) / scenario.documents,
+        "parse_seconds_per_document": phases.get("parse", 0.0) / scenario.documents,
+        "documents_per_second": scenario.documents / wall_seconds,
+        "megabytes_per_second": input_bytes / wall_seconds / 1e6,
+        "peak_rss_megabytes": _peak_rss_megabytes(),
+    }
+
+
+def scenarios(quick: bool) -> list[Scenario]:
+    """Build the benchmark matrix.
+
+    Args:
+        quick (bool): Whether to run a small matrix, e.g. for a smoke test.
+
+    Returns:
+        list[Scenario]: The scenarios.
+    """
+    if quick:
+        shapes, batch_sizes, chain_lengths = ["small-shallow", "medium-deep"], [10], [1, 3]
+    else:
+        shapes, batch_sizes, chain_lengths = list(SHAPES), [1, 100, 1000], [1, 3, 5]
+
+    matrix: list[Scenario] = []
+    for shape in shapes:
+        # Keep the volume of the big shapes bounded
+        limit = 10 if shape.startswith(("large", "huge")) else max(batch_sizes)
+        for documents in sorted({min(size, limit) for size in batch_sizes}):
+            matrix.extend(
+                Scenario(f"chain-{length}", shape, documents, length, "none")
+                for length in chain_lengths
+            )
+            matrix.extend(
+                Scenario(f"{params}-params", shape, documents, 1, params)
+                for params in ("static", "dynamic")
+            )
+    return matrix
+
+
+def compare(results: list[dict[str, Any]], baseline: list[dict[str, Any]]) -> list[str]:
+    """Compare the throughput of two runs.
+
+    Args:
+        results (list[dict[str, Any]]): The current results.
+        baseline (list[dict[str, Any]]): The results of an earlier run.
+
+    Returns:
+        list[str]: A line per scenario present in both runs.
+    """
+    key: Callable[[dict[str, Any]], tuple[Any, ...]] = lambda result: tuple(  # noqa: E731
+        result[field] for field in Scenario._fields
+    )
+    earlier = {key(result): result for result in baseline}
+
+    lines = []
+    for result in results:
+        if (base := earlier.get(key(result))) is None:
+            continue
+        ratio = result["documents_per_second"] / base["documents_per_second"]
+        lines.append(
+            f"{result['name']:>16} {result['shape']:>15} {result['documents']:>6}: {ratio:6.2f}x"
+        )
+    return lines
+
+
+def main() -> None:
+    """Run the benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", type=Path, default=Path("reports/benchmark.json"))
+    parser.add_argument("--baseline", type=Path, help="An earlier result file to compare with.")
+    parser.add_argument("--quick", action="store_true", help="Run a small matrix only.")
+    args = parser.parse_args()
+
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for scenario in scenarios(args.quick):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            result = pool.submit(run_scenario, scenario).result()
+        results.append(result)
+        print(
+            f"{scenario.name:>16} {scenario.shape:>15} {scenario.documents:>6}: "
+            f"{result['documents_per_second']:10.1f} docs/s, "
+            f"compile {result['compile_seconds'] * 1000:7.1f} ms, "
+            f"peak {result['peak_rss_megabytes']:7.1f} MB"
+        )
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(
+        json.dumps(
+            {
+                "meta": {
+                    "created": datetime.now(tz=UTC).isoformat(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "saxonche": version("saxonche"),
+                    "py-ductus": version("py-ductus"),
+                },
+                "results": results,
+            },
+            indent=2,
+        )
+    )
+
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text())["results"]
+        print("\n".join(compare(results, baseline)))
+
+
+def _peak_rss_megabytes() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+if __name__ == "__main__":
+    main()
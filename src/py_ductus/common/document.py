@@ -0,0 +1,284 @@
+"""A document envelope, which carries the representations and metadata of a value through a pipeline."""
+
+import hashlib
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from py_ductus.common.encoding import Buffer, decode_xml
+
+if TYPE_CHECKING:
+    from saxonche import PySaxonProcessor, PyXdmNode
+
+
+class Document:
+    """A document, whose representations are derived lazily and at most once.
+
+    A document is created from text, a bytes-like buffer (e.g. a `memoryview` or
+    a memory-mapped file) or a file, and derives its other representations on
+    first access: the text, the encoded bytes, the parsed node of a Saxon
+    processor and a content hash. Bytes are decoded in the encoding declared by
+    the document, and files are parsed by Saxon itself. Steps which understand
+    documents (e.g. `XSL`) parse each document only once and return derived
+    documents, which keep the metadata of their input.
+
+    Attributes:
+        origin (str | None): Where the document comes from, e.g. the path of its file.
+        encoding (str): The encoding of the bytes of the document, unless they declare another.
+        metadata (dict[str, Any]): Arbitrary values attached to the document, e.g. by routing steps.
+        timings (dict[str, float]): The seconds spent by each step on the document.
+        error (Exception | None): The error of the last step which failed for the document.
+    """
+
+    __slots__ = (
+        "_data",
+        "_hash",
+        "_node",
+        "_node_processor",
+        "_path",
+        "_text",
+        "encoding",
+        "error",
+        "metadata",
+        "origin",
+        "timings",
+    )
+
+    origin: str | None
+    encoding: str
+    metadata: dict[str, Any]
+    timings: dict[str, float]
+    error: Exception | None
+
+    def __init__(  # noqa: PLR0913
+        self,
+        text: str | None = None,
+        data: Buffer | None = None,
+        *,
+        path: str | Path | None = None,
+        origin: str | None = None,
+        encoding: str = "utf-8",
+        metadata: dict[str, Any] | None = None,
+    ) -> None:
+        """Initialize a Document from its text, its bytes or its file.
+
+        Args:
+            text (str | None): The text of the document.
+            data (bytes | bytearray | memoryview | mmap | None): The encoded bytes of the document; buffers are not copied until `data` is accessed.
+            path (str | Path | None): The file of the document, which is read on first access.
+            origin (str | None): Where the document comes from; defaults to `path`.
+            encoding (str): The encoding of `data` without a byte order mark or XML declaration, and of the bytes derived from `text`.
+            metadata (dict[str, Any] | None): Values attached to the document.
+
+        Raises:
+            ValueError: When neither text, bytes nor a file are given.
+        """
+        if text is None and data is None and path is None:
+            raise ValueError("A document needs its text, its bytes or its file.")
+
+        self._text = text
+        self._data = data
+        self._path = Path(path) if path is not None else None
+        self._hash: str | None = None
+        self._node: PyXdmNode | None = None
+        self._node_processor: PySaxonProcessor | None = None
+        self.origin = origin if origin is not None or path is None else str(path)
+        self.encoding = encoding
+        self.metadata = metadata if metadata is not None else {}
+        self.timings = {}
+        self.error = None
+
+    @classmethod
+    def from_file(cls, path: str | Path, encoding: str = "utf-8") -> "Document":
+        """Create a document, whose file is read on first access.
+
+        Args:
+            path (str | Path): The path of the file.
+            encoding (str): The encoding of the file.
+
+        Returns:
+            Document: The document, with the path as its origin.
+        """
+        return cls(path=path, encoding=encoding)
+
+    @property
+    def text(self) -> str:
+        """The text of the document.
+
+        Returns:
+            str: The text, decoded from the bytes in their declared encoding on first access.
+        """
+        if self._text is None:
+            self._text = decode_xml(
+                self._data if self._data is not None else self.data, default=self.encoding
+            )
+        return self._text
+
+    @property
+    def data(self) -> bytes:
+        """The bytes of the document.
+
+        Returns:
+            bytes: The bytes, read from the file or encoded from the text on first access.
+        """
+        if self._data is None:
+            if self._path is not None:
+                self._data = self._path.read_bytes()
+            else:
+                self._data = self.text.encode(self.encoding)
+        elif not isinstance(self._data, bytes):
+            self._data = bytes(self._data)
+        return self._data
+
+    @property
+    def content_hash(self) -> str:
+        """The SHA-256 hash of the bytes of the document.
+
+        Returns:
+            str: The hex digest, computed on first access.
+        """
+        if self._hash is None:
+            # Buffers are hashed in place
+            self._hash = hashlib.sha256(
+                self._data if self._data is not None else self.data
+            ).hexdigest()
+        return self._hash
+
+    @property
+    def size(self) -> int:
+        """The size of the document, without deriving a representation.
+
+        Returns:
+            int: The number of bytes, or of characters if only the text is known.
+        """
+        if self._data is not None:
+            with memoryview(self._data) as view:
+                return view.nbytes
+        if self._text is not None:
+            return len(self._text)
+        return self._path.stat().st_size if self._path is not None else 0
+
+    def peek(self, size: int) -> bytes:
+        """Return the first bytes of the document, reading only those from its file.
+
+        Args:
+            size (int): The maximum number of bytes.
+
+        Returns:
+            bytes: The first bytes of the document.
+        """
+        if self._data is not None:
+            with memoryview(self._data) as view:
+                return bytes(view.cast("B")[:size])
+        if self._text is not None:
+            return self._text[:size].encode(self.encoding)[:size]
+        with open(self._path, "rb") as file:  # type: ignore
+            return file.read(size)
+
+    @property
+    def failed(self) -> bool:
+        """Whether a step failed for the document.
+
+        Returns:
+            bool: True if the document carries an error.
+        """
+        return self.error is not None
+
+    def node(self, processor: "PySaxonProcessor") -> "PyXdmNode":
+        """Return the document parsed by a Saxon processor.
+
+        The node is kept until the document is parsed by another processor; nodes
+        can not be used across processors. Documents only known by their file are
+        parsed from the file, without reading it into Python.
+
+        Args:
+            processor (PySaxonProcessor): The processor to parse with.
+
+        Returns:
+            PyXdmNode: The parsed document.
+
+        Raises:
+            PySaxonApiError: When the document is not well-formed XML.
+        """
+        if self._node is None or self._node_processor is not processor:
+            if self._text is None and self._data is None and self._path is not None:
+                self._node = processor.parse_xml(xml_file_name=str(self._path))
+            else:
+                self._node = processor.parse_xml(xml_text=self.text)
+            self._node_processor = processor
+        return self._node
+
+    def parsed_by(self, processor: "PySaxonProcessor") -> bool:
+        """Whether the node of a processor is already known.
+
+        Args:
+            processor (PySaxonProcessor): The processor.
+
+        Returns:
+            bool: True if `node(processor)` does not parse.
+        """
+        return self._node is not None and self._node_processor is processor
+
+    def copy(self) -> "Document":
+        """Return a copy, which shares the representations and the parsed node of this document.
+
+        The metadata, timings and error of the copy can change independently, e.g.
+        when the branches of a `Branch` process the same document.
+
+        Returns:
+            Document: The copy.
+        """
+        document = Document.__new__(Document)
+        for name in self.__slots__:
+            setattr(document, name, getattr(self, name))
+        document.metadata = dict(self.metadata)
+        document.timings = dict(self.timings)
+        return document
+
+    def derive(
+        self, text: str | None = None, data: bytes | None = None, encoding: str | None = None
+    ) -> "Document":
+        """Create the document, which a step produced from this document.
+
+        The derived document has the same origin and, unless given, encoding, and
+        copies of the metadata and timings.
+
+        Args:
+            text (str | None): The text of the result.
+            data (bytes | None): The encoded bytes of the result.
+            encoding (str | None): The encoding of the result.
+
+        Returns:
+            Document: The derived document.
+        """
+        document = Document(
+            text=text,
+            data=data,
+            origin=self.origin,
+            encoding=encoding or self.encoding,
+            metadata=dict(self.metadata),
+        )
+        document.timings = dict(self.timings)
+        return document
+
+    def __str__(self) -> str:
+        """Return the text of the document."""
+        return self.text
+
+    def __repr__(self) -> str:
+        """Return a short description of the document."""
+        return f"Document(origin={self.origin!r}, size={self.size})"
+
+    def __getstate__(self) -> dict[str, Any]:
+        """Pickle the document without its node, which belongs to a processor."""
+        state = {name: getattr(self, name) for name in self.__slots__}
+        if state["_data"] is not None:
+            # Views and memory maps can not leave their process
+            state["_data"] = bytes(state["_data"])
+        state["_node"] = None
+        state["_node_processor"] = None
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        """Restore an unpickled document."""
+        for name, value in state.items():
+            setattr(self, name, value)
@@ -0,0 +1,95 @@
+"""Decoding and encoding of XML held in bytes-like buffers, honoring the declared encoding."""
+
+import codecs
+import re
+from mmap import mmap
+
+Buffer = bytes | bytearray | memoryview | mmap
+
+_SNIFF = 1024
+_DECLARED = re.compile(rb"""<\?xml[^>]*?encoding\s*=\s*["']([A-Za-z][A-Za-z0-9._-]*)["']""")
+_DECLARED_TEXT = re.compile(r"""<\?xml[^>]*?encoding\s*=\s*["']([A-Za-z][A-Za-z0-9._-]*)["']""")
+_VERSION = re.compile(r"""<\?xml\s+version\s*=\s*(["'])[^"']*\1""")
+# Encodings, which parsers detect without a declaration; Python writes a BOM for UTF-16
+_UNDECLARED = {"utf-8", "utf-8-sig", "utf-16"}
+# Longer BOMs first, the UTF-32-LE BOM starts with the UTF-16-LE BOM
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+def xml_encoding(head: bytes) -> str | None:
+    """Detect the encoding of a XML document from its first bytes.
+
+    A byte order mark takes precedence over the encoding declared in the XML
+    declaration, as in the XML specification.
+
+    Args:
+        head (bytes): The first bytes of the document.
+
+    Returns:
+        str | None: The name of the codec, or None if neither a byte order mark nor a declaration is found.
+    """
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+
+    match = _DECLARED.match(head)
+    return match.group(1).decode("ascii") if match is not None else None
+
+
+def decode_xml(value: Buffer, default: str = "utf-8") -> str:
+    """Decode a XML document from a bytes-like buffer in its declared encoding.
+
+    The buffer is decoded in place, e.g. a `memoryview` or a memory-mapped file is
+    not copied into `bytes` first; only its first bytes are copied to detect the
+    encoding.
+
+    Args:
+        value (bytes | bytearray | memoryview | mmap): The encoded document.
+        default (str): The encoding of documents without a byte order mark or declaration.
+
+    Returns:
+        str: The text of the document.
+
+    Raises:
+        UnicodeDecodeError: When the document is not encoded in the detected encoding.
+    """
+    with memoryview(value) as view:
+        head = bytes(view[:_SNIFF])
+    return str(value, xml_encoding(head) or default)
+
+
+def encode_xml(text: str, encoding: str) -> bytes:
+    """Encode a serialized XML document, updating the encoding of its XML declaration.
+
+    Documents in other encodings than UTF-8 or UTF-16 get an encoding in their
+    declaration, or a declaration if they have none, so parsers can decode them.
+
+    Characters the encoding can not represent are written as character references,
+    as Saxon does when it serializes, so they must not occur in names, comments or
+    CDATA sections.
+
+    Args:
+        text (str): The serialized document.
+        encoding (str): The encoding of the bytes.
+
+    Returns:
+        bytes: The encoded document.
+    """
+    codec = codecs.lookup(encoding).name
+    match = _DECLARED_TEXT.match(text)
+    if match is not None:
+        if codecs.lookup(match.group(1)).name != codec:
+            text = f"{text[: match.start(1)]}{encoding}{text[match.end(1) :]}"
+    elif codec not in _UNDECLARED:
+        version = _VERSION.match(text)
+        if version is not None:
+            text = f'{text[: version.end()]} encoding="{encoding}"{text[version.end() :]}'
+        else:
+            text = f'<?xml version="1.0" encoding="{encoding}"?>{text}'
+    return text.encode(encoding, errors="xmlcharrefreplace")
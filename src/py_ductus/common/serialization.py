@@ -0,0 +1,78 @@
+"""A data-only JSON encoding of pipeline values, e.g. for caches and work queues.
+
+Besides the JSON types, `Document`s, bytes-like buffers, `Decimal`s and `Path`s
+are encoded as objects tagged with their type. Unlike pickle, decoding never runs
+code, so the encoded values may be read from shared locations.
+"""
+
+import base64
+import json
+from decimal import Decimal
+from pathlib import Path
+from typing import Any
+
+from py_ductus.common.document import Document
+from py_ductus.common.encoding import Buffer
+
+_TAG = "__py_ductus__"
+
+
+def dumps(value: Any) -> str:
+    """Encode a value as JSON.
+
+    Documents are encoded as their text and encoding; other buffers are decoded as
+    `bytes`. Tuples become lists, as in JSON.
+
+    Args:
+        value (Any): The value.
+
+    Returns:
+        str: The JSON text.
+
+    Raises:
+        TypeError: When the value contains an object of another type.
+        ValueError: When the value contains a circular reference.
+    """
+    return json.dumps(value, default=_encode, ensure_ascii=False)
+
+
+def loads(text: str | bytes) -> Any:
+    """Decode a value encoded by `dumps`.
+
+    Args:
+        text (str | bytes): The JSON text.
+
+    Returns:
+        Any: The value; documents are restored with their text and encoding only.
+
+    Raises:
+        ValueError: When the text is no valid JSON or has an unknown tag.
+    """
+    return json.loads(text, object_hook=_decode)
+
+
+def _encode(value: Any) -> dict[str, Any]:
+    if isinstance(value, Document):
+        return {_TAG: "document", "text": value.text, "encoding": value.encoding}
+    if isinstance(value, Buffer):
+        return {_TAG: "bytes", "data": base64.b64encode(value).decode("ascii")}
+    if isinstance(value, Decimal):
+        return {_TAG: "decimal", "value": str(value)}
+    if isinstance(value, Path):
+        return {_TAG: "path", "value": str(value)}
+    raise TypeError(f"Values of type {type(value).__name__} can not be encoded.")
+
+
+def _decode(data: dict[str, Any]) -> Any:
+    kind = data.get(_TAG)
+    if kind is None:
+        return data
+    if kind == "document":
+        return Document(text=data["text"], encoding=data["encoding"])
+    if kind == "bytes":
+        return base64.b64decode(data["data"])
+    if kind == "decimal":
+        return Decimal(data["value"])
+    if kind == "path":
+        return Path(data["value"])
+    raise ValueError(f"Unknown type tag {kind}.")
@@ -1,3 +1,7 @@
-from typing import TypeVar  # noqa: D100
+from mmap import mmap  # noqa: D100
+from pathlib import Path
+from typing import TypeVar
 
-TContent = TypeVar("TContent", str, int)
+from py_ductus.common.document import Document
+
+TContent = TypeVar("TContent", str, int, bytes, memoryview, mmap, Path, Document)
@@ -0,0 +1,140 @@
+"""A bounded pool of threads with per-thread Saxon sessions, for asyncio applications."""
+
+import asyncio
+import contextvars
+import os
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from types import TracebackType
+from typing import Any, Self, TypeVar
+
+from py_ductus.steps.xsl.session import SaxonSession, use_session
+
+T = TypeVar("T")
+
+
+class SaxonExecutor:
+    """A bounded thread pool, in which every thread runs in its own Saxon session.
+
+    CPU-bound steps submitted from an event loop share the threads of the pool, so
+    many concurrent requests are served by a fixed transform capacity without
+    blocking the loop.
+    """
+
+    max_workers: int
+    cache_size: int
+    recycle_after: int | None
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        cache_size: int = 128,
+        recycle_after: int | None = None,
+    ) -> None:
+        """Initialize a SaxonExecutor.
+
+        Args:
+            max_workers (int | None): The number of threads; defaults to the number of CPUs, at most four.
+            cache_size (int): The maximum number of compiled stylesheets per thread.
+            recycle_after (int | None): Recycle the session of a thread after this many step calls.
+        """
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.cache_size = cache_size
+        self.recycle_after = recycle_after
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="py-ductus"
+        )
+        self._local = threading.local()
+        self._sessions: list[SaxonSession] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @property
+    def closed(self) -> bool:
+        """Whether the executor is shut down.
+
+        Returns:
+            bool: True if the executor is shut down.
+        """
+        return self._closed
+
+    async def run(self, function: Callable[..., T], *args: Any) -> T:
+        """Run a function in a thread of the pool and wait for its result.
+
+        The function runs in a copy of the caller's context, with the session of its
+        thread activated.
+
+        Args:
+            function (Callable[..., T]): The function to run.
+            *args (Any): The arguments of the function.
+
+        Returns:
+            T: The result of the function.
+        """
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            self._pool, partial(context.run, self._run_in_session, function, *args)
+        )
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the threads and close their sessions.
+
+        Args:
+            wait (bool): Whether to wait for running functions to finish.
+        """
+        self._closed = True
+        self._pool.shutdown(wait=wait)
+        with self._lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions.clear()
+
+    def _run_in_session(self, function: Callable[..., T], *args: Any) -> T:
+        with use_session(self._session()):
+            return function(*args)
+
+    def _session(self) -> SaxonSession:
+        session: SaxonSession | None = getattr(self._local, "session", None)
+        if session is None:
+            session = SaxonSession(cache_size=self.cache_size, recycle_after=self.recycle_after)
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def __enter__(self) -> Self:
+        """Enter the executor context.
+
+        Returns:
+            SaxonExecutor: The executor itself.
+        """
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Shut the executor down when leaving the context."""
+        self.shutdown()
+
+
+_default_executor: SaxonExecutor | None = None
+_default_lock = threading.Lock()
+
+
+def default_executor() -> SaxonExecutor:
+    """Return the process-wide executor, which is used when no other executor is given.
+
+    Returns:
+        SaxonExecutor: The default executor.
+    """
+    global _default_executor  # noqa: PLW0603
+
+    with _default_lock:
+        if _default_executor is None or _default_executor.closed:
+            _default_executor = SaxonExecutor()
+        return _default_executor
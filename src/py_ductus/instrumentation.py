@@ -0,0 +1,567 @@
+"""Instrumentation of pipelines: per-step timings, item counts and sizes."""
+
+import heapq
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from contextvars import ContextVar
+from types import TracebackType
+from typing import Any, NamedTuple, Protocol, runtime_checkable
+
+from py_ductus.common.document import Document
+from py_ductus.common.encoding import Buffer
+
+
+class StepEvent(NamedTuple):
+    """Metrics of one step applied to a batch or stream of values.
+
+    Sizes are the lengths of `str` and `bytes` values, i.e. characters for `str`, and
+    the sizes of `Document`s.
+
+    Attributes:
+        step (str): The name of the step.
+        wall_time (float): Wall-clock seconds spent in the step, excluding its input.
+        cpu_time (float): CPU seconds of the calling thread spent in the step, excluding its input.
+        items_in (int): Number of values the step consumed.
+        items_out (int): Number of values the step produced.
+        bytes_in (int): Total size of the values the step consumed.
+        bytes_out (int): Total size of the values the step produced.
+    """
+
+    step: str
+    wall_time: float
+    cpu_time: float
+    items_in: int
+    items_out: int
+    bytes_in: int
+    bytes_out: int
+
+
+class PhaseEvent(NamedTuple):
+    """Time spent in one phase inside a step, e.g. "compile", "parse" or "transform".
+
+    Attributes:
+        step (str): The name of the step.
+        phase (str): The name of the phase.
+        seconds (float): Wall-clock seconds spent in the phase.
+    """
+
+    step: str
+    phase: str
+    seconds: float
+
+
+class ItemEvent(NamedTuple):
+    """The duration of one value inside a step, reported by steps which process values one by one.
+
+    Attributes:
+        step (str): The name of the step.
+        item (str): The beginning of the value, e.g. its path or the start of a document.
+        size (int): The size of the value.
+        seconds (float): Wall-clock seconds spent on the value.
+        timed_out (bool): Whether the value was cancelled for exceeding a time budget.
+    """
+
+    step: str
+    item: str
+    size: int
+    seconds: float
+    timed_out: bool = False
+
+
+@runtime_checkable
+class Observer(Protocol):
+    """Protocol for observers of a pipeline."""
+
+    def on_step(self, event: StepEvent) -> None:
+        """Receive the metrics of a step, once the step has processed all its values.
+
+        Args:
+            event (StepEvent): The metrics.
+        """
+        ...
+
+    def on_phase(self, event: PhaseEvent) -> None:
+        """Receive the duration of a phase inside a step.
+
+        Args:
+            event (PhaseEvent): The duration.
+        """
+        ...
+
+
+@runtime_checkable
+class ItemObserver(Protocol):
+    """Protocol for observers, which also receive the duration of single values."""
+
+    def on_item(self, event: ItemEvent) -> None:
+        """Receive the duration of a value inside a step.
+
+        Args:
+            event (ItemEvent): The duration.
+        """
+        ...
+
+
+class StepMetrics:
+    """Accumulated metrics of a step.
+
+    Attributes:
+        calls (int): Number of received step events.
+        wall_time (float): Total wall-clock seconds.
+        cpu_time (float): Total CPU seconds.
+        items_in (int): Total number of consumed values.
+        items_out (int): Total number of produced values.
+        bytes_in (int): Total size of consumed values.
+        bytes_out (int): Total size of produced values.
+        phases (dict[str, float]): Total seconds per phase.
+        phase_counts (dict[str, int]): Number of occurrences per phase.
+        timeouts (int): Number of values cancelled for exceeding a time budget.
+    """
+
+    def __init__(self) -> None:
+        """Initialize empty StepMetrics."""
+        self.calls = 0
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.items_in = 0
+        self.items_out = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.phases: dict[str, float] = {}
+        self.phase_counts: dict[str, int] = {}
+        self.timeouts = 0
+        self._slowest: list[tuple[float, int, ItemEvent]] = []
+
+    @property
+    def slowest(self) -> list[ItemEvent]:
+        """The slowest values reported for the step, slowest first.
+
+        Returns:
+            list[ItemEvent]: The item events.
+        """
+        return [event for _, _, event in sorted(self._slowest, reverse=True)]
+
+    def _record_item(self, event: ItemEvent, keep: int, sequence: int) -> None:
+        # A min-heap of the slowest items, the fastest of them is replaced first
+        entry = (event.seconds, sequence, event)
+        if len(self._slowest) < keep:
+            heapq.heappush(self._slowest, entry)
+        elif keep > 0 and entry > self._slowest[0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    @property
+    def throughput(self) -> float:
+        """Consumed values per wall-clock second.
+
+        Returns:
+            float: The throughput, or 0.0 if no time was measured.
+        """
+        return self.items_in / self.wall_time if self.wall_time > 0 else 0.0
+
+
+class MetricsCollector:
+    """An observer, which accumulates all events in memory, per step.
+
+    Of the values reported by `on_item`, the `slowest` ones are kept per step.
+    """
+
+    slowest: int
+
+    def __init__(self, slowest: int = 10) -> None:
+        """Initialize a MetricsCollector.
+
+        Args:
+            slowest (int): The number of slowest values kept per step.
+        """
+        self.slowest = slowest
+        self._steps: dict[str, StepMetrics] = {}
+        self._lock = threading.Lock()
+        self._items = 0
+
+    def on_step(self, event: StepEvent) -> None:
+        """Accumulate the metrics of a step.
+
+        Args:
+            event (StepEvent): The metrics.
+        """
+        with self._lock:
+            metrics = self._steps.setdefault(event.step, StepMetrics())
+            metrics.calls += 1
+            metrics.wall_time += event.wall_time
+            metrics.cpu_time += event.cpu_time
+            metrics.items_in += event.items_in
+            metrics.items_out += event.items_out
+            metrics.bytes_in += event.bytes_in
+            metrics.bytes_out += event.bytes_out
+
+    def on_phase(self, event: PhaseEvent) -> None:
+        """Accumulate the duration of a phase.
+
+        Args:
+            event (PhaseEvent): The duration.
+        """
+        with self._lock:
+            metrics = self._steps.setdefault(event.step, StepMetrics())
+            metrics.phases[event.phase] = metrics.phases.get(event.phase, 0.0) + event.seconds
+            metrics.phase_counts[event.phase] = metrics.phase_counts.get(event.phase, 0) + 1
+
+    def on_item(self, event: ItemEvent) -> None:
+        """Record the duration of a value, keeping the slowest values per step.
+
+        Args:
+            event (ItemEvent): The duration.
+        """
+        with self._lock:
+            metrics = self._steps.setdefault(event.step, StepMetrics())
+            metrics.timeouts += event.timed_out
+            self._items += 1
+            metrics._record_item(event, keep=self.slowest, sequence=self._items)
+
+    @property
+    def steps(self) -> dict[str, StepMetrics]:
+        """The accumulated metrics per step name.
+
+        Returns:
+            dict[str, StepMetrics]: The metrics.
+        """
+        with self._lock:
+            return dict(self._steps)
+
+    def reset(self) -> None:
+        """Drop all accumulated metrics."""
+        with self._lock:
+            self._steps.clear()
+            self._items = 0
+
+    def to_openmetrics(self, prefix: str = "py_ductus") -> str:
+        """Export the accumulated metrics in the OpenMetrics text format.
+
+        The output is also understood by Prometheus.
+
+        Args:
+            prefix (str): The prefix of all metric names.
+
+        Returns:
+            str: The exposition text, terminated by "# EOF".
+        """
+        steps = self.steps
+        lines: list[str] = []
+
+        counters: list[tuple[str, str, str, Callable[[StepMetrics], float]]] = [
+            ("step_calls", "", "Number of step applications.", lambda m: m.calls),
+            ("step_wall", "seconds", "Wall-clock time spent in steps.", lambda m: m.wall_time),
+            ("step_cpu", "seconds", "CPU time spent in steps.", lambda m: m.cpu_time),
+            ("step_items_in", "", "Values consumed by steps.", lambda m: m.items_in),
+            ("step_items_out", "", "Values produced by steps.", lambda m: m.items_out),
+            ("step_in", "bytes", "Size of values consumed by steps.", lambda m: m.bytes_in),
+            ("step_out", "bytes", "Size of values produced by steps.", lambda m: m.bytes_out),
+        ]
+        for name, unit, help_text, value in counters:
+            family = f"{prefix}_{name}_{unit}" if unit else f"{prefix}_{name}"
+            lines.append(f"# TYPE {family} counter")
+            if unit:
+                lines.append(f"# UNIT {family} {unit}")
+            lines.append(f"# HELP {family} {help_text}")
+            lines.extend(
+                f'{family}_total{{step="{_escape(step)}"}} {value(metrics)}'
+                for step, metrics in steps.items()
+            )
+
+        family = f"{prefix}_phase_seconds"
+        lines.append(f"# TYPE {family} counter")
+        lines.append(f"# UNIT {family} seconds")
+        lines.append(f"# HELP {family} Time spent in phases inside steps.")
+        for step, metrics in steps.items():
+            lines.extend(
+                f'{family}_total{{step="{_escape(step)}",phase="{_escape(phase)}"}} {seconds}'
+                for phase, seconds in metrics.phases.items()
+            )
+
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+_current_observer: ContextVar[Observer | None] = ContextVar("current_observer", default=None)
+
+
+def current_observer() -> Observer | None:
+    """Return the observer activated with `observe`.
+
+    Steps use it to report their phases; when it is None, instrumentation is disabled.
+
+    Returns:
+        Observer | None: The current observer.
+    """
+    return _current_observer.get()
+
+
+@contextmanager
+def observe(observer: Observer | None) -> Iterator[Observer | None]:
+    """Activate an observer for all steps.
+
+    Args:
+        observer (Observer | None): The observer to activate; the current observer is kept if None.
+
+    Yields:
+        Observer | None: The active observer.
+    """
+    if observer is None:
+        yield current_observer()
+        return
+
+    token = _current_observer.set(observer)
+    try:
+        yield observer
+    finally:
+        _current_observer.reset(token)
+
+
+class _PhaseTimer:
+    __slots__ = ("_observer", "_phase", "_start", "_step")
+
+    def __init__(self, observer: Observer, step: str, phase: str) -> None:
+        self._observer = observer
+        self._step = step
+        self._phase = phase
+        self._start = 0.0
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter()
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self._observer.on_phase(
+            PhaseEvent(
+                step=self._step, phase=self._phase, seconds=time.perf_counter() - self._start
+            )
+        )
+
+
+_NO_TIMER = nullcontext()
+
+
+def phase_timer(observer: Observer | None, step: str, phase: str) -> AbstractContextManager[None]:
+    """Time a phase inside a step and report it to the observer.
+
+    Args:
+        observer (Observer | None): The observer; nothing is measured if None.
+        step (str): The name of the step.
+        phase (str): The name of the phase.
+
+    Returns:
+        AbstractContextManager[None]: A context manager measuring its body.
+    """
+    if observer is None:
+        return _NO_TIMER
+    return _PhaseTimer(observer, step, phase)
+
+
+_ITEM_LABEL_LENGTH = 80
+
+
+def item_observer(observer: Observer | None) -> ItemObserver | None:
+    """Return the observer if it receives item events.
+
+    Args:
+        observer (Observer | None): The observer.
+
+    Returns:
+        ItemObserver | None: The observer, or None if it does not implement `on_item`.
+    """
+    return observer if isinstance(observer, ItemObserver) else None
+
+
+def report_item(  # noqa: PLR0913
+    observer: ItemObserver | None,
+    step: str,
+    value: Any,
+    seconds: float,
+    *,
+    timed_out: bool = False,
+    size: int | None = None,
+) -> None:
+    """Report the duration of a value inside a step to an item observer.
+
+    Args:
+        observer (ItemObserver | None): The observer; nothing is reported if None.
+        step (str): The name of the step.
+        value (TContent): The value.
+        seconds (float): Wall-clock seconds spent on the value.
+        timed_out (bool): Whether the value was cancelled for exceeding a time budget.
+        size (int | None): The size of the value, if it is not a `str` or `bytes` value, e.g. the size of a file.
+    """
+    if observer is None:
+        return
+
+    observer.on_item(
+        ItemEvent(
+            step=step,
+            item=_label(value),
+            size=_size(value) if size is None else size,
+            seconds=seconds,
+            timed_out=timed_out,
+        )
+    )
+
+
+def timed_items(
+    observer: ItemObserver,
+    step: str,
+    values: Iterable[Any],
+    apply: Callable[[Any], Any],
+    size: Callable[[Any], int] | None = None,
+) -> Iterator[Any]:
+    """Apply a function to values one by one, reporting the duration of each value.
+
+    Args:
+        observer (ItemObserver): The observer to report to.
+        step (str): The name of the step.
+        values (Iterable[TContent]): The values.
+        apply (Callable[[TContent], TContent]): Processes a single value.
+        size (Callable[[TContent], int] | None): Measures values which are not `str` or `bytes`.
+
+    Yields:
+        TContent: The processed values.
+    """
+    for value in values:
+        started = time.perf_counter()
+        result = apply(value)
+        seconds = time.perf_counter() - started
+        report_item(observer, step, value, seconds, size=None if size is None else size(value))
+        yield result
+
+
+def observe_step(
+    step: str,
+    call: Callable[[Iterable[Any]], Iterable[Any]],
+    values: Iterable[Any],
+    observer: Observer,
+    stream: bool,
+) -> Iterable[Any]:
+    """Apply a step and report its metrics to an observer.
+
+    Time spent producing the input of the step is excluded from its metrics. In
+    streaming mode the event is reported once the results are exhausted or closed.
+
+    Args:
+        step (str): The name of the step.
+        call (Callable[[Iterable[TContent]], Iterable[TContent]]): Applies the step to values.
+        values (Iterable[TContent]): The values to process.
+        observer (Observer): The observer to report to.
+        stream (bool): Whether `call` is lazy and its results are consumed lazily.
+
+    Returns:
+        Iterable[TContent]: The processed values; a list unless streaming.
+    """
+    metered = _MeteredIterator(values)
+
+    if stream:
+        return _observe_stream(step, call, metered, observer)
+
+    wall, cpu = time.perf_counter(), time.thread_time()
+    results = list(call(metered))
+    wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+
+    observer.on_step(
+        StepEvent(
+            step=step,
+            wall_time=wall - metered.wall_time,
+            cpu_time=cpu - metered.cpu_time,
+            items_in=metered.items,
+            items_out=len(results),
+            bytes_in=metered.size,
+            bytes_out=sum(_size(value) for value in results),
+        )
+    )
+    return results
+
+
+def _observe_stream(
+    step: str,
+    call: Callable[[Iterable[Any]], Iterable[Any]],
+    metered: "_MeteredIterator",
+    observer: Observer,
+) -> Iterator[Any]:
+    wall, cpu = time.perf_counter(), time.thread_time()
+    results = iter(call(metered))
+    wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+    items_out = bytes_out = 0
+
+    try:
+        while True:
+            started, started_cpu = time.perf_counter(), time.thread_time()
+            try:
+                value = next(results)
+            except StopIteration:
+                break
+            finally:
+                wall += time.perf_counter() - started
+                cpu += time.thread_time() - started_cpu
+            items_out += 1
+            bytes_out += _size(value)
+            yield value
+    finally:
+        observer.on_step(
+            StepEvent(
+                step=step,
+                wall_time=wall - metered.wall_time,
+                cpu_time=cpu - metered.cpu_time,
+                items_in=metered.items,
+                items_out=items_out,
+                bytes_in=metered.size,
+                bytes_out=bytes_out,
+            )
+        )
+
+
+class _MeteredIterator(Iterator[Any]):
+    """An iterator, which counts its values and the time spent producing them."""
+
+    def __init__(self, values: Iterable[Any]) -> None:
+        self._values = iter(values)
+        self.items = 0
+        self.size = 0
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+
+    def __next__(self) -> Any:
+        started, started_cpu = time.perf_counter(), time.thread_time()
+        try:
+            value = next(self._values)
+        finally:
+            self.wall_time += time.perf_counter() - started
+            self.cpu_time += time.thread_time() - started_cpu
+        self.items += 1
+        self.size += _size(value)
+        return value
+
+
+def _size(value: Any) -> int:
+    if isinstance(value, Document):
+        return value.size
+    if isinstance(value, Buffer):
+        with memoryview(value) as view:
+            return view.nbytes
+    return len(value) if isinstance(value, str) else 0
+
+
+def _label(value: Any) -> str:
+    # Documents are labelled by their origin or first bytes, so reports do not decode them
+    if isinstance(value, Document):
+        if value.origin is not None:
+            return value.origin[:_ITEM_LABEL_LENGTH]
+        return value.peek(_ITEM_LABEL_LENGTH).decode(value.encoding, errors="replace")
+    if isinstance(value, Buffer):
+        with memoryview(value) as view:
+            return bytes(view[:_ITEM_LABEL_LENGTH]).decode("utf-8", errors="replace")
+    return str(value)[:_ITEM_LABEL_LENGTH]
+
+
+def _escape(label: str) -> str:
+    return label.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
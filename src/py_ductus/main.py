@@ -1,31 +1,334 @@
-from collections.abc import Iterable  # noqa: D100
+from collections.abc import (  # noqa: D100
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Iterable,
+    Iterator,
+)
+from contextlib import contextmanager
+from functools import partial
+from typing import Any
 
 from py_ductus.common.types import TContent
-from py_ductus.steps.protocol import Step, StepAlternative
+from py_ductus.executor import SaxonExecutor, default_executor
+from py_ductus.instrumentation import Observer, observe, observe_step
+from py_ductus.parallel import process_parallel
+from py_ductus.spill import MemoryBudget
+from py_ductus.staged import StagedRun
+from py_ductus.steps.alternative import FallbackHandler, apply_alternative
+from py_ductus.steps.protocol import AsyncStep, Step, StepAlternative, StreamingStep, step_name
+from py_ductus.steps.xsl.session import SaxonSession, use_session
+from py_ductus.steps.xsl.xsl import XSL, XSLChain
 
 
-def process(
-    input_values: Iterable[TContent], steps: Iterable[Step | StepAlternative]
+def process(  # noqa: PLR0913
+    input_values: Iterable[TContent],
+    steps: Iterable[Step | StepAlternative],
+    *,
+    session: SaxonSession | None = None,
+    stream: bool = False,
+    workers: int | None = None,
+    chunk_size: int = 64,
+    ordered: bool = True,
+    staged: bool = False,
+    queue_size: int = 64,
+    on_fallback: FallbackHandler | None = None,
+    observer: Observer | None = None,
+    memory_budget: MemoryBudget | None = None,
 ) -> Iterable[TContent]:
     """Process values with steps.
 
+    Adjacent `XSL` steps sharing a session are run as one `XSLChain`, which passes
+    the parsed result trees between them and serializes only once at the end.
+
+    In streaming mode the steps are chained lazily: streaming steps are fed through
+    `StreamingStep.stream`, so results are yielded while the input is still read and
+    peak memory depends on the number of steps rather than the number of values.
+    Other steps receive an iterator and are only as lazy as their own implementation.
+
+    Values may be wrapped in `Document`s, which keep their parsed form, content
+    hash and metadata while they pass through steps which understand them.
+
+    The main step of a `StepAlternative` is applied per value: only values for which
+    it fails are processed by the fallback step, see `apply_alternative`.
+
+    With `workers`, chunks of values are processed in a pool of worker processes,
+    each with its own warm Saxon session; see `py_ductus.parallel.process_parallel`.
+
+    With `staged`, every step runs lazily in its own thread, connected to its
+    neighbours by queues of `queue_size` values, so the steps overlap; see
+    `py_ductus.staged.StagedRun`. In streaming mode the returned `StagedRun` exposes
+    the queue depths of the stages.
+
+    With `memory_budget`, the results of every step but the last are collected in
+    `SpillBuffer`s, which spill to compressed temporary files once the budget is
+    exceeded and are read back lazily by the next step. Steps are fed one value at
+    a time, as in streaming mode; the budget reports the spill volume and peak.
+
     Args:
         input_values (Iterable[TContent]): The values to process.
         steps (Iterable[Step]): The steps to process the values with.
+        session (SaxonSession | None): The Saxon session for steps without an own session; the current session is used if omitted.
+        stream (bool): Whether to return a lazy iterator instead of processing all values up front.
+        workers (int | None): The number of worker processes; the values are processed in this process if omitted.
+        chunk_size (int): The number of values sent to a worker process at once.
+        ordered (bool): Whether worker results are returned in input order.
+        staged (bool): Whether to run every step in its own thread.
+        queue_size (int): The number of values buffered between two stages.
+        on_fallback (FallbackHandler | None): Called for every value routed to the fallback step of an alternative, e.g. a `FallbackCounter`.
+        observer (Observer | None): Receives per-step metrics and the phases reported by steps, e.g. a `MetricsCollector`.
+        memory_budget (MemoryBudget | None): Limits the intermediate results held in memory in batch mode.
 
     Returns:
         Iterable[TContent]: The processed values.
+
+    Raises:
+        ValueError: When `on_fallback`, `observer` or `staged` is combined with `workers`, or `memory_budget` with `stream`, `staged` or `workers`.
     """
-    value_result = input_values
+    if memory_budget is not None:
+        return _process_budgeted(
+            input_values,
+            steps,
+            batch=not (stream or staged or workers is not None),
+            session=session,
+            on_fallback=on_fallback,
+            observer=observer,
+            memory_budget=memory_budget,
+        )
 
-    for step in steps:
-        if isinstance(step, StepAlternative):
+    if workers is not None:
+        if staged:
+            raise ValueError("Worker processes and staged execution can not be combined.")
+        if on_fallback is not None or observer is not None:
+            raise ValueError("Steps running in worker processes can not be observed.")
+        results = process_parallel(
+            input_values,
+            steps=steps,
+            workers=workers,
+            chunk_size=chunk_size,
+            ordered=ordered,
+            session=session,
+        )
+        return results if stream else list(results)
+
+    if staged:
+        stages: list[tuple[str, Callable[[Iterable[TContent]], Iterable[TContent]]]] = []
+        for step in chain_xsl_steps(steps):
+            apply = _observed_runner(step, stream=True, on_fallback=on_fallback, observer=observer)
+            stages.append((step_name(step), apply))
+        run = StagedRun(
+            input_values,
+            stages=stages,
+            queue_size=queue_size,
+            context=partial(_pipeline_context, session, observer),
+        )
+        return run if stream else list(run)
+
+    value_result = iter(input_values) if stream else input_values
+
+    with _pipeline_context(session, observer):
+        for step in chain_xsl_steps(steps):
+            apply = _observed_runner(
+                step, stream=stream, on_fallback=on_fallback, observer=observer
+            )
+            value_result = apply(value_result)
+
+    if stream and (session is not None or observer is not None):
+        return _iterate_in_context(session, observer, value_result)
+    return value_result
+
+
+def _process_budgeted(  # noqa: PLR0913
+    input_values: Iterable[TContent],
+    steps: Iterable[Step | StepAlternative],
+    *,
+    batch: bool,
+    session: SaxonSession | None,
+    on_fallback: FallbackHandler | None,
+    observer: Observer | None,
+    memory_budget: MemoryBudget,
+) -> list[TContent]:
+    if not batch:
+        raise ValueError("Memory budgets apply to batch runs only.")
+
+    chained = chain_xsl_steps(steps)
+    value_result: Iterable[TContent] = input_values
+
+    with _pipeline_context(session, observer):
+        for index, step in enumerate(chained):
+            apply = _observed_runner(step, stream=True, on_fallback=on_fallback, observer=observer)
+            results = apply(value_result)
+            # The final results are returned in memory anyway
+            last = index == len(chained) - 1
+            value_result = list(results) if last else memory_budget.buffer(results)
+
+    return list(value_result)
+
+
+async def aprocess(  # noqa: PLR0913
+    input_values: Iterable[TContent] | AsyncIterable[TContent],
+    steps: Iterable[Step | AsyncStep | StepAlternative],
+    *,
+    executor: SaxonExecutor | None = None,
+    session: SaxonSession | None = None,
+    chunk_size: int = 16,
+    on_fallback: FallbackHandler | None = None,
+    observer: Observer | None = None,
+) -> list[TContent]:
+    """Process values with steps, without blocking the event loop.
+
+    `AsyncStep`s run in the event loop. All other steps run on the threads of the
+    executor, each with the Saxon session of its thread unless `session` is given.
+    Streaming steps and alternatives receive the values in chunks of `chunk_size`,
+    so they start before the input is exhausted; other steps receive all values at
+    once. Adjacent `XSL` steps are chained like in `process()`.
+
+    Args:
+        input_values (Iterable[TContent] | AsyncIterable[TContent]): The values to process.
+        steps (Iterable[Step | AsyncStep | StepAlternative]): The steps to process the values with.
+        executor (SaxonExecutor | None): The executor of the CPU-bound steps; the default executor is used if omitted.
+        session (SaxonSession | None): A Saxon session shared by all threads, instead of their own sessions.
+        chunk_size (int): The number of values passed to a streaming step at once.
+        on_fallback (FallbackHandler | None): Called for every value routed to the fallback step of an alternative.
+        observer (Observer | None): Receives per-step metrics, one event per chunk, and the phases reported by steps.
+
+    Returns:
+        list[TContent]: The processed values.
+    """
+    executor = executor or default_executor()
+    values = _aiter_values(input_values)
+
+    for step in chain_xsl_steps(steps):  # type: ignore
+        if isinstance(step, AsyncStep):
+            values = step.astream(values)
+            continue
+
+        apply = _observed_runner(step, stream=False, on_fallback=on_fallback, observer=observer)
+        run = partial(_apply_in_context, apply, session, observer)
+        chunked = isinstance(step, StepAlternative | StreamingStep)
+        values = _arun_step(run, values, executor, chunk_size=chunk_size if chunked else None)
+
+    return [value async for value in values]
+
+
+async def _aiter_values(values: Iterable[TContent] | AsyncIterable[TContent]) -> AsyncIterator[Any]:
+    if isinstance(values, AsyncIterable):
+        async for value in values:
+            yield value
+    else:
+        for value in values:
+            yield value
+
+
+async def _arun_step(
+    run: Callable[[list[Any]], list[Any]],
+    values: AsyncIterator[Any],
+    executor: SaxonExecutor,
+    chunk_size: int | None,
+) -> AsyncIterator[Any]:
+    chunk: list[Any] = []
+    async for value in values:
+        chunk.append(value)
+        if chunk_size is not None and len(chunk) >= chunk_size:
+            for result in await executor.run(run, chunk):
+                yield result
+            chunk = []
+
+    if chunk or chunk_size is None:
+        for result in await executor.run(run, chunk):
+            yield result
+
+
+def _apply_in_context(
+    apply: Callable[[Iterable[TContent]], Iterable[TContent]],
+    session: SaxonSession | None,
+    observer: Observer | None,
+    values: list[TContent],
+) -> list[TContent]:
+    with _pipeline_context(session, observer):
+        return list(apply(values))
+
+
+@contextmanager
+def _pipeline_context(session: SaxonSession | None, observer: Observer | None) -> Iterator[None]:
+    with use_session(session), observe(observer):
+        yield
+
+
+def _iterate_in_context(
+    session: SaxonSession | None, observer: Observer | None, values: Iterable[TContent]
+) -> Iterator[TContent]:
+    # Lazy steps may only resolve their session and observer when the results are consumed
+    iterator = iter(values)
+    while True:
+        with _pipeline_context(session, observer):
             try:
-                value_result = step.main(value_result)
-            except Exception:
-                value_result = step.fallback(value_result)
+                value = next(iterator)
+            except StopIteration:
+                return
+        yield value
+
+
+def _step_runner(
+    step: Step | StepAlternative, stream: bool, on_fallback: FallbackHandler | None
+) -> Callable[[Iterable[TContent]], Iterable[TContent]]:
+    if isinstance(step, StepAlternative):
+        alternative = partial(apply_alternative, step, on_fallback=on_fallback)
+        return alternative if stream else lambda values: list(alternative(values))
+
+    if stream:
+        return partial(_stream_step, step)
+    return step
+
+
+def _observed_runner(
+    step: Step | StepAlternative,
+    stream: bool,
+    on_fallback: FallbackHandler | None,
+    observer: Observer | None,
+) -> Callable[[Iterable[TContent]], Iterable[TContent]]:
+    apply = _step_runner(step, stream=stream, on_fallback=on_fallback)
+    if observer is None:
+        return apply
+    return partial(observe_step, step_name(step), apply, observer=observer, stream=stream)
+
+
+def chain_xsl_steps(steps: Iterable[Step | StepAlternative]) -> list[Step | StepAlternative]:
+    """Group runs of adjacent `XSL` steps sharing a session into `XSLChain`s.
+
+    Only plain `XSL` steps are chained; subclasses like `XSLSweep` produce other results.
+
+    Args:
+        steps (Iterable[Step | StepAlternative]): The steps of a pipeline.
+
+    Returns:
+        list[Step | StepAlternative]: The steps, with runs of XSL steps replaced by chains.
+    """
+    planned: list[Step | StepAlternative] = []
+    run: list[XSL] = []
+
+    def close_run() -> None:
+        if len(run) > 1:
+            planned.append(XSLChain(steps=list(run), session=run[0].session))
+        else:
+            planned.extend(run)
+        run.clear()
+
+    for step in steps:
+        if type(step) is XSL:
+            if run and run[0].session is not step.session:
+                close_run()
+            run.append(step)
             continue
 
-        value_result = step(value_result)
+        close_run()
+        planned.append(step)
 
-    return value_result
+    close_run()
+    return planned
+
+
+def _stream_step(step: Step, values: Iterable[TContent]) -> Iterator[TContent]:
+    if isinstance(step, StreamingStep):
+        return step.stream(values)
+    return iter(step(values))
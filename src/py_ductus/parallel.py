@@ -0,0 +1,99 @@
+"""Multi-process execution of pipelines."""
+
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from itertools import islice
+from typing import Any
+
+from py_ductus.steps.error import portable_error
+from py_ductus.steps.protocol import Step, StepAlternative
+from py_ductus.steps.xsl.session import SaxonSession
+
+# Set once per worker process by the pool initializer
+_worker_steps: list[Step | StepAlternative] = []
+_worker_session: SaxonSession | None = None
+
+
+def process_parallel(  # noqa: PLR0913
+    input_values: Iterable[Any],
+    steps: Iterable[Step | StepAlternative],
+    *,
+    workers: int,
+    chunk_size: int = 64,
+    ordered: bool = True,
+    session: SaxonSession | None = None,
+) -> Iterator[Any]:
+    """Process values with steps in a pool of worker processes.
+
+    The values are sent to the workers in chunks. Every worker receives the steps
+    once and keeps its own Saxon session, so stylesheets are compiled once per
+    worker and not once per chunk. At most two chunks per worker are in flight; when
+    a chunk fails, the chunks which did not start yet are cancelled.
+
+    Args:
+        input_values (Iterable[TContent]): The values to process.
+        steps (Iterable[Step]): The steps to process the values with.
+        workers (int): The number of worker processes.
+        chunk_size (int): The number of values sent to a worker at once.
+        ordered (bool): Whether to yield the results in input order; otherwise they are yielded as chunks complete.
+        session (SaxonSession | None): A session whose settings are used for the session of each worker.
+
+    Yields:
+        TContent: The processed values.
+
+    Raises:
+        ValueError: When `workers` or `chunk_size` is smaller than one.
+    """
+    if workers < 1 or chunk_size < 1:
+        raise ValueError("workers and chunk_size must be at least one.")
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(list(steps), session)
+    ) as pool:
+        pending: deque[Future[list[Any]]] = deque()
+        values = iter(input_values)
+
+        try:
+            while chunk := list(islice(values, chunk_size)):
+                pending.append(pool.submit(_process_chunk, chunk))
+                if len(pending) >= 2 * workers:
+                    yield from _collect(pending, ordered=ordered)
+
+            while pending:
+                yield from _collect(pending, ordered=ordered)
+        except BaseException:
+            # Also when the results are closed early; chunks which did not start are dropped
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+
+
+def _collect(pending: deque[Future[list[Any]]], ordered: bool) -> list[Any]:
+    if ordered:
+        return pending.popleft().result()
+
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    results: list[Any] = []
+    for future in done:
+        pending.remove(future)
+        results.extend(future.result())
+    return results
+
+
+def _init_worker(steps: list[Step | StepAlternative], session: SaxonSession | None) -> None:
+    global _worker_steps, _worker_session  # noqa: PLW0603
+
+    _worker_steps = steps
+    _worker_session = session
+
+
+def _process_chunk(chunk: list[Any]) -> list[Any]:
+    from py_ductus.main import process  # noqa: PLC0415
+
+    try:
+        return list(process(chunk, steps=_worker_steps, session=_worker_session))
+    except Exception as exc:
+        error = portable_error(exc)
+        if error is exc:
+            raise
+        raise error from None
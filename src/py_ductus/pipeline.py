@@ -0,0 +1,133 @@
+"""Pipelines, which are compiled once and applied many times."""
+
+from collections.abc import Iterable, Sequence
+
+from py_ductus.common.types import TContent
+from py_ductus.instrumentation import Observer
+from py_ductus.main import chain_xsl_steps, process
+from py_ductus.steps.alternative import FallbackHandler
+from py_ductus.steps.protocol import Step, StepAlternative, preparable_steps
+from py_ductus.steps.xsl.session import SaxonSession, current_session
+
+
+class PipelineError(Exception):
+    """Error raised when a pipeline can not be compiled.
+
+    Attributes:
+        index (int): The position of the failing step in the pipeline.
+    """
+
+    index: int
+
+    def __init__(self, index: int, step: Step, error: Exception) -> None:
+        """Initialize a PipelineError.
+
+        Args:
+            index (int): The position of the failing step in the pipeline.
+            step (Step): The failing step.
+            error (Exception): The error raised while preparing the step.
+        """
+        super().__init__(f"Step {index} ('{step.name}') failed to compile: {error}")
+        self.index = index
+
+
+class Pipeline:
+    """A sequence of steps, which is validated and compiled once and can be applied repeatedly.
+
+    Compiling checks every step against the `Step` protocol and prepares every
+    `PreparableStep`: `XSL` steps compile their stylesheet in the session of the
+    pipeline and convert their static params. Adjacent XSL steps are grouped into
+    `XSLChain`s once, so a call only runs the resulting plan.
+
+    A pipeline may be called from several threads at once; every call works on its
+    own clones of the compiled stylesheets.
+
+    The main step of a `StepAlternative` is not compiled eagerly, so stylesheets which
+    fail to compile are still handled by the fallback step at runtime.
+    """
+
+    steps: tuple[Step | StepAlternative, ...]
+    session: SaxonSession
+
+    def __init__(
+        self,
+        steps: Sequence[Step | StepAlternative],
+        session: SaxonSession | None = None,
+    ) -> None:
+        """Initialize and compile a Pipeline.
+
+        Args:
+            steps (Sequence[Step | StepAlternative]): The steps of the pipeline.
+            session (SaxonSession | None): The Saxon session for steps without an own session; the current session is used if omitted.
+
+        Raises:
+            TypeError: When a step does not implement the `Step` protocol.
+            PipelineError: When a step fails to compile.
+        """
+        self.steps = tuple(steps)
+        self.session = session or current_session()
+
+        for index, step in enumerate(self.steps):
+            _validate(index, step)
+
+        for index, part in preparable_steps(self.steps):
+            try:
+                part.prepare(self.session)
+            except Exception as error:
+                raise PipelineError(index=index, step=part, error=error) from error
+
+        self._plan = tuple(chain_xsl_steps(self.steps))
+
+    @property
+    def plan(self) -> tuple[Step | StepAlternative, ...]:
+        """The steps as they are executed, with runs of XSL steps grouped into chains.
+
+        Returns:
+            tuple[Step | StepAlternative, ...]: The execution plan.
+        """
+        return self._plan
+
+    def __call__(
+        self,
+        input_values: Iterable[TContent],
+        *,
+        stream: bool = False,
+        on_fallback: FallbackHandler | None = None,
+        observer: Observer | None = None,
+    ) -> Iterable[TContent]:
+        """Process values with the pipeline.
+
+        Args:
+            input_values (Iterable[TContent]): The values to process.
+            stream (bool): Whether to return a lazy iterator instead of processing all values up front.
+            on_fallback (FallbackHandler | None): Called for every value routed to the fallback step of an alternative.
+            observer (Observer | None): Receives per-step metrics and the phases reported by steps.
+
+        Returns:
+            Iterable[TContent]: The processed values.
+        """
+        return process(
+            input_values,
+            steps=self._plan,
+            session=self.session,
+            stream=stream,
+            on_fallback=on_fallback,
+            observer=observer,
+        )
+
+    def __len__(self) -> int:
+        """Return the number of steps of the pipeline.
+
+        Returns:
+            int: The number of steps.
+        """
+        return len(self.steps)
+
+
+def _validate(index: int, step: object) -> None:
+    parts = step if isinstance(step, StepAlternative) else (step,)
+    for part in parts:
+        if not isinstance(part, Step):
+            raise TypeError(
+                f"Step {index} ({type(part).__name__}) does not implement the Step protocol."
+            )
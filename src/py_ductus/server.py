@@ -0,0 +1,587 @@
+"""A local server, which keeps named pipelines compiled for short-lived callers.
+
+Callers send documents over localhost HTTP or a Unix socket and receive the
+results, without paying for interpreter start-up, Saxon start-up and stylesheet
+compilation on every invocation. Start a server with
+`python -m py_ductus.server --config pipelines.json --socket /tmp/py-ductus.sock`
+and talk to it with a `PipelineClient`.
+
+The configuration maps pipeline names to lists of XSL steps:
+`{"render": [{"xslt": "render.xsl", "params": {"lang": "en"}}]}`. Scalar params
+become `XSLAtomicParam`s, lists `XSLArrayParam`s and objects `XSLMapParam`s.
+"""
+
+import argparse
+import http.client
+import json
+import signal
+import socket
+import socketserver
+import stat
+import statistics
+import threading
+import time
+from collections import deque
+from collections.abc import Mapping, Sequence
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import TracebackType
+from typing import Any, NamedTuple, Self
+
+from saxonche import PySaxonApiError
+
+from py_ductus.common.encoding import Buffer, decode_xml
+from py_ductus.pipeline import Pipeline
+from py_ductus.steps.error import StepError
+from py_ductus.steps.protocol import Step, StepAlternative
+from py_ductus.steps.xsl import XSL, XSLArrayParam, XSLAtomicParam, XSLMapParam, XSLParam
+from py_ductus.steps.xsl.session import SaxonSession
+
+_LATENCY_SAMPLES = 1024
+
+
+class PipelineStats(NamedTuple):
+    """The request statistics of a pipeline of a server.
+
+    Queue times are spent waiting for a free slot of the server, latencies are
+    spent running the pipeline. Percentiles are computed over recent requests.
+
+    Attributes:
+        pipeline (str): The name of the pipeline.
+        requests (int): The number of completed requests.
+        documents (int): The number of documents processed.
+        errors (int): The number of failed requests.
+        in_flight (int): The number of requests currently running.
+        queued (int): The number of requests currently waiting for a slot.
+        queue_mean (float): The mean queue time in seconds.
+        queue_max (float): The longest queue time in seconds.
+        latency_mean (float): The mean latency in seconds.
+        latency_p50 (float): The median latency in seconds.
+        latency_p95 (float): The 95th percentile of the latency in seconds.
+        latency_max (float): The longest latency in seconds.
+    """
+
+    pipeline: str
+    requests: int
+    documents: int
+    errors: int
+    in_flight: int
+    queued: int
+    queue_mean: float
+    queue_max: float
+    latency_mean: float
+    latency_p50: float
+    latency_p95: float
+    latency_max: float
+
+
+class _Recorder:
+    """The mutable statistics of a pipeline; guarded by the lock of the server."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.documents = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.queued = 0
+        self.queue_total = 0.0
+        self.queue_max = 0.0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.latencies: deque[float] = deque(maxlen=_LATENCY_SAMPLES)
+
+    def stats(self, name: str) -> PipelineStats:
+        latencies = sorted(self.latencies)
+        completed = self.requests + self.errors
+        return PipelineStats(
+            pipeline=name,
+            requests=self.requests,
+            documents=self.documents,
+            errors=self.errors,
+            in_flight=self.in_flight,
+            queued=self.queued,
+            queue_mean=self.queue_total / completed if completed else 0.0,
+            queue_max=self.queue_max,
+            latency_mean=self.latency_total / completed if completed else 0.0,
+            latency_p50=statistics.median(latencies) if latencies else 0.0,
+            latency_p95=latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+            latency_max=self.latency_max,
+        )
+
+
+class PipelineServer:
+    """A server, which applies named, precompiled pipelines to the documents of its clients.
+
+    Requests are handled concurrently, one thread per connection; at most
+    `max_concurrency` of them run a pipeline at the same time, the others queue.
+    The server listens on a Unix socket if `socket_path` is given, and on
+    `host:port` otherwise (port 0 picks a free port, see `address`).
+
+    Endpoints:
+        `POST /pipelines/<name>`: Transform one XML document sent as body, decoded in
+            the encoding it declares, answered
+            with its result, which must be exactly one; or a JSON object
+            `{"documents": [...]}` sent as `application/json`, answered with
+            `{"results": [...]}`. Encoded results are sent in their own encoding, and
+            decoded in JSON.
+        `GET /pipelines`: The names of the pipelines.
+        `GET /stats`: The `PipelineStats` of every pipeline.
+    """
+
+    pipelines: dict[str, Pipeline]
+    session: SaxonSession
+    max_concurrency: int
+
+    def __init__(  # noqa: PLR0913
+        self,
+        pipelines: Mapping[str, Pipeline | Sequence[Step | StepAlternative]],
+        *,
+        session: SaxonSession | None = None,
+        max_concurrency: int = 4,
+        socket_path: str | Path | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        """Initialize a PipelineServer, compile its pipelines and bind its socket.
+
+        Args:
+            pipelines (Mapping[str, Pipeline | Sequence[Step | StepAlternative]]): The pipelines by name; step sequences are compiled in the session of the server.
+            session (SaxonSession | None): The Saxon session of the server; a new session is used if omitted.
+            max_concurrency (int): The number of requests running a pipeline at the same time.
+            socket_path (str | Path | None): The Unix socket to listen on.
+            host (str): The host to listen on, unless a socket path is given.
+            port (int): The port to listen on, unless a socket path is given.
+
+        Raises:
+            ValueError: When `max_concurrency` is smaller than one.
+            FileExistsError: When the socket path exists, but is no socket.
+            PipelineError: When a pipeline fails to compile.
+        """
+        if max_concurrency < 1:
+            raise ValueError("The server must run at least one request at a time.")
+
+        self._owns_session = session is None
+        self.session = session or SaxonSession()
+        self.pipelines = {
+            name: steps if isinstance(steps, Pipeline) else Pipeline(steps, session=self.session)
+            for name, steps in pipelines.items()
+        }
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._recorders = {name: _Recorder() for name in self.pipelines}
+        self._thread: threading.Thread | None = None
+
+        self._server: socketserver.BaseServer
+        if socket_path is not None:
+            if Path(socket_path).exists() and not _is_socket(socket_path):
+                raise FileExistsError(f"{socket_path} exists and is no socket.")
+            # A stale socket of an earlier server which was not shut down
+            Path(socket_path).unlink(missing_ok=True)
+            self._server = _UnixHTTPServer(str(socket_path), _Handler)
+        else:
+            self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.pipeline_server = self  # type: ignore
+
+    @property
+    def address(self) -> str | tuple[str, int]:
+        """The address the server listens on.
+
+        Returns:
+            str | tuple[str, int]: The socket path, or the host and port.
+        """
+        address: str | tuple[str, int] = self._server.server_address  # type: ignore
+        return address if isinstance(address, str) else (address[0], address[1])
+
+    def run(self, name: str, documents: list[Any]) -> list[Any]:
+        """Apply a pipeline to documents, waiting for a free slot first.
+
+        Args:
+            name (str): The name of the pipeline.
+            documents (list[TContent]): The documents.
+
+        Returns:
+            list[TContent]: The results.
+
+        Raises:
+            KeyError: When there is no pipeline of this name.
+        """
+        pipeline = self.pipelines[name]
+        recorder = self._recorders[name]
+
+        queued = time.perf_counter()
+        with self._lock:
+            recorder.queued += 1
+        with self._slots:
+            started = time.perf_counter()
+            with self._lock:
+                recorder.queued -= 1
+                recorder.in_flight += 1
+            try:
+                results = list(pipeline(documents))
+            except Exception:
+                self._record(recorder, queued, started, documents=0, failed=True)
+                raise
+            self._record(recorder, queued, started, documents=len(documents), failed=False)
+        return results
+
+    def stats(self) -> dict[str, PipelineStats]:
+        """Return the request statistics of every pipeline.
+
+        Returns:
+            dict[str, PipelineStats]: The statistics by pipeline name.
+        """
+        with self._lock:
+            return {name: recorder.stats(name) for name, recorder in self._recorders.items()}
+
+    def serve_forever(self) -> None:
+        """Handle requests until `shutdown` is called."""
+        self._server.serve_forever()
+
+    def start(self) -> Self:
+        """Handle requests in a background thread.
+
+        Returns:
+            PipelineServer: The server itself.
+        """
+        self._thread = threading.Thread(
+            target=self.serve_forever, name="py-ductus-server", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def shutdown(self) -> None:
+        """Stop handling requests, close the socket and the session created by the server."""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+        if isinstance(self.address, str) and _is_socket(self.address):
+            Path(self.address).unlink()
+        if self._owns_session:
+            self.session.close()
+
+    def _record(
+        self, recorder: _Recorder, queued: float, started: float, documents: int, failed: bool
+    ) -> None:
+        finished = time.perf_counter()
+        with self._lock:
+            recorder.in_flight -= 1
+            if failed:
+                recorder.errors += 1
+            else:
+                recorder.requests += 1
+            recorder.documents += documents
+            recorder.queue_total += started - queued
+            recorder.queue_max = max(recorder.queue_max, started - queued)
+            recorder.latency_total += finished - started
+            recorder.latency_max = max(recorder.latency_max, finished - started)
+            recorder.latencies.append(finished - started)
+
+    def __enter__(self) -> Self:
+        """Start handling requests in a background thread.
+
+        Returns:
+            PipelineServer: The server itself.
+        """
+        return self.start()
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Shut the server down when leaving the context."""
+        self.shutdown()
+
+
+def _is_socket(path: str | Path) -> bool:
+    try:
+        return stat.S_ISSOCK(Path(path).stat().st_mode)
+    except FileNotFoundError:
+        return False
+
+
+class _UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        server: PipelineServer = self.server.pipeline_server  # type: ignore
+        if self.path == "/pipelines":
+            self._reply_json(HTTPStatus.OK, sorted(server.pipelines))
+        elif self.path == "/stats":
+            stats = {name: stats._asdict() for name, stats in server.stats().items()}
+            self._reply_json(HTTPStatus.OK, stats)
+        else:
+            self._reply_json(HTTPStatus.NOT_FOUND, {"error": f"Unknown path {self.path}."})
+
+    def do_POST(self) -> None:
+        server: PipelineServer = self.server.pipeline_server  # type: ignore
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        name = self.path.removeprefix("/pipelines/")
+        if not self.path.startswith("/pipelines/") or name not in server.pipelines:
+            self._reply_json(HTTPStatus.NOT_FOUND, {"error": f"Unknown pipeline {name}."})
+            return
+
+        batch = self.headers.get_content_type() == "application/json"
+        try:
+            documents = json.loads(body)["documents"] if batch else [decode_xml(body)]
+        except (ValueError, KeyError, TypeError):
+            self._reply_json(HTTPStatus.BAD_REQUEST, {"error": "Expected {'documents': [...]}."})
+            return
+
+        try:
+            results = server.run(name, documents)
+        except (StepError, PySaxonApiError) as error:
+            self._reply_json(HTTPStatus.UNPROCESSABLE_ENTITY, {"error": str(error)})
+            return
+        except Exception as error:
+            self._reply_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(error)})
+            return
+
+        if batch:
+            self._reply_json(HTTPStatus.OK, {"results": [_text(result) for result in results]})
+        elif len(results) != 1:
+            # A single document is answered with a single result; others need a batch
+            message = f"Pipeline {name} produced {len(results)} results for one document."
+            self._reply_json(HTTPStatus.UNPROCESSABLE_ENTITY, {"error": message})
+        elif isinstance(results[0], Buffer):
+            # Encoded results are sent as they are, their XML declaration names the encoding
+            self._reply(HTTPStatus.OK, bytes(results[0]), "application/xml", charset=None)
+        else:
+            self._reply(HTTPStatus.OK, str(results[0]).encode("utf-8"), "application/xml")
+
+    def _reply_json(self, status: HTTPStatus, data: Any) -> None:
+        self._reply(status, json.dumps(data).encode("utf-8"), "application/json")
+
+    def _reply(
+        self, status: HTTPStatus, body: bytes, content_type: str, charset: str | None = "utf-8"
+    ) -> None:
+        self.send_response(status)
+        self.send_header(
+            "Content-Type", f"{content_type}; charset={charset}" if charset else content_type
+        )
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self) -> str:
+        # Unix socket peers have no host
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "local"
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        # Requests are accounted for in the stats instead of a log line each
+        return
+
+
+def _text(result: Any) -> str:
+    return decode_xml(result) if isinstance(result, Buffer) else str(result)
+
+
+class ServerError(Exception):
+    """Error raised by a `PipelineClient`, when the server rejects a request.
+
+    Attributes:
+        status (int): The HTTP status of the response.
+    """
+
+    status: int
+
+    def __init__(self, status: int, message: str) -> None:
+        """Initialize a ServerError.
+
+        Args:
+            status (int): The HTTP status of the response.
+            message (str): The error message of the server.
+        """
+        super().__init__(f"The server answered {status}: {message}")
+        self.status = status
+
+
+class PipelineClient:
+    """A client of a `PipelineServer`."""
+
+    socket_path: str | None
+    host: str
+    port: int
+    timeout: float
+
+    def __init__(
+        self,
+        socket_path: str | Path | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        timeout: float = 60.0,
+    ) -> None:
+        """Initialize a PipelineClient.
+
+        Args:
+            socket_path (str | Path | None): The Unix socket of the server.
+            host (str): The host of the server, unless a socket path is given.
+            port (int): The port of the server, unless a socket path is given.
+            timeout (float): The timeout of a request in seconds.
+        """
+        self.socket_path = str(socket_path) if socket_path is not None else None
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+    def transform(self, pipeline: str, documents: str | Buffer | Sequence[str | Buffer]) -> Any:
+        """Apply a pipeline of the server to documents.
+
+        Encoded documents are sent as they are, or decoded in the encoding they
+        declare when several documents are sent.
+
+        Args:
+            pipeline (str): The name of the pipeline.
+            documents (str | bytes | Sequence[str | bytes]): A document, or several documents.
+
+        Returns:
+            str | list[str]: The result of the document, or the results of the documents.
+
+        Raises:
+            ServerError: When the server rejects the request.
+        """
+        if isinstance(documents, str | Buffer):
+            body = documents.encode("utf-8") if isinstance(documents, str) else bytes(documents)
+            return self._request("POST", f"/pipelines/{pipeline}", body, "application/xml")
+
+        texts = [_text(document) for document in documents]
+        body = json.dumps({"documents": texts}).encode("utf-8")
+        return self._request("POST", f"/pipelines/{pipeline}", body, "application/json")["results"]
+
+    def pipelines(self) -> list[str]:
+        """Return the names of the pipelines of the server.
+
+        Returns:
+            list[str]: The names.
+
+        Raises:
+            ServerError: When the server rejects the request.
+        """
+        return self._request("GET", "/pipelines")
+
+    def stats(self) -> dict[str, PipelineStats]:
+        """Return the request statistics of the server.
+
+        Returns:
+            dict[str, PipelineStats]: The statistics by pipeline name.
+
+        Raises:
+            ServerError: When the server rejects the request.
+        """
+        return {
+            name: PipelineStats(**stats) for name, stats in self._request("GET", "/stats").items()
+        }
+
+    def _request(
+        self, method: str, path: str, body: bytes | None = None, content_type: str | None = None
+    ) -> Any:
+        connection = (
+            _UnixHTTPConnection(self.socket_path, timeout=self.timeout)
+            if self.socket_path is not None
+            else http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        )
+        headers = {"Content-Type": content_type} if content_type is not None else {}
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            data = response.read()
+        finally:
+            connection.close()
+
+        is_json = response.getheader("Content-Type", "").startswith("application/json")
+        if response.status != HTTPStatus.OK:
+            message = json.loads(data)["error"] if is_json else data.decode("utf-8")
+            raise ServerError(response.status, message)
+        if is_json:
+            return json.loads(data)
+        # Results without a charset are decoded in the encoding they declare
+        charset = response.msg.get_content_charset()
+        return data.decode(charset) if charset else decode_xml(data)
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def load_pipelines(config: Mapping[str, Sequence[Mapping[str, Any]]]) -> dict[str, list[Step]]:
+    """Create the steps of named pipelines from a configuration.
+
+    Args:
+        config (Mapping[str, Sequence[Mapping[str, Any]]]): Pipeline names mapped to lists of `{"xslt": path, "params": {...}}`.
+
+    Returns:
+        dict[str, list[Step]]: The XSL steps of every pipeline.
+
+    Raises:
+        KeyError: When a step has no stylesheet.
+    """
+    return {
+        name: [
+            XSL(
+                xslt=Path(step["xslt"]),
+                params=[_param(key, value) for key, value in step.get("params", {}).items()],
+            )
+            for step in steps
+        ]
+        for name, steps in config.items()
+    }
+
+
+def _param(name: str, value: Any) -> XSLParam:
+    if isinstance(value, dict):
+        return XSLMapParam(name=name, value=value)
+    if isinstance(value, list):
+        return XSLArrayParam(name=name, value=value)
+    return XSLAtomicParam(name=name, value=value)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Run a pipeline server until it is interrupted.
+
+    Args:
+        argv (Sequence[str] | None): The command line arguments; `sys.argv` is used if omitted.
+    """
+    parser = argparse.ArgumentParser(prog="python -m py_ductus.server", description=__doc__)
+    parser.add_argument("--config", type=Path, required=True, help="JSON file of the pipelines")
+    parser.add_argument("--socket", type=Path, help="Unix socket to listen on")
+    parser.add_argument("--host", default="127.0.0.1", help="host to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="port to listen on")
+    parser.add_argument("--max-concurrency", type=int, default=4, help="concurrent pipeline runs")
+    args = parser.parse_args(argv)
+
+    server = PipelineServer(
+        load_pipelines(json.loads(args.config.read_text())),
+        max_concurrency=args.max_concurrency,
+        socket_path=args.socket,
+        host=args.host,
+        port=args.port,
+    )
+    print(f"Serving {', '.join(server.pipelines)} on {server.address}")
+    # Service managers stop the server with SIGTERM, which should clean up like Ctrl-C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Memory budgets for the intermediate results of pipelines, which spill to disk when exceeded."""
+
+import gzip
+import pickle
+import sys
+import tempfile
+import threading
+from collections import deque
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import IO, Any
+
+from py_ductus.common.document import Document
+
+
+class MemoryBudget:
+    """A limit for the intermediate results of a pipeline held in memory, and a report of its use.
+
+    Passed to `process(..., memory_budget=...)`, the results of every step are
+    collected in a `SpillBuffer`. When the values held by all buffers exceed
+    `limit` bytes, the buffer being filled writes its values to a compressed
+    temporary file, from which the next step reads them back lazily. Sizes are
+    estimated with `sys.getsizeof`, and the `size` of `Document`s.
+
+    Attributes:
+        limit (int): The budget in bytes.
+        directory (Path | None): The directory of the temporary files; the system default if None.
+        compresslevel (int): The gzip compression level of the temporary files.
+        held (int): The bytes currently held in memory by all buffers.
+        peak (int): The highest number of bytes held in memory at once.
+        spills (int): The number of times a buffer was written to disk.
+        spilled_items (int): The number of values written to disk.
+        spilled_bytes (int): The estimated in-memory size of the values written to disk.
+        compressed_bytes (int): The size of the temporary files.
+    """
+
+    limit: int
+    directory: Path | None
+    compresslevel: int
+    held: int
+    peak: int
+    spills: int
+    spilled_items: int
+    spilled_bytes: int
+    compressed_bytes: int
+
+    def __init__(
+        self, limit: int, directory: str | Path | None = None, compresslevel: int = 1
+    ) -> None:
+        """Initialize a MemoryBudget.
+
+        Args:
+            limit (int): The budget in bytes.
+            directory (str | Path | None): The directory of the temporary files; the system default if omitted.
+            compresslevel (int): The gzip compression level of the temporary files, 1 (fast) to 9 (small).
+
+        Raises:
+            ValueError: When `limit` is negative.
+        """
+        if limit < 0:
+            raise ValueError("A memory budget can not be negative.")
+
+        self.limit = limit
+        self.directory = Path(directory) if directory is not None else None
+        self.compresslevel = compresslevel
+        self.held = 0
+        self.peak = 0
+        self.spills = 0
+        self.spilled_items = 0
+        self.spilled_bytes = 0
+        self.compressed_bytes = 0
+        self._lock = threading.Lock()
+
+    def buffer(self, values: Iterable[Any]) -> "SpillBuffer":
+        """Collect values in a buffer, which spills to disk when the budget is exceeded.
+
+        Args:
+            values (Iterable[TContent]): The values, e.g. the lazy results of a step.
+
+        Returns:
+            SpillBuffer: The filled buffer.
+        """
+        buffer = SpillBuffer(self)
+        for value in values:
+            buffer.append(value)
+        return buffer
+
+    def _hold(self, size: int) -> bool:
+        # Returns whether the budget is exceeded
+        with self._lock:
+            self.held += size
+            self.peak = max(self.peak, self.held)
+            return self.held > self.limit
+
+    def _release(self, size: int) -> None:
+        with self._lock:
+            self.held -= size
+
+    def _spilled(self, items: int, size: int, compressed: int) -> None:
+        with self._lock:
+            self.spills += 1
+            self.spilled_items += items
+            self.spilled_bytes += size
+            self.compressed_bytes += compressed
+
+    def __repr__(self) -> str:
+        """Return a summary of the budget and its use."""
+        return (
+            f"MemoryBudget(limit={self.limit}, peak={self.peak}, spills={self.spills}, "
+            f"spilled_items={self.spilled_items}, spilled_bytes={self.spilled_bytes}, "
+            f"compressed_bytes={self.compressed_bytes})"
+        )
+
+
+class SpillBuffer(Iterable[Any]):
+    """The values between two steps, held in memory or in a compressed temporary file.
+
+    Values are appended in order. Once the budget is exceeded, the values held in
+    memory are written to the file; reading returns the values of the file first,
+    then the values still in memory, and releases them from the budget. A buffer
+    can be read once; its file is deleted when it has been read.
+    """
+
+    def __init__(self, budget: MemoryBudget) -> None:
+        """Initialize a SpillBuffer.
+
+        Args:
+            budget (MemoryBudget): The budget the buffer accounts its values to.
+        """
+        self._budget = budget
+        self._memory: deque[tuple[Any, int]] = deque()
+        self._file: IO[bytes] | None = None
+        self._writer: gzip.GzipFile | None = None
+        self._length = 0
+
+    def append(self, value: Any) -> None:
+        """Add a value, spilling the values in memory if the budget is exceeded.
+
+        Args:
+            value (TContent): The value.
+        """
+        size = _size(value)
+        self._memory.append((value, size))
+        self._length += 1
+        if self._budget._hold(size):
+            self._spill()
+
+    def __len__(self) -> int:
+        """Return the number of values in the buffer."""
+        return self._length
+
+    def __iter__(self) -> Iterator[Any]:
+        """Read the values in order, releasing them from memory and disk.
+
+        Returns:
+            Iterator[TContent]: The values.
+        """
+        if self._file is not None:
+            file, self._file = self._file, None
+            self._close_writer()
+            file.seek(0)
+            with file, gzip.GzipFile(fileobj=file, mode="rb") as reader:
+                while True:
+                    try:
+                        yield pickle.load(reader)
+                    except EOFError:
+                        break
+
+        while self._memory:
+            value, size = self._memory.popleft()
+            self._budget._release(size)
+            yield value
+
+    def _spill(self) -> None:
+        if self._file is None:
+            self._file = tempfile.TemporaryFile(  # noqa: SIM115
+                dir=self._budget.directory, prefix="py-ductus-"
+            )
+            self._writer = gzip.GzipFile(
+                fileobj=self._file, mode="wb", compresslevel=self._budget.compresslevel
+            )
+
+        start = self._file.tell()
+        items = len(self._memory)
+        size = 0
+        while self._memory:
+            value, value_size = self._memory.popleft()
+            pickle.dump(value, self._writer, protocol=pickle.HIGHEST_PROTOCOL)  # type: ignore
+            size += value_size
+        self._writer.flush()  # type: ignore
+        self._budget._release(size)
+        self._budget._spilled(items=items, size=size, compressed=self._file.tell() - start)
+
+    def _close_writer(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def _size(value: Any) -> int:
+    if isinstance(value, Document):
+        return value.size
+    return sys.getsizeof(value)
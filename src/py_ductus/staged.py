@@ -0,0 +1,230 @@
+"""Staged execution of pipelines: every step in its own thread, connected by bounded queues."""
+
+import contextvars
+import queue
+import threading
+import weakref
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from contextlib import AbstractContextManager
+from typing import Any, NamedTuple
+
+_DONE = object()
+_POLL_SECONDS = 0.05
+
+
+class StageStats(NamedTuple):
+    """The state of the input queue of a stage.
+
+    A stage whose input queue is full most of the time is the bottleneck of the
+    pipeline; the queue named "output" holds results not yet consumed by the caller.
+
+    Attributes:
+        step (str): The name of the step, or "output".
+        depth (int): The number of values currently waiting in the queue.
+        max_depth (int): The highest number of values seen waiting in the queue.
+        capacity (int): The maximum number of values in the queue.
+        items (int): The number of values passed through the queue so far.
+    """
+
+    step: str
+    depth: int
+    max_depth: int
+    capacity: int
+    items: int
+
+
+class _Queue:
+    """A bounded queue, which records its depth."""
+
+    def __init__(self, name: str, capacity: int) -> None:
+        self.name = name
+        self.queue: queue.Queue[Any] = queue.Queue(maxsize=capacity)
+        self.capacity = capacity
+        self.max_depth = 0
+        self.items = 0
+
+    def stats(self) -> StageStats:
+        return StageStats(
+            step=self.name,
+            depth=self.queue.qsize(),
+            max_depth=self.max_depth,
+            capacity=self.capacity,
+            items=self.items,
+        )
+
+
+class _StoppedError(Exception):
+    """Raised inside stage threads when the run is stopped."""
+
+
+class _Stages:
+    """The queues and stop signal shared by the threads of a run.
+
+    Stage threads refer to this object only, never to their `StagedRun`, so a run
+    dropped by its consumer can be collected and stop its threads.
+    """
+
+    def __init__(
+        self, queues: list[_Queue], context: Callable[[], AbstractContextManager[Any]] | None
+    ) -> None:
+        self.queues = queues
+        self.context = context
+        self.stop = threading.Event()
+        self.error: BaseException | None = None
+
+    def feed(self, values: Iterable[Any], outbox: _Queue) -> None:
+        try:
+            for value in values:
+                self.put(outbox, value)
+            self.put(outbox, _DONE)
+        except _StoppedError:
+            pass
+        except BaseException as error:
+            self.fail(error)
+
+    def run_stage(
+        self, apply: Callable[[Iterable[Any]], Iterable[Any]], inbox: _Queue, outbox: _Queue
+    ) -> None:
+        try:
+            if self.context is None:
+                self.forward(apply(self.drain(inbox)), outbox)
+            else:
+                with self.context():
+                    self.forward(apply(self.drain(inbox)), outbox)
+            self.put(outbox, _DONE)
+        except _StoppedError:
+            pass
+        except BaseException as error:
+            self.fail(error)
+
+    def forward(self, values: Iterable[Any], outbox: _Queue) -> None:
+        for value in values:
+            self.put(outbox, value)
+
+    def drain(self, inbox: _Queue) -> Iterator[Any]:
+        while (value := self.get(inbox)) is not _DONE:
+            yield value
+
+    def get(self, source: _Queue) -> Any:
+        while True:
+            if self.stop.is_set() and source.queue.empty():
+                raise _StoppedError
+            try:
+                return source.queue.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                continue
+
+    def put(self, target: _Queue, value: Any) -> None:
+        while True:
+            if self.stop.is_set():
+                raise _StoppedError
+            try:
+                target.queue.put(value, timeout=_POLL_SECONDS)
+            except queue.Full:
+                continue
+            if value is not _DONE:
+                target.items += 1
+                target.max_depth = max(target.max_depth, target.queue.qsize())
+            return
+
+    def fail(self, error: BaseException) -> None:
+        if self.error is None:
+            self.error = error
+        self.stop.set()
+
+
+class StagedRun(Iterator[Any]):
+    """An iterator over the results of a pipeline whose steps run concurrently.
+
+    Every step runs in its own thread and reads its values lazily from a bounded
+    queue filled by the previous step, so a slow I/O-bound step overlaps with
+    CPU-bound steps, and a fast producer blocks instead of growing memory when the
+    queue of its consumer is full. The first error raised by a stage stops all
+    stages and is raised to the caller. A run which is dropped before all results
+    are consumed stops its stages, as `close()` does.
+    """
+
+    def __init__(
+        self,
+        input_values: Iterable[Any],
+        stages: Sequence[tuple[str, Callable[[Iterable[Any]], Iterable[Any]]]],
+        queue_size: int = 64,
+        context: Callable[[], AbstractContextManager[Any]] | None = None,
+    ) -> None:
+        """Initialize a StagedRun and start its threads.
+
+        Args:
+            input_values (Iterable[TContent]): The values to process.
+            stages (Sequence[tuple[str, Callable[[Iterable[TContent]], Iterable[TContent]]]]): The name and the lazy runner of every step.
+            queue_size (int): The capacity of every queue.
+            context (Callable[[], AbstractContextManager] | None): Entered by every stage thread, e.g. to activate a session.
+
+        Raises:
+            ValueError: When `queue_size` is smaller than one.
+        """
+        if queue_size < 1:
+            raise ValueError("Queues must hold at least one value.")
+
+        queues = [_Queue(name, queue_size) for name, _ in stages]
+        queues.append(_Queue("output", queue_size))
+        self._stages = _Stages(queues, context)
+        self._finished = False
+        weakref.finalize(self, self._stages.stop.set)
+
+        self._threads = [
+            _start(self._stages.feed, input_values, queues[0], name="input"),
+            *(
+                _start(self._stages.run_stage, apply, inbox, outbox, name=name)
+                for (name, apply), inbox, outbox in zip(stages, queues, queues[1:], strict=False)
+            ),
+        ]
+
+    @property
+    def stages(self) -> list[StageStats]:
+        """The state of the input queue of every stage, followed by the output queue.
+
+        Returns:
+            list[StageStats]: The queue states, in pipeline order.
+        """
+        return [stage_queue.stats() for stage_queue in self._stages.queues]
+
+    def __next__(self) -> Any:
+        """Return the next result.
+
+        Returns:
+            TContent: The next result.
+
+        Raises:
+            StopIteration: When all results are consumed.
+        """
+        if self._finished:
+            raise StopIteration
+
+        try:
+            value = self._stages.get(self._stages.queues[-1])
+        except _StoppedError:
+            value = _DONE
+
+        if value is _DONE:
+            self.close()
+            if self._stages.error is not None:
+                raise self._stages.error
+            raise StopIteration
+        return value
+
+    def close(self) -> None:
+        """Stop all stages and wait for their threads."""
+        self._finished = True
+        self._stages.stop.set()
+        for thread in self._threads:
+            thread.join()
+
+
+def _start(target: Callable[..., None], *args: Any, name: str) -> threading.Thread:
+    # Stages see the context variables (session, observer) of the caller
+    context = contextvars.copy_context()
+    thread = threading.Thread(
+        target=context.run, args=(target, *args), name=f"py-ductus-{name}", daemon=True
+    )
+    thread.start()
+    return thread
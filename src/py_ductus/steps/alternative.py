@@ -0,0 +1,127 @@
+"""Per-value execution of step alternatives."""
+
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any
+
+from py_ductus.common.document import Document
+from py_ductus.steps.protocol import StepAlternative, StreamingStep
+
+FallbackHandler = Callable[[StepAlternative, Any, Exception], None]
+
+_MISSING = object()
+
+
+class FallbackCounter:
+    """A fallback handler, which counts the values routed to fallback steps.
+
+    Attributes:
+        count (int): The number of values processed by a fallback step.
+        errors (Counter[str]): The number of fallbacks per exception type.
+    """
+
+    count: int
+    errors: Counter[str]
+
+    def __init__(self) -> None:
+        """Initialize a FallbackCounter."""
+        self.count = 0
+        self.errors = Counter()
+
+    def __call__(self, alternative: StepAlternative, value: Any, error: Exception) -> None:
+        """Count a value routed to the fallback step.
+
+        Args:
+            alternative (StepAlternative): The alternative whose main step failed.
+            value (TContent): The value which is processed by the fallback step.
+            error (Exception): The error raised by the main step.
+        """
+        self.count += 1
+        self.errors[type(error).__name__] += 1
+
+
+def apply_alternative(
+    alternative: StepAlternative,
+    values: Iterable[Any],
+    on_fallback: FallbackHandler | None = None,
+) -> Iterator[Any]:
+    """Apply an alternative lazily, routing only the failing values to the fallback step.
+
+    Streaming main steps process the values in one stream, which is resumed with the
+    remaining values after a failure; they must yield one result per value. Other
+    main steps are called with one value at a time. When a streaming main step fails
+    before processing any value (e.g. because its stylesheet does not compile), all
+    remaining values are routed to the fallback step. `Document`s are routed to
+    the fallback step as copies, which carry the error of the main step.
+
+    Args:
+        alternative (StepAlternative): The alternative to apply.
+        values (Iterable[TContent]): The values to process.
+        on_fallback (FallbackHandler | None): Called for every value routed to the fallback step.
+
+    Returns:
+        Iterator[TContent]: The processed values, in input order.
+    """
+    remaining = _RecordingIterator(values)
+
+    def fallback(value: Any, error: Exception) -> Iterable[Any]:
+        if isinstance(value, Document):
+            # The input may be shared, e.g. by the branches of a Branch, so the error goes on a copy
+            value = value.copy()
+            value.error = error
+        if on_fallback is not None:
+            on_fallback(alternative, value, error)
+        return alternative.fallback([value])
+
+    if isinstance(alternative.main, StreamingStep):
+        return _apply_streaming(alternative.main, remaining, fallback)
+    return _apply_per_value(alternative, remaining, fallback)
+
+
+def _apply_per_value(
+    alternative: StepAlternative,
+    values: Iterable[Any],
+    fallback: Callable[[Any, Exception], Iterable[Any]],
+) -> Iterator[Any]:
+    for value in values:
+        try:
+            results = list(alternative.main([value]))
+        except Exception as error:
+            results = list(fallback(value, error))
+        yield from results
+
+
+def _apply_streaming(
+    main: StreamingStep,
+    remaining: "_RecordingIterator",
+    fallback: Callable[[Any, Exception], Iterable[Any]],
+) -> Iterator[Any]:
+    while True:
+        try:
+            results = main.stream(remaining)
+        except Exception as error:
+            for value in remaining:
+                yield from fallback(value, error)
+            return
+
+        try:
+            yield from results
+            return
+        except Exception as error:
+            if remaining.last is _MISSING:
+                raise
+            yield from fallback(remaining.last, error)
+
+
+class _RecordingIterator(Iterator[Any]):
+    """An iterator, which remembers the value it returned last."""
+
+    def __init__(self, values: Iterable[Any]) -> None:
+        self._values = iter(values)
+        self.last: Any = _MISSING
+
+    def __next__(self) -> Any:
+        # Errors of the input itself leave `last` unset, so they are not blamed on a value
+        self.last = _MISSING
+        self.last = next(self._values)
+        return self.last
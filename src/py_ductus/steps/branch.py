@@ -0,0 +1,207 @@
+"""Branch steps, which fan values out to several sub-pipelines and join their results."""
+
+import contextlib
+import contextvars
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any
+
+from saxonche import PySaxonApiError
+
+from py_ductus.common.document import Document
+from py_ductus.instrumentation import Observer, current_observer
+from py_ductus.main import process
+from py_ductus.steps.alternative import FallbackHandler
+from py_ductus.steps.protocol import (
+    Step,
+    StepAlternative,
+    SubPipeline,
+    as_steps,
+    preparable_steps,
+    step_name,
+)
+from py_ductus.steps.xsl.session import SaxonSession, current_session, use_session
+
+
+class Branch:
+    """A step, which feeds every value into several sub-pipelines and joins their results.
+
+    The branches run concurrently, one thread per branch, on chunks of
+    `chunk_size` values. Every branch must produce one result per value; the
+    results of a value are joined into a tuple, or into a dict if the branches are
+    given as a mapping of names to sub-pipelines.
+
+    With `share_parse`, values are wrapped in `Document`s and parsed once by the
+    processor of the session, so XSL steps in all branches transform the same
+    node. Text values are unwrapped again in the results. It is off by default, as
+    steps expecting text, e.g. paths, would receive `Document`s.
+    """
+
+    _name: str
+    branches: dict[str, tuple[Step | StepAlternative, ...]]
+    keyed: bool
+    chunk_size: int
+    share_parse: bool
+    session: SaxonSession | None
+    on_fallback: FallbackHandler | None
+
+    def __init__(  # noqa: PLR0913
+        self,
+        branches: Sequence[SubPipeline] | Mapping[str, SubPipeline],
+        *,
+        chunk_size: int = 64,
+        share_parse: bool = False,
+        name: str | None = None,
+        session: SaxonSession | None = None,
+        on_fallback: FallbackHandler | None = None,
+    ) -> None:
+        """Initialize a Branch.
+
+        Args:
+            branches (Sequence[SubPipeline] | Mapping[str, SubPipeline]): The sub-pipelines, each a step or a sequence of steps; a mapping joins the results into dicts.
+            chunk_size (int): The number of values processed by the branches at once.
+            share_parse (bool): Whether to parse values once for all branches; enable it for branches of XML steps, e.g. `XSL` or `XPath`.
+            name (str | None): The name of the step; derived from the branches if omitted.
+            session (SaxonSession | None): The Saxon session to parse and run in; the current session is used if omitted.
+            on_fallback (FallbackHandler | None): Called for every value routed to the fallback step of an alternative in a branch.
+
+        Raises:
+            ValueError: When no branch is given or `chunk_size` is smaller than one.
+        """
+        if not branches:
+            raise ValueError("A branch step needs at least one branch.")
+        if chunk_size < 1:
+            raise ValueError("Chunks must hold at least one value.")
+
+        self.keyed = isinstance(branches, Mapping)
+        named = (
+            branches.items()
+            if isinstance(branches, Mapping)
+            else ((str(index), steps) for index, steps in enumerate(branches))
+        )
+        self.branches = {key: as_steps(steps) for key, steps in named}
+        self.chunk_size = chunk_size
+        self.share_parse = share_parse
+        self.session = session
+        self.on_fallback = on_fallback
+        self._name = name or "branch({})".format(
+            ",".join(
+                "+".join(step_name(step) for step in steps) for steps in self.branches.values()
+            )
+        )
+
+    def __call__(self, values: Iterable[Any]) -> Iterable[Any]:
+        """Process the values with all branches.
+
+        Args:
+            values (list[TContent]): The input values.
+
+        Returns:
+            list[tuple | dict]: The joined results of every value.
+
+        Raises:
+            StepError: When a step of a branch fails.
+            ValueError: When a branch does not produce one result per value.
+        """
+        return list(self.stream(values))
+
+    def stream(self, values: Iterable[Any]) -> Iterator[Any]:
+        """Process the values with all branches, one chunk at a time.
+
+        Args:
+            values (Iterable[TContent]): The input values.
+
+        Returns:
+            Iterator[tuple | dict]: The joined results of every value, in input order.
+
+        Raises:
+            StepError: When a step of a branch fails.
+            ValueError: When a branch does not produce one result per value.
+        """
+        session = self.session or current_session()
+        observer = current_observer()
+
+        with ThreadPoolExecutor(
+            max_workers=len(self.branches), thread_name_prefix="py-ductus-branch"
+        ) as pool:
+            iterator = iter(values)
+            while chunk := list(islice(iterator, self.chunk_size)):
+                documents = (
+                    [_shared(value, session) for value in chunk] if self.share_parse else chunk
+                )
+                futures = {
+                    key: pool.submit(
+                        contextvars.copy_context().run,
+                        self._run_branch,
+                        key,
+                        steps,
+                        documents,
+                        session,
+                        observer,
+                    )
+                    for key, steps in self.branches.items()
+                }
+                results = {key: future.result() for key, future in futures.items()}
+
+                for index, value in enumerate(chunk):
+                    joined = {
+                        key: _unwrap(value, branch_results[index])
+                        for key, branch_results in results.items()
+                    }
+                    yield joined if self.keyed else tuple(joined.values())
+
+    def prepare(self, session: SaxonSession | None = None) -> None:
+        """Compile the resources of all branches.
+
+        Args:
+            session (SaxonSession | None): The Saxon session of the pipeline.
+        """
+        session = self.session or session
+        for steps in self.branches.values():
+            for _, part in preparable_steps(steps):
+                part.prepare(session)
+
+    def _run_branch(
+        self,
+        key: str,
+        steps: tuple[Step | StepAlternative, ...],
+        documents: list[Any],
+        session: SaxonSession,
+        observer: Observer | None,
+    ) -> list[Any]:
+        with use_session(session):
+            results = list(
+                process(documents, steps=steps, on_fallback=self.on_fallback, observer=observer)
+            )
+
+        if len(results) != len(documents):
+            raise ValueError(
+                f"Branch '{key}' of step '{self.name}' must produce one result per value."
+            )
+        return results
+
+    @property
+    def name(self) -> str:
+        """The name of the step.
+
+        Returns:
+            str: The name of the step.
+        """
+        return self._name
+
+
+def _shared(value: Any, session: SaxonSession) -> Any:
+    if isinstance(value, str):
+        value = Document(text=value)
+    if isinstance(value, Document):
+        # Parse up front, so the branches do not race to parse the same document
+        with contextlib.suppress(PySaxonApiError):
+            value.node(session.processor)
+    return value
+
+
+def _unwrap(value: Any, result: Any) -> Any:
+    if isinstance(value, str) and isinstance(result, Document):
+        return result.text
+    return result
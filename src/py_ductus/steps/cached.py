@@ -0,0 +1,298 @@
+"""A content-addressed on-disk cache for step results."""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any, Protocol, runtime_checkable
+
+from py_ductus.common import serialization
+from py_ductus.common.document import Document
+from py_ductus.common.encoding import Buffer
+from py_ductus.steps.protocol import PreparableStep, Step
+
+
+@runtime_checkable
+class Fingerprinted(Protocol):
+    """Protocol for steps, which can describe their configuration as a fingerprint."""
+
+    def fingerprint(self, deterministic: bool = False) -> str | None:
+        """Return a fingerprint of everything that determines the results of the step.
+
+        Args:
+            deterministic (bool): Whether the caller declares inputs which are not part of the fingerprint (e.g. dynamic params) as deterministic.
+
+        Returns:
+            str | None: The fingerprint, or None if the results can not be cached.
+        """
+        ...
+
+
+class DiskStore:
+    """A local store of cached values, evicting the least recently used files.
+
+    Entries are stored as one file per key below `directory`. Reading an entry
+    updates its modification time, which orders the eviction.
+    """
+
+    directory: Path
+    max_bytes: int
+
+    def __init__(self, directory: str | Path, max_bytes: int = 1 << 30) -> None:
+        """Initialize a DiskStore.
+
+        Args:
+            directory (str | Path): The directory of the store; created if missing.
+            max_bytes (int): The size of all entries, above which entries are evicted.
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = sum(path.stat().st_size for path in self._entries())
+
+    @property
+    def size(self) -> int:
+        """The size of all entries written or found by this store.
+
+        Returns:
+            int: The size in bytes.
+        """
+        return self._size
+
+    def get(self, key: str) -> bytes | None:
+        """Read an entry.
+
+        Args:
+            key (str): The key of the entry.
+
+        Returns:
+            bytes | None: The stored data, or None if there is no entry.
+        """
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            _touch(path)
+        except FileNotFoundError:
+            return None
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Write an entry, evicting old entries when the store grows beyond `max_bytes`.
+
+        Args:
+            key (str): The key of the entry.
+            data (bytes): The data to store.
+        """
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+
+        # Write atomically, so concurrent readers never see partial entries
+        with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as file:
+            file.write(data)
+        previous = path.stat().st_size if path.exists() else 0
+        Path(file.name).replace(path)
+        _touch(path)
+
+        with self._lock:
+            self._size += len(data) - previous
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            for path in self._entries():
+                path.unlink(missing_ok=True)
+            self._size = 0
+
+    def _evict(self) -> None:
+        # Evict down to 90% of the budget, so not every write has to scan the store
+        target = self.max_bytes * 9 // 10
+        entries = sorted(
+            ((path.stat().st_mtime_ns, path) for path in self._entries()),
+            key=lambda entry: entry[0],
+        )
+        for _, path in entries:
+            if self._size <= target:
+                break
+            size = path.stat().st_size
+            path.unlink(missing_ok=True)
+            self._size -= size
+
+    def _entries(self) -> Iterator[Path]:
+        return (path for path in self.directory.glob("??/*") if path.is_file())
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / key
+
+
+def _dump(result: Any) -> bytes | None:
+    try:
+        return serialization.dumps(result).encode("utf-8")
+    except (TypeError, ValueError):
+        return None
+
+
+def _load(data: bytes) -> Any:
+    try:
+        return serialization.loads(data)
+    except ValueError:
+        # Entries of another format, e.g. of an older version, are recomputed
+        return None
+
+
+def _restore(value: Any, result: Any) -> Any:
+    # Results of documents are derived from their input again
+    if isinstance(result, Document):
+        return (
+            value.derive(result.text, encoding=result.encoding)
+            if isinstance(value, Document)
+            else result.text
+        )
+    if isinstance(value, Document) and isinstance(result, str):
+        return value.derive(result)
+    return result
+
+
+def _touch(path: Path) -> None:
+    # File systems set coarse timestamps, an explicit one keeps the eviction order exact
+    now = time.time_ns()
+    os.utime(path, ns=(now, now))
+
+
+class CachedStep:
+    """A step wrapper, which skips the wrapped step for values it has processed before.
+
+    Results are keyed by the fingerprint of the wrapped step and a hash of each input
+    value, for `Document`s their content hash. The wrapped step must produce exactly
+    one result per value. Steps whose fingerprint is None, e.g. `XSL` steps with
+    dynamic params that are not declared deterministic, are not cached.
+
+    Results are stored as tagged JSON, see `py_ductus.common.serialization`, so
+    reading a shared store never runs code; results which can not be encoded, e.g.
+    XDM values, are passed on but not cached.
+    """
+
+    step: Step
+    store: DiskStore
+    hits: int
+    misses: int
+
+    def __init__(
+        self,
+        step: Step,
+        store: DiskStore,
+        fingerprint: str | None = None,
+        deterministic: bool = False,
+    ) -> None:
+        """Initialize a CachedStep.
+
+        Args:
+            step (Step): The step to cache.
+            store (DiskStore): The store of the cached results.
+            fingerprint (str | None): The fingerprint of the step; required for steps which are not `Fingerprinted`.
+            deterministic (bool): Declare inputs of the step which are not part of its fingerprint as deterministic.
+
+        Raises:
+            TypeError: When no fingerprint is given for a step which is not `Fingerprinted`.
+        """
+        if fingerprint is None and not isinstance(step, Fingerprinted):
+            raise TypeError(f"Step '{step.name}' has no fingerprint, pass one explicitly.")
+
+        self.step = step
+        self.store = store
+        self._fingerprint = (
+            fingerprint
+            if fingerprint is not None
+            else step.fingerprint(deterministic=deterministic)  # type: ignore
+        )
+        self._name = f"cached({step.name})"
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cacheable(self) -> bool:
+        """Whether the results of the wrapped step are cached.
+
+        Returns:
+            bool: True if the wrapped step has a fingerprint.
+        """
+        return self._fingerprint is not None
+
+    def __call__(self, values: Iterable[Any]) -> Iterable[Any]:
+        """Process the values, running the wrapped step only for values not in the cache.
+
+        Args:
+            values (Iterable[TContent]): The values to process.
+
+        Returns:
+            list[TContent]: The processed values.
+
+        Raises:
+            ValueError: When the wrapped step does not produce one result per value.
+        """
+        if not self.cacheable:
+            return self.step(values)
+
+        values = list(values)
+        keys = [self._key(value) for value in values]
+        results: list[Any] = []
+        missing: list[int] = []
+
+        for index, key in enumerate(keys):
+            data = self.store.get(key)
+            stored = _load(data) if data is not None else None
+            if stored is None:
+                missing.append(index)
+                results.append(None)
+            else:
+                results.append(_restore(values[index], stored))
+
+        self.hits += len(values) - len(missing)
+        self.misses += len(missing)
+        if not missing:
+            return results
+
+        computed = list(self.step([values[index] for index in missing]))
+        if len(computed) != len(missing):
+            raise ValueError(f"Step '{self.step.name}' must produce one result per value.")
+
+        for index, result in zip(missing, computed, strict=True):
+            data = _dump(result)
+            if data is not None:
+                self.store.put(keys[index], data)
+            results[index] = result
+
+        return results
+
+    def prepare(self, session: Any = None) -> None:
+        """Prepare the wrapped step, if it is a `PreparableStep`.
+
+        Args:
+            session (SaxonSession | None): The Saxon session of the pipeline.
+        """
+        if isinstance(self.step, PreparableStep):
+            self.step.prepare(session)
+
+    def _key(self, value: Any) -> str:
+        digest = hashlib.sha256(f"{self._fingerprint}\0{type(value).__name__}\0".encode())
+        if isinstance(value, Document):
+            digest.update(value.content_hash.encode())
+        elif isinstance(value, Buffer):
+            digest.update(value)
+        else:
+            digest.update(value.encode("utf-8") if isinstance(value, str) else repr(value).encode())
+        return digest.hexdigest()
+
+    @property
+    def name(self) -> str:
+        """The name of the step.
+
+        Returns:
+            str: The name of the step.
+        """
+        return self._name
@@ -1,13 +1,24 @@
 """Error classes for steps."""
 
-from typing import Generic
+import pickle
+from typing import Any, Generic
 
 from py_ductus.common import types
+from py_ductus.common.document import Document
+from py_ductus.common.encoding import Buffer
 from py_ductus.steps.protocol import Step
 
 
 class StepError(Exception, Generic[types.TContent]):
-    """Error raised when a step fails processing."""
+    """Error raised when a step fails processing.
+
+    Attributes:
+        step_name (str): The name of the step that raised the error.
+        value (TContent): The value that caused the error.
+    """
+
+    step_name: str
+    value: types.TContent
 
     def __init__(self, step: Step, value: types.TContent) -> None:
         """Initialize a StepError.
@@ -17,4 +28,77 @@ class StepError(Exception, Generic[types.TContent]):
             step (Step): The step that raised the error.
             value (T): The value that caused the error.
         """
-        super().__init__(f"Error while applying step '{step.name}' to input value {value}.")
+        super().__init__(
+            f"Error while applying step '{step.name}' to input value {_describe(value)}."
+        )
+        self.step_name = step.name
+        self.value = value
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        """Support pickling, so errors raised in worker processes reach the caller."""
+        return (_restore_step_error, (type(self), self.args, dict(self.__dict__)))
+
+
+class StepTimeoutError(StepError):
+    """Error raised when a step exceeds its time budget for a value.
+
+    Attributes:
+        step_name (str): The name of the step that raised the error.
+        value (TContent): The value that caused the error.
+        timeout (float): The time budget in seconds.
+    """
+
+    timeout: float
+
+    def __init__(self, step: Step, value: Any, timeout: float) -> None:
+        """Initialize a StepTimeoutError.
+
+        Args:
+            step (Step): The step that exceeded its time budget.
+            value (T): The value that was cancelled.
+            timeout (float): The time budget in seconds.
+        """
+        super().__init__(step=step, value=value)
+        description = _describe(value)
+        self.args = (
+            f"Step '{step.name}' exceeded its time budget of {timeout}s for input value {description}.",
+        )
+        self.timeout = timeout
+
+
+def portable_error(error: Exception) -> Exception:
+    """Return an error, which can be sent to another process.
+
+    Args:
+        error (Exception): The error raised in a worker process.
+
+    Returns:
+        Exception: The error itself if it can be pickled, otherwise a RuntimeError with its message.
+    """
+    try:
+        pickle.dumps(error)
+    except Exception:
+        # Saxon errors can not be pickled, keep at least their message
+        return RuntimeError(f"{type(error).__name__}: {error}")
+    return error
+
+
+def _restore_step_error(
+    cls: type[StepError], args: tuple[Any, ...], state: dict[str, Any]
+) -> StepError:
+    error = cls.__new__(cls)
+    Exception.__init__(error, *args)
+    error.__dict__.update(state)
+    return error
+
+
+def _describe(value: Any) -> str:
+    # Buffers and documents may be huge, they should not be dumped into messages
+    if isinstance(value, Document):
+        if value.origin is not None:
+            return f"<Document from {value.origin}>"
+        return f"<Document of size {value.size}>"
+    if isinstance(value, Buffer):
+        with memoryview(value) as view:
+            return f"<{type(value).__name__} of {view.nbytes} bytes>"
+    return str(value)
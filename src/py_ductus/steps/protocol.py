@@ -1,9 +1,12 @@
 from abc import abstractmethod  # noqa: D100
-from collections.abc import Iterable
-from typing import Generic, NamedTuple, Protocol, runtime_checkable
+from collections.abc import AsyncIterable, AsyncIterator, Iterable, Iterator, Sequence
+from typing import TYPE_CHECKING, Generic, NamedTuple, Protocol, runtime_checkable
 
 from py_ductus.common import types
 
+if TYPE_CHECKING:
+    from py_ductus.steps.xsl.session import SaxonSession
+
 
 @runtime_checkable
 class Step(Protocol, Generic[types.TContent]):
@@ -11,6 +14,9 @@ class Step(Protocol, Generic[types.TContent]):
 
     Steps are a single unit in a processing pipeline,
     which is composed multiple steps.
+
+    Steps may report the time spent in their internal phases to the observer
+    returned by `py_ductus.instrumentation.current_observer()`.
     """
 
     _name: str
@@ -44,6 +50,85 @@ class Step(Protocol, Generic[types.TContent]):
         ...
 
 
+@runtime_checkable
+class StreamingStep(Step[types.TContent], Protocol):
+    """Protocol for Steps, which can process values lazily.
+
+    Streaming steps yield their results one at a time, so a pipeline of streaming
+    steps holds only the values currently in flight.
+    """
+
+    @abstractmethod
+    def stream(self, values: Iterable[types.TContent]) -> Iterator[types.TContent]:
+        """Process the values lazily.
+
+        Args:
+            values (Iterable[TContent]): The values to process.
+
+        Returns:
+            Iterator[TContent]: An iterator yielding the processed values in input order.
+
+        Raises:
+            StepError: When the step fails processing.
+        """
+        ...
+
+
+@runtime_checkable
+class AsyncStep(Protocol, Generic[types.TContent]):
+    """Protocol for Steps, which process values without blocking the event loop.
+
+    Async steps are used by `py_ductus.main.aprocess`, e.g. for steps waiting on
+    network services. CPU-bound steps should implement `Step` instead; `aprocess`
+    runs them on a bounded executor.
+    """
+
+    _name: str
+
+    @abstractmethod
+    def astream(self, values: AsyncIterable[types.TContent]) -> AsyncIterator[types.TContent]:
+        """Process the values asynchronously.
+
+        Args:
+            values (AsyncIterable[TContent]): The values to process.
+
+        Returns:
+            AsyncIterator[TContent]: An async iterator yielding the processed values.
+
+        Raises:
+            StepError: When the step fails processing.
+        """
+        ...
+
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        """The name of the step.
+
+        Returns:
+            str: The name of the step.
+        """
+        ...
+
+
+@runtime_checkable
+class PreparableStep(Step[types.TContent], Protocol):
+    """Protocol for Steps, which can compile their resources ahead of the first call.
+
+    `py_ductus.pipeline.Pipeline` prepares such steps when it is compiled, so errors
+    in e.g. stylesheets surface before any value is processed.
+    """
+
+    @abstractmethod
+    def prepare(self, session: "SaxonSession | None" = None) -> None:
+        """Compile the resources of the step.
+
+        Args:
+            session (SaxonSession | None): The Saxon session of the pipeline.
+        """
+        ...
+
+
 class StepAlternative(NamedTuple):
     """A step type, which allows to define a fallback step, which is used when the main step fails.
 
@@ -54,3 +139,55 @@ class StepAlternative(NamedTuple):
 
     main: Step
     fallback: Step
+
+
+SubPipeline = Step | StepAlternative | Sequence[Step | StepAlternative]
+
+
+def as_steps(steps: SubPipeline) -> tuple[Step | StepAlternative, ...]:
+    """Normalize a single step, a single alternative or a sequence of both to a tuple of steps.
+
+    Args:
+        steps (Step | StepAlternative | Sequence[Step | StepAlternative]): The steps.
+
+    Returns:
+        tuple[Step | StepAlternative, ...]: The steps.
+    """
+    # Alternatives are named tuples, but a single step
+    if isinstance(steps, StepAlternative) or not isinstance(steps, Sequence):
+        return (steps,)  # type: ignore
+    return tuple(steps)
+
+
+def step_name(step: Step | StepAlternative) -> str:
+    """Return the name of a step, or of the main and fallback step of an alternative.
+
+    Args:
+        step (Step | StepAlternative): The step.
+
+    Returns:
+        str: The name of the step.
+    """
+    if isinstance(step, StepAlternative):
+        return f"{step_name(step.main)}/{step_name(step.fallback)}"
+    return getattr(step, "name", type(step).__name__)
+
+
+def preparable_steps(
+    steps: Iterable[Step | StepAlternative],
+) -> Iterator[tuple[int, PreparableStep]]:
+    """Return the steps, which are prepared ahead of the first call, with their positions.
+
+    The main step of an alternative is not prepared, so resources which fail to
+    compile are still handled by the fallback step at runtime.
+
+    Args:
+        steps (Iterable[Step | StepAlternative]): The steps.
+
+    Returns:
+        Iterator[tuple[int, PreparableStep]]: The position and the preparable step or fallback step.
+    """
+    for index, step in enumerate(steps):
+        part = step.fallback if isinstance(step, StepAlternative) else step
+        if isinstance(part, PreparableStep):
+            yield index, part
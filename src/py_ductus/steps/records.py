@@ -0,0 +1,225 @@
+"""Steps for splitting huge XML documents into records and merging records into one document."""
+
+import re
+import xml.etree.ElementTree as ET
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import IO
+from xml.sax.saxutils import quoteattr
+
+from py_ductus.common.encoding import Buffer, decode_xml
+from py_ductus.steps.xsl.xsl import XMLInput
+
+_DECLARATION = re.compile(r"^\s*<\?xml[^>]*\?>\s*")
+
+
+class RecordSplitter:
+    """A step, which splits XML documents into their record elements.
+
+    The input values are paths of (or binary streams over) XML documents. The
+    documents are read incrementally and every record is yielded as an XML string
+    as soon as it is complete; records already yielded are dropped from the tree,
+    so memory does not grow with the size of the document. With a `batch_size`
+    above one, the records are yielded in micro-batches, wrapped in a `batch_root`
+    element.
+
+    Records in a namespace are serialized with generated prefixes (`ns0`, ...),
+    which is equivalent XML.
+    """
+
+    _name: str = "record_splitter"
+    record: str
+    batch_size: int
+    batch_root: str
+
+    def __init__(self, record: str = "record", batch_size: int = 1, batch_root: str = "records"):
+        """Initialize a record splitter step.
+
+        Args:
+            record (str): The name of the record elements, either a local name or a `{namespace}name`.
+            batch_size (int): The number of records per yielded value.
+            batch_root (str): The element wrapping the records of a batch, if `batch_size` is above one.
+
+        Raises:
+            ValueError: When `batch_size` is smaller than one.
+        """
+        if batch_size < 1:
+            raise ValueError("A batch holds at least one record.")
+
+        self.record = record
+        self.batch_size = batch_size
+        self.batch_root = batch_root
+
+    def __call__(self, values: Iterable[str | Path | IO[bytes]]) -> Iterable[str]:  # type: ignore
+        """Split the input documents into records.
+
+        Args:
+            values (list[str | Path | IO[bytes]]): The paths of, or binary streams over, the input documents.
+
+        Returns:
+            list[str]: The records, or batches of records, of all documents.
+
+        Raises:
+            ParseError: When an input is not well-formed XML.
+        """
+        if isinstance(values, str | Path):
+            return list(self.stream([values]))
+
+        return list(self.stream(values))
+
+    def stream(self, values: Iterable[str | Path | IO[bytes]]) -> Iterator[str]:  # type: ignore
+        """Split the input documents into records lazily.
+
+        Args:
+            values (Iterable[str | Path | IO[bytes]]): The paths of, or binary streams over, the input documents.
+
+        Returns:
+            Iterator[str]: The records, or batches of records, of all documents.
+
+        Raises:
+            ParseError: When an input is not well-formed XML.
+        """
+        for value in values:
+            yield from self._batches(self._records(value))
+
+    def _records(self, source: str | Path | IO[bytes]) -> Iterator[str]:
+        if isinstance(source, Path):
+            source = str(source)
+
+        parents: list[ET.Element] = []
+        for event, element in ET.iterparse(source, events=("start", "end")):
+            if event == "start":
+                parents.append(element)
+                continue
+
+            parents.pop()
+            if self._is_record(element.tag):
+                element.tail = None
+                yield ET.tostring(element, encoding="unicode")
+                # Drop the record from the tree, so only the path to the next record stays in memory
+                if parents:
+                    parents[-1].remove(element)
+                element.clear()
+
+    def _batches(self, records: Iterator[str]) -> Iterator[str]:
+        if self.batch_size == 1:
+            yield from records
+            return
+
+        batch: list[str] = []
+        for record in records:
+            batch.append(record)
+            if len(batch) == self.batch_size:
+                yield self._wrap(batch)
+                batch = []
+        if batch:
+            yield self._wrap(batch)
+
+    def _wrap(self, records: list[str]) -> str:
+        return f"<{self.batch_root}>{''.join(records)}</{self.batch_root}>"
+
+    def _is_record(self, tag: str) -> bool:
+        if tag == self.record:
+            return True
+        return not self.record.startswith("{") and tag.endswith(f"}}{self.record}")
+
+    @property
+    def name(self) -> str:
+        """The name of the step.
+
+        Returns:
+            str: The name of the step.
+        """
+        return self._name
+
+
+class RecordMerger:
+    """A step, which writes its input values into a single XML document.
+
+    Every value is appended to the document as soon as it arrives, so the
+    results of a streamed pipeline are never held in memory together. Values may
+    be text, `Document`s or bytes-like, e.g. encoded results, which are decoded in
+    the encoding they declare. XML declarations of the values are dropped. The document is written to a
+    temporary file next to the output first, so a failed pipeline leaves no
+    partial document behind. The step yields the path of the document once all
+    values are written.
+
+    Every call writes a new document, so the merger belongs at the end of a
+    pipeline run with `stream=True` and without `workers`.
+    """
+
+    _name: str = "record_merger"
+    output: str | Path
+    root: str
+    attributes: dict[str, str]
+    encoding: str
+
+    def __init__(
+        self,
+        output: str | Path,
+        root: str = "records",
+        attributes: dict[str, str] | None = None,
+        encoding: str = "utf-8",
+    ):
+        """Initialize a record merger step.
+
+        Args:
+            output (str | Path): The path of the merged document.
+            root (str): The name of the root element wrapping the values.
+            attributes (dict[str, str] | None): The attributes of the root element, e.g. namespace declarations.
+            encoding (str): The encoding of the merged document.
+        """
+        self.output = output
+        self.root = root
+        self.attributes = attributes or {}
+        self.encoding = encoding
+
+    def __call__(self, values: Iterable[XMLInput]) -> Iterable[str]:
+        """Write the values into the merged document.
+
+        Args:
+            values (list[str | bytes | Document]): The XML values to merge.
+
+        Returns:
+            list[str]: The path of the merged document.
+        """
+        return list(self.stream(values))
+
+    def stream(self, values: Iterable[XMLInput]) -> Iterator[str]:
+        """Write the values into the merged document as they arrive.
+
+        Args:
+            values (Iterable[str | bytes | Document]): The XML values to merge.
+
+        Returns:
+            Iterator[str]: The path of the merged document, once all values are written.
+        """
+        target = Path(self.output)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        partial = target.with_name(f".{target.name}.part")
+        attributes = "".join(
+            f" {name}={quoteattr(value)}" for name, value in self.attributes.items()
+        )
+
+        try:
+            with open(partial, "w", encoding=self.encoding, errors="xmlcharrefreplace") as file:
+                file.write(f'<?xml version="1.0" encoding="{self.encoding}"?>\n')
+                file.write(f"<{self.root}{attributes}>")
+                for value in values:
+                    text = decode_xml(value) if isinstance(value, Buffer) else str(value)
+                    file.write(_DECLARATION.sub("", text, count=1))
+                file.write(f"</{self.root}>\n")
+            partial.replace(target)
+        finally:
+            partial.unlink(missing_ok=True)
+
+        yield str(target)
+
+    @property
+    def name(self) -> str:
+        """The name of the step.
+
+        Returns:
+            str: The name of the step.
+        """
+        return self._name
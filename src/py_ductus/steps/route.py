@@ -0,0 +1,274 @@
+"""Routing steps, which send only the values matching a predicate through a sub-pipeline."""
+
+import itertools
+import re
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any
+
+from saxonche import PySaxonProcessor, PyXPathProcessor
+
+from py_ductus.common.document import Document
+from py_ductus.common.encoding import Buffer
+from py_ductus.instrumentation import current_observer
+from py_ductus.main import chain_xsl_steps, process
+from py_ductus.steps.alternative import FallbackHandler
+from py_ductus.steps.protocol import (
+    Step,
+    StepAlternative,
+    SubPipeline,
+    as_steps,
+    preparable_steps,
+    step_name,
+)
+from py_ductus.steps.xpath import ThreadLocalProcessors, parse_input
+from py_ductus.steps.xsl.session import SaxonSession, current_session
+from py_ductus.steps.xsl.xsl import XSL, XSLChain
+
+Predicate = Callable[[Any], bool]
+
+_COMMENT = re.compile(r"<!--.*?-->", re.DOTALL)
+_START_TAG = re.compile(r"<(?![?!])([^\s/>]+)([^>]*)")
+_NAMESPACE = re.compile(r"""xmlns(?::([^\s=]+))?\s*=\s*(["'])(.*?)\2""")
+
+
+class Route:
+    """A step, which sends only the values matching a predicate through a sub-pipeline.
+
+    Values for which the predicate is false pass through untouched. The order of
+    the values is kept: runs of consecutive matching values are processed by the
+    sub-pipeline as one stream, whose results take the place of the run. The
+    sub-pipeline may produce any number of results per value. Its XSL steps are
+    bound once per stream of the route, so all runs share their executables.
+
+    Predicates are callables on a single value, e.g. `RootElement`, which sniffs
+    the first bytes of a document, or `XPathPredicate`, which evaluates a XPath
+    expression; the parsed node of a `Document` is reused by later XSL steps.
+    """
+
+    _name: str
+    predicate: Predicate
+    steps: tuple[Step | StepAlternative, ...]
+    on_fallback: FallbackHandler | None
+    matched: int
+    skipped: int
+
+    def __init__(
+        self,
+        predicate: Predicate,
+        steps: SubPipeline,
+        name: str | None = None,
+        on_fallback: FallbackHandler | None = None,
+    ) -> None:
+        """Initialize a Route.
+
+        Args:
+            predicate (Callable[[TContent], bool]): Decides per value whether it is sent through the steps.
+            steps (Step | StepAlternative | Sequence[Step | StepAlternative]): The sub-pipeline for matching values.
+            name (str | None): The name of the step; derived from the steps if omitted.
+            on_fallback (FallbackHandler | None): Called for every value routed to the fallback step of an alternative in the sub-pipeline.
+        """
+        self.predicate = predicate
+        self.steps = as_steps(steps)
+        self.on_fallback = on_fallback
+        self._name = name or f"route({','.join(step_name(step) for step in self.steps)})"
+        self.matched = 0
+        self.skipped = 0
+
+    def __call__(self, values: Iterable[Any]) -> Iterable[Any]:
+        """Process the matching values with the sub-pipeline.
+
+        Args:
+            values (list[TContent]): The input values.
+
+        Returns:
+            list[TContent]: The results of matching values and the other values, in input order.
+
+        Raises:
+            StepError: When a step of the sub-pipeline fails.
+        """
+        return list(self.stream(values))
+
+    def stream(self, values: Iterable[Any]) -> Iterator[Any]:
+        """Process the matching values lazily with the sub-pipeline.
+
+        Args:
+            values (Iterable[TContent]): The input values.
+
+        Returns:
+            Iterator[TContent]: The results of matching values and the other values, in input order.
+
+        Raises:
+            StepError: When a step of the sub-pipeline fails.
+        """
+        observer = current_observer()
+        # XSL steps are compiled and parametrized once, not per run of matching values
+        steps = [
+            step.bind() if isinstance(step, XSL | XSLChain) else step
+            for step in chain_xsl_steps(self.steps)
+        ]
+
+        for matched, run in itertools.groupby(values, key=self._matches):
+            if matched:
+                yield from process(
+                    run,
+                    steps=steps,
+                    stream=True,
+                    on_fallback=self.on_fallback,
+                    observer=observer,
+                )
+            else:
+                yield from run
+
+    def prepare(self, session: SaxonSession | None = None) -> None:
+        """Compile the resources of the sub-pipeline.
+
+        Args:
+            session (SaxonSession | None): The Saxon session of the pipeline.
+        """
+        for _, part in preparable_steps(self.steps):
+            part.prepare(session)
+
+    def _matches(self, value: Any) -> bool:
+        if self.predicate(value):
+            self.matched += 1
+            return True
+        self.skipped += 1
+        return False
+
+    @property
+    def name(self) -> str:
+        """The name of the step.
+
+        Returns:
+            str: The name of the step.
+        """
+        return self._name
+
+
+class RootElement:
+    """A predicate, which matches XML values by their root element.
+
+    Only the first `peek` bytes of a value are inspected, without parsing: the
+    name of the first element and its namespace declarations, so the root element
+    must start within them. Values may be `str`, `bytes` or `Document`s; files of
+    documents are only read up to `peek` bytes.
+    """
+
+    name: str | None
+    namespace: str | None
+    peek: int
+
+    def __init__(
+        self, name: str | None = None, namespace: str | None = None, peek: int = 4096
+    ) -> None:
+        """Initialize a RootElement predicate.
+
+        Args:
+            name (str | None): The local name of the root element; any name matches if omitted.
+            namespace (str | None): The namespace of the root element, "" for none; any namespace matches if omitted.
+            peek (int): The number of bytes inspected.
+        """
+        self.name = name
+        self.namespace = namespace
+        self.peek = peek
+
+    def __call__(self, value: Any) -> bool:
+        """Return whether the root element of a value matches.
+
+        Args:
+            value (str | bytes | Document): The value.
+
+        Returns:
+            bool: True if the root element has the name and namespace of the predicate.
+        """
+        root = root_element(value, self.peek)
+        if root is None:
+            return False
+
+        namespace, name = root
+        return (self.name is None or name == self.name) and (
+            self.namespace is None or namespace == self.namespace
+        )
+
+
+def root_element(value: Any, peek: int = 4096) -> tuple[str, str] | None:
+    """Sniff the namespace and local name of the root element of a XML value.
+
+    Args:
+        value (str | bytes | memoryview | mmap | Document): The value.
+        peek (int): The number of bytes, or characters of `str` values, inspected.
+
+    Returns:
+        tuple[str, str] | None: The namespace ("" for none) and local name, or None if no element starts within `peek`.
+    """
+    if isinstance(value, Document):
+        head = value.peek(peek).decode(value.encoding, errors="ignore")
+    elif isinstance(value, Buffer):
+        with memoryview(value) as view:
+            head = bytes(view[:peek]).decode("utf-8", errors="ignore")
+    else:
+        head = str(value)[:peek]
+
+    match = _START_TAG.search(_COMMENT.sub("", head))
+    if match is None:
+        return None
+
+    prefix, _, name = match.group(1).rpartition(":")
+    declared = {found[0] or "": found[2] for found in _NAMESPACE.findall(match.group(2))}
+    return declared.get(prefix, ""), name
+
+
+class XPathPredicate:
+    """A predicate, which matches XML values by the effective boolean value of a XPath expression.
+
+    Values are parsed by the processor of the current session, unless the predicate
+    has an own session; `Document`s keep their node, so XSL steps processing them
+    afterwards do not parse them again.
+    """
+
+    expression: str
+    namespaces: dict[str, str]
+    session: SaxonSession | None
+
+    def __init__(
+        self,
+        expression: str,
+        namespaces: dict[str, str] | None = None,
+        session: SaxonSession | None = None,
+    ) -> None:
+        """Initialize a XPathPredicate.
+
+        Args:
+            expression (str): The XPath expression, evaluated with the document node as context item.
+            namespaces (dict[str, str] | None): The namespace prefixes used in the expression.
+            session (SaxonSession | None): The Saxon session to run in; the current session is used if omitted.
+        """
+        self.expression = expression
+        self.namespaces = namespaces or {}
+        self.session = session
+        self._xpath_processors: ThreadLocalProcessors[PyXPathProcessor] = ThreadLocalProcessors()
+
+    def __call__(self, value: Any) -> bool:
+        """Return whether the expression is true for a value.
+
+        Args:
+            value (str | bytes | Document): The value; bytes-like values are decoded in the encoding they declare.
+
+        Returns:
+            bool: The effective boolean value of the expression.
+
+        Raises:
+            PySaxonApiError: When the value is not well-formed XML or the expression is invalid.
+        """
+        processor = (self.session or current_session()).processor
+        node = parse_input(value, processor, step="xpath_predicate")
+
+        xpath = self._xpath_processors.get(processor, self._new_xpath_processor)
+        xpath.set_context(xdm_item=node)  # type: ignore
+        return bool(xpath.effective_boolean_value(self.expression))
+
+    def _new_xpath_processor(self, processor: PySaxonProcessor) -> PyXPathProcessor:
+        xpath = processor.new_xpath_processor()
+        for prefix, uri in self.namespaces.items():
+            xpath.declare_namespace(prefix, uri)
+        return xpath
@@ -0,0 +1,195 @@
+"""Per-value time budgets for steps, enforced in an isolated worker process."""
+
+import multiprocessing
+import threading
+import time
+import weakref
+from collections.abc import Iterable
+from multiprocessing.connection import Connection
+from multiprocessing.process import BaseProcess
+from types import TracebackType
+from typing import Any, Self
+
+from py_ductus.instrumentation import current_observer, item_observer, report_item
+from py_ductus.steps.error import StepError, StepTimeoutError, portable_error
+from py_ductus.steps.protocol import Step
+
+_READY = "ready"
+
+
+class TimeoutStep:
+    """A step wrapper, which cancels values exceeding a time budget.
+
+    The wrapped step processes one value at a time in a worker process, which keeps
+    its own Saxon session between values. When a value takes longer than `timeout`
+    seconds, the worker is killed, a `StepTimeoutError` is raised and a new worker is
+    started for the next value. Used as the main step of a `StepAlternative`, the
+    cancelled value is routed to the fallback step instead.
+
+    The duration of every value is reported to the current observer, if it receives
+    item events (e.g. a `MetricsCollector`), so the slowest values can be found.
+
+    Values are processed sequentially, also when the step is called from several
+    threads; worker processes of `process(..., workers=...)` can not start workers
+    of their own.
+    """
+
+    step: Step
+    timeout: float
+    mp_context: str | None
+
+    def __init__(self, step: Step, timeout: float, mp_context: str | None = None) -> None:
+        """Initialize a TimeoutStep.
+
+        Args:
+            step (Step): The step to run with a time budget.
+            timeout (float): The time budget per value in seconds.
+            mp_context (str | None): The multiprocessing start method of the worker; the platform default if omitted.
+
+        Raises:
+            ValueError: When `timeout` is not positive.
+        """
+        if timeout <= 0:
+            raise ValueError("The timeout must be positive.")
+
+        self.step = step
+        self.timeout = timeout
+        self.mp_context = mp_context
+        self._name = f"timeout({step.name})"
+        self._lock = threading.Lock()
+        self._worker: tuple[BaseProcess, Connection] | None = None
+        self._finalizer: weakref.finalize | None = None
+
+    def __call__(self, values: Iterable[Any]) -> Iterable[Any]:
+        """Process the values one by one in the worker process.
+
+        Args:
+            values (Iterable[TContent]): The values to process.
+
+        Returns:
+            list[TContent]: The processed values.
+
+        Raises:
+            StepTimeoutError: When a value exceeds the time budget.
+            StepError: When the worker process dies while processing a value.
+        """
+        observer = item_observer(current_observer())
+        results: list[Any] = []
+
+        for value in values:
+            started = time.perf_counter()
+            try:
+                results.extend(self._run(value))
+            except StepTimeoutError:
+                report_item(
+                    observer, self.name, value, time.perf_counter() - started, timed_out=True
+                )
+                raise
+            report_item(observer, self.name, value, time.perf_counter() - started)
+
+        return results
+
+    def close(self) -> None:
+        """Stop the worker process; a new one is started on the next call."""
+        with self._lock:
+            self._stop_worker()
+
+    def _run(self, value: Any) -> list[Any]:
+        with self._lock:
+            _, connection = self._start_worker()
+            connection.send(value)
+
+            if not connection.poll(self.timeout):
+                self._stop_worker()
+                raise StepTimeoutError(step=self, value=value, timeout=self.timeout)
+
+            try:
+                succeeded, payload = connection.recv()
+            except EOFError:
+                # The worker crashed, e.g. in native code; the next value gets a new one
+                self._stop_worker()
+                raise StepError(step=self, value=value) from None
+
+        if not succeeded:
+            raise payload
+        return payload
+
+    def _start_worker(self) -> tuple[BaseProcess, Connection]:
+        if self._worker is not None and self._worker[0].is_alive():
+            return self._worker
+
+        context = multiprocessing.get_context(self.mp_context)
+        connection, worker_connection = context.Pipe()
+        process = context.Process(  # type: ignore
+            target=_serve, args=(self.step, worker_connection), name=self.name, daemon=True
+        )
+        process.start()
+        worker_connection.close()
+
+        # Wait until the worker is up, so its start-up time is not part of the budget
+        if connection.recv() != _READY:
+            raise RuntimeError(f"The worker of step '{self.name}' failed to start.")
+
+        self._worker = (process, connection)
+        self._finalizer = weakref.finalize(self, _stop, process, connection)
+        return self._worker
+
+    def _stop_worker(self) -> None:
+        if self._finalizer is not None:
+            self._finalizer()
+        self._worker = None
+        self._finalizer = None
+
+    @property
+    def name(self) -> str:
+        """The name of the step.
+
+        Returns:
+            str: The name of the step.
+        """
+        return self._name
+
+    def __getstate__(self) -> dict[str, Any]:
+        """Pickle only the configuration of the step; workers belong to their parent."""
+        return {"step": self.step, "timeout": self.timeout, "mp_context": self.mp_context}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        """Restore an unpickled step without a worker."""
+        self.__init__(**state)  # type: ignore
+
+    def __enter__(self) -> Self:
+        """Enter the step context.
+
+        Returns:
+            TimeoutStep: The step itself.
+        """
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Stop the worker process when leaving the context."""
+        self.close()
+
+
+def _serve(step: Step, connection: Connection) -> None:
+    connection.send(_READY)
+    while True:
+        try:
+            value = connection.recv()
+        except EOFError:
+            return
+
+        try:
+            connection.send((True, list(step([value]))))
+        except Exception as error:
+            connection.send((False, portable_error(error)))
+
+
+def _stop(process: BaseProcess, connection: Connection) -> None:
+    connection.close()
+    process.kill()
+    process.join()
@@ -0,0 +1,392 @@
+"""XPath steps, which evaluate an expression per value and return its atomized result."""
+
+import hashlib
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from decimal import Decimal
+from functools import partial
+from typing import Any, Generic, TypeVar
+from weakref import WeakKeyDictionary
+from xml.sax.saxutils import quoteattr
+
+from saxonche import (
+    PySaxonProcessor,
+    PyXdmArray,
+    PyXdmAtomicValue,
+    PyXdmItem,
+    PyXdmMap,
+    PyXdmNode,
+    PyXdmValue,
+    PyXsltExecutable,
+)
+
+from py_ductus.common.document import Document
+from py_ductus.common.encoding import Buffer, decode_xml
+from py_ductus.instrumentation import (
+    Observer,
+    current_observer,
+    item_observer,
+    phase_timer,
+    timed_items,
+)
+from py_ductus.steps.xsl.cache import StylesheetCache
+from py_ductus.steps.xsl.session import SaxonSession, current_session
+from py_ductus.steps.xsl.types import XSLParam, param_list, params_fingerprint
+from py_ductus.steps.xsl.xsl import XMLInput, convert_params
+
+TProcessor = TypeVar("TProcessor")
+
+_XS = "{http://www.w3.org/2001/XMLSchema}"
+# The prefixes a XPath processor declares; a stylesheet declares only the xsl prefix
+_PREDECLARED = {
+    "xs": "http://www.w3.org/2001/XMLSchema",
+    "map": "http://www.w3.org/2005/xpath-functions/map",
+    "array": "http://www.w3.org/2005/xpath-functions/array",
+    "math": "http://www.w3.org/2005/xpath-functions/math",
+}
+
+
+class XPath:
+    """A XPath step.
+
+    This step evaluates a XPath 3.1 expression with every input value as context
+    item and returns the atomized result, see `atomize`, without serializing it to
+    XML. The expression is compiled once per processor, as the only template of a
+    stylesheet kept in the stylesheet cache of the session; evaluating a compiled
+    executable is much cheaper than `PyXPathProcessor.evaluate`, which compiles the
+    expression on every call.
+
+    Params are bound to variables of the expression, e.g. `XSLAtomicParam("limit", 3)`
+    to `$limit`. `Document`s are parsed at most once per processor, as in `XSL`.
+    """
+
+    _name: str = "xpath"
+    expression: str
+    params: XSLParam | list[XSLParam] | None
+    namespaces: dict[str, str]
+    first: bool
+    session: SaxonSession | None
+
+    def __init__(
+        self,
+        expression: str,
+        params: XSLParam | list[XSLParam] | None = None,
+        namespaces: dict[str, str] | None = None,
+        *,
+        first: bool = False,
+        session: SaxonSession | None = None,
+    ) -> None:
+        """Initialize a XPath step.
+
+        Args:
+            expression (str): The XPath expression.
+            params (XSLParam | list[XSLParam] | None): The params, bound to the variables of their names.
+            namespaces (dict[str, str] | None): The namespace prefixes used in the expression; the prefix "" sets the default namespace of element names.
+            first (bool): Whether to return only the first item of every result, or None for an empty result, instead of a list.
+            session (SaxonSession | None): The Saxon session to run in; the current session is used if omitted.
+        """
+        self.expression = expression
+        self.params = params
+        self.namespaces = namespaces or {}
+        self.first = first
+        self.session = session
+        self._converted_params: WeakKeyDictionary[StylesheetCache, list[tuple[str, PyXdmValue]]] = (
+            WeakKeyDictionary()
+        )
+
+    def __call__(self, values: Iterable[XMLInput]) -> Iterable[Any]:
+        """Evaluate the expression for the input values.
+
+        Args:
+            values (list[str | bytes | Document]): The input values.
+
+        Returns:
+            list[list[Any] | Any]: The atomized result of every value.
+
+        Raises:
+            PySaxonApiError: When a value is not well-formed XML or the expression fails.
+        """
+        if isinstance(values, str | Buffer | Document):
+            return next(self.stream([values]))
+
+        return list(self.stream(values))
+
+    def stream(self, values: Iterable[XMLInput]) -> Iterator[Any]:
+        """Evaluate the expression lazily for the input values.
+
+        Args:
+            values (Iterable[str | bytes | Document]): The input values.
+
+        Returns:
+            Iterator[list[Any] | Any]: The atomized result of every value.
+
+        Raises:
+            PySaxonApiError: When the expression does not compile, a value is not well-formed XML or the expression fails.
+        """
+        session = self.session or current_session()
+        observer = current_observer()
+
+        with phase_timer(observer, self.name, "compile"):
+            executable = session.executable(self.stylesheet)
+        cache = session.cache
+
+        executable.set_result_as_raw_value(True)  # type: ignore
+        for name, value in self._static_params(cache):
+            executable.set_parameter(name, value)  # type: ignore
+
+        apply = partial(self._evaluate, cache=cache, executable=executable, observer=observer)
+        if (items := item_observer(observer)) is not None:
+            return timed_items(items, self.name, values, apply)
+        return (apply(value) for value in values)
+
+    def prepare(self, session: SaxonSession | None = None) -> None:
+        """Compile the expression and convert the params ahead of the first call.
+
+        Args:
+            session (SaxonSession | None): The session to compile in, unless the step has an own session; the current session is used if omitted.
+
+        Raises:
+            PySaxonApiError: When the expression does not compile.
+        """
+        session = self.session or session or current_session()
+        session.executable(self.stylesheet)
+        self._static_params(session.cache)
+
+    def fingerprint(self, deterministic: bool = False) -> str | None:
+        """Return a fingerprint of the expression, its namespaces and params.
+
+        Args:
+            deterministic (bool): Unused, the step has no dynamic params.
+
+        Returns:
+            str | None: The fingerprint, or None if the step has params which are no plain Python values.
+        """
+        return expression_fingerprint(
+            self.name, self.expression.encode("utf-8"), self.namespaces, self.params, self.first
+        )
+
+    @property
+    def stylesheet(self) -> str:
+        """The stylesheet evaluating the expression, which is compiled and cached by the session.
+
+        Returns:
+            str: The stylesheet text.
+        """
+        declarations = "".join(
+            f" xpath-default-namespace={quoteattr(uri)}"
+            if not prefix
+            else f" xmlns:{prefix}={quoteattr(uri)}"
+            for prefix, uri in sorted({**_PREDECLARED, **self.namespaces}.items())
+        )
+        params = "".join(
+            f"<xsl:param name={quoteattr(param.name)}/>"
+            for param in param_list(self.params)
+            if param.name is not None
+        )
+        return (
+            '<xsl:stylesheet version="3.0" xmlns:xsl="http://www.w3.org/1999/XSL/Transform"'
+            f"{declarations}>{params}"
+            f'<xsl:template match="."><xsl:sequence select={quoteattr(self.expression)}/>'
+            "</xsl:template></xsl:stylesheet>"
+        )
+
+    def _static_params(self, cache: StylesheetCache) -> list[tuple[str, PyXdmValue]]:
+        # Params are converted once per processor; XDM values can be shared by executables
+        values = self._converted_params.get(cache)
+        if values is None:
+            values = convert_params(self.params, cache.processor)
+            self._converted_params[cache] = values
+        return values
+
+    def _evaluate(
+        self,
+        input_value: XMLInput,
+        cache: StylesheetCache,
+        executable: PyXsltExecutable,
+        observer: Observer | None = None,
+    ) -> Any:
+        node = parse_input(input_value, cache.processor, step=self.name, observer=observer)
+
+        with phase_timer(observer, self.name, "evaluate"):
+            result = executable.apply_templates_returning_value(xdm_value=node)  # type: ignore
+
+        return atomize_result(result, first=self.first)
+
+    def __getstate__(self) -> dict[str, Any]:
+        """Pickle the step without its converted params; they belong to a processor."""
+        state = self.__dict__.copy()
+        del state["_converted_params"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        """Restore an unpickled step."""
+        self.__dict__.update(state)
+        self._converted_params = WeakKeyDictionary()
+
+    @property
+    def name(self) -> str:
+        """The name of the step.
+
+        Returns:
+            str: The name of the step.
+        """
+        return self._name
+
+
+def parse_input(
+    value: XMLInput,
+    proc: PySaxonProcessor,
+    step: str,
+    observer: Observer | None = None,
+) -> PyXdmNode:
+    """Parse an input value with a processor, reusing the node of a `Document`.
+
+    Bytes-like values are decoded in the encoding they declare.
+
+    Args:
+        value (str | bytes | Document): The input value.
+        proc (PySaxonProcessor): The processor to parse with.
+        step (str): The name of the step, under which the parse phase is reported.
+        observer (Observer | None): Receives the duration of the parse phase.
+
+    Returns:
+        PyXdmNode: The document node.
+
+    Raises:
+        PySaxonApiError: When the value is not well-formed XML.
+    """
+    if isinstance(value, Document) and value.parsed_by(proc):
+        return value.node(proc)
+
+    with phase_timer(observer, step, "parse"):
+        if isinstance(value, Document):
+            return value.node(proc)
+        return proc.parse_xml(xml_text=value if isinstance(value, str) else decode_xml(value))
+
+
+def expression_fingerprint(
+    step: str,
+    source: bytes,
+    namespaces: dict[str, str],
+    params: XSLParam | list[XSLParam] | None,
+    first: bool,
+) -> str | None:
+    """Return a fingerprint of a XPath expression or XQuery query, its namespaces and params.
+
+    Args:
+        step (str): The name of the step.
+        source (bytes): The expression or query.
+        namespaces (dict[str, str]): The declared namespace prefixes.
+        params (XSLParam | list[XSLParam] | None): The params.
+        first (bool): Whether the step returns only the first item of every result.
+
+    Returns:
+        str | None: The fingerprint, or None if a param has a value which is no plain Python value.
+    """
+    digested_params = params_fingerprint(params)
+    if digested_params is None:
+        return None
+
+    digest = hashlib.sha256(f"{step}\0{first}\0".encode())
+    digest.update(source)
+    for prefix, uri in sorted(namespaces.items()):
+        digest.update(f"\0xmlns:{prefix}={uri}".encode())
+    digest.update(digested_params.encode())
+    return digest.hexdigest()
+
+
+class ThreadLocalProcessors(Generic[TProcessor]):
+    """Saxon objects of one kind, e.g. query processors, kept per thread and Saxon processor.
+
+    XPath and XQuery processors hold their context item, so every thread needs its
+    own. They are dropped when their owner is pickled; they belong to their threads.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty ThreadLocalProcessors."""
+        self._local = threading.local()
+
+    def get(
+        self, processor: PySaxonProcessor, create: Callable[[PySaxonProcessor], TProcessor]
+    ) -> TProcessor:
+        """Return the object of the current thread for a processor, creating it on first use.
+
+        Args:
+            processor (PySaxonProcessor): The Saxon processor.
+            create (Callable[[PySaxonProcessor], TProcessor]): Creates the object from the processor.
+
+        Returns:
+            TProcessor: The object.
+        """
+        cached: tuple[PySaxonProcessor, TProcessor] | None = getattr(self._local, "cached", None)
+        if cached is not None and cached[0] is processor:
+            return cached[1]
+
+        created = create(processor)
+        self._local.cached = (processor, created)
+        return created
+
+    def __reduce__(self) -> tuple[type["ThreadLocalProcessors[TProcessor]"], tuple[()]]:
+        """Pickle as a new, empty instance."""
+        return type(self), ()
+
+
+def atomize_result(result: PyXdmValue | None, first: bool = False) -> Any:
+    """Convert the result of an expression to Python values.
+
+    Args:
+        result (PyXdmValue | None): The result; None stands for the empty sequence.
+        first (bool): Whether to return only the first item, or None for an empty result.
+
+    Returns:
+        list[Any] | Any: The atomized items, see `atomize`, or the first of them.
+    """
+    items = [] if result is None else [result.item_at(index) for index in range(result.size)]  # type: ignore
+    if first:
+        return atomize(items[0]) if items else None
+    return [atomize(item) for item in items]
+
+
+def atomize(item: PyXdmItem) -> Any:
+    """Convert a XDM item to a Python value.
+
+    Nodes are atomized to their string value. Integers become `int`, decimals
+    `Decimal`, doubles and floats `float` and booleans `bool`; other atomic values,
+    e.g. dates, are returned as their string value. Maps become `dict`s and arrays
+    `list`s; their members are converted recursively, where an empty sequence
+    becomes None and a sequence of several items a `list`.
+
+    Args:
+        item (PyXdmItem): The item.
+
+    Returns:
+        Any: The Python value.
+    """
+    if isinstance(item, PyXdmMap):
+        return {atomize(key): _atomize_member(item.get(key)) for key in item.keys()}  # noqa: SIM118
+    if isinstance(item, PyXdmArray):
+        return [_atomize_member(member) for member in item.as_list()]
+    if isinstance(item, PyXdmAtomicValue):
+        return _atomic(item)
+    return item.string_value
+
+
+def _atomic(value: PyXdmAtomicValue) -> Any:
+    kind = value.primitive_type_name.removeprefix("Q")  # type: ignore
+    if kind == f"{_XS}integer":
+        return value.integer_value
+    if kind == f"{_XS}decimal":
+        return Decimal(value.string_value)
+    if kind in (f"{_XS}double", f"{_XS}float"):
+        return value.double_value  # type: ignore
+    if kind == f"{_XS}boolean":
+        return value.boolean_value
+    return value.string_value
+
+
+def _atomize_member(value: PyXdmValue | None) -> Any:
+    if value is None or value.size == 0:  # type: ignore
+        return None
+    if value.size == 1:  # type: ignore
+        return atomize(value.head)  # type: ignore
+    return [atomize(value.item_at(index)) for index in range(value.size)]  # type: ignore
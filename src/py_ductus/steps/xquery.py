@@ -0,0 +1,162 @@
+"""XQuery steps, which run a query per value and return its atomized result."""
+
+from collections.abc import Iterable, Iterator
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+from saxonche import PySaxonProcessor, PyXQueryProcessor
+
+from py_ductus.common.document import Document
+from py_ductus.common.encoding import Buffer
+from py_ductus.instrumentation import (
+    Observer,
+    current_observer,
+    item_observer,
+    phase_timer,
+    timed_items,
+)
+from py_ductus.steps.xpath import (
+    ThreadLocalProcessors,
+    atomize_result,
+    expression_fingerprint,
+    parse_input,
+)
+from py_ductus.steps.xsl.session import SaxonSession, current_session
+from py_ductus.steps.xsl.types import XSLParam
+from py_ductus.steps.xsl.xsl import XMLInput, convert_params
+
+
+class XQuery:
+    """A XQuery step.
+
+    This step runs a XQuery 3.1 query with every input value as context item and
+    returns the atomized result, see `py_ductus.steps.xpath.atomize`, without
+    serializing it to XML. Params are bound to the external variables of their
+    names, e.g. `XSLAtomicParam("limit", 3)` to `declare variable $limit external;`.
+
+    Every thread keeps one query processor per Saxon processor, with the query,
+    namespaces and converted params set once. SaxonC compiles queries on every run
+    (compiled query executables need Saxon-EE), so for single expressions the
+    `XPath` step, which is compiled once, is considerably faster.
+    """
+
+    _name: str = "xquery"
+    query: str | Path
+    params: XSLParam | list[XSLParam] | None
+    namespaces: dict[str, str]
+    first: bool
+    session: SaxonSession | None
+
+    def __init__(
+        self,
+        query: str | Path,
+        params: XSLParam | list[XSLParam] | None = None,
+        namespaces: dict[str, str] | None = None,
+        *,
+        first: bool = False,
+        session: SaxonSession | None = None,
+    ) -> None:
+        """Initialize a XQuery step.
+
+        Args:
+            query (str | Path): The query, or the path of a query file.
+            params (XSLParam | list[XSLParam] | None): The params, bound to the external variables of their names.
+            namespaces (dict[str, str] | None): Namespace prefixes declared in addition to those of the query prolog.
+            first (bool): Whether to return only the first item of every result, or None for an empty result, instead of a list.
+            session (SaxonSession | None): The Saxon session to run in; the current session is used if omitted.
+        """
+        self.query = query
+        self.params = params
+        self.namespaces = namespaces or {}
+        self.first = first
+        self.session = session
+        self._query_processors: ThreadLocalProcessors[PyXQueryProcessor] = ThreadLocalProcessors()
+
+    def __call__(self, values: Iterable[XMLInput]) -> Iterable[Any]:
+        """Run the query for the input values.
+
+        Args:
+            values (list[str | bytes | Document]): The input values.
+
+        Returns:
+            list[list[Any] | Any]: The atomized result of every value.
+
+        Raises:
+            PySaxonApiError: When a value is not well-formed XML or the query fails.
+        """
+        if isinstance(values, str | Buffer | Document):
+            return next(self.stream([values]))
+
+        return list(self.stream(values))
+
+    def stream(self, values: Iterable[XMLInput]) -> Iterator[Any]:
+        """Run the query lazily for the input values.
+
+        Args:
+            values (Iterable[str | bytes | Document]): The input values.
+
+        Returns:
+            Iterator[list[Any] | Any]: The atomized result of every value.
+
+        Raises:
+            PySaxonApiError: When a value is not well-formed XML or the query fails.
+        """
+        processor = (self.session or current_session()).processor
+        observer = current_observer()
+
+        apply = partial(self._run, processor=processor, observer=observer)
+        if (items := item_observer(observer)) is not None:
+            return timed_items(items, self.name, values, apply)
+        return (apply(value) for value in values)
+
+    def fingerprint(self, deterministic: bool = False) -> str | None:
+        """Return a fingerprint of the query, its namespaces and params.
+
+        Modules imported by a query file are not part of the fingerprint.
+
+        Args:
+            deterministic (bool): Unused, the step has no dynamic params.
+
+        Returns:
+            str | None: The fingerprint, or None if the step has params which are no plain Python values.
+        """
+        source = (
+            self.query.encode("utf-8") if isinstance(self.query, str) else self.query.read_bytes()
+        )
+        return expression_fingerprint(self.name, source, self.namespaces, self.params, self.first)
+
+    def _run(
+        self,
+        input_value: XMLInput,
+        processor: PySaxonProcessor,
+        observer: Observer | None = None,
+    ) -> Any:
+        node = parse_input(input_value, processor, step=self.name, observer=observer)
+        query = self._query_processors.get(processor, self._new_query_processor)
+
+        with phase_timer(observer, self.name, "evaluate"):
+            result = query.run_query_to_value(input_xdm_item=node)  # type: ignore
+
+        return atomize_result(result, first=self.first)
+
+    def _new_query_processor(self, processor: PySaxonProcessor) -> PyXQueryProcessor:
+        query = processor.new_xquery_processor()
+        for prefix, uri in self.namespaces.items():
+            query.declare_namespace(prefix, uri)  # type: ignore
+        for name, value in convert_params(self.params, processor):
+            query.set_parameter(name, value)  # type: ignore
+        if isinstance(self.query, Path):
+            query.set_query_file(str(self.query))  # type: ignore
+        else:
+            query.set_query_content(self.query)  # type: ignore
+        return query
+
+    @property
+    def name(self) -> str:
+        """The name of the step.
+
+        Returns:
+            str: The name of the step.
+        """
+        return self._name
@@ -1,11 +1,31 @@
 """The XSL-Step module."""
 
-from py_ductus.steps.xsl.types import XSLArrayParam, XSLAtomicParam, XSLParam
-from py_ductus.steps.xsl.xsl import XSL
+from py_ductus.steps.xsl.cache import CacheStats, StylesheetCache
+from py_ductus.steps.xsl.file import XSLFile
+from py_ductus.steps.xsl.session import (
+    SaxonSession,
+    current_session,
+    default_session,
+    use_session,
+)
+from py_ductus.steps.xsl.sweep import XSLSweep
+from py_ductus.steps.xsl.types import XSLArrayParam, XSLAtomicParam, XSLMapParam, XSLParam
+from py_ductus.steps.xsl.xsl import XSL, BoundStep, XSLChain
 
 __all__ = [
     "XSL",
+    "XSLChain",
+    "BoundStep",
+    "XSLFile",
+    "XSLSweep",
     "XSLParam",
     "XSLAtomicParam",
     "XSLArrayParam",
+    "XSLMapParam",
+    "CacheStats",
+    "StylesheetCache",
+    "SaxonSession",
+    "current_session",
+    "default_session",
+    "use_session",
 ]
@@ -0,0 +1,223 @@
+"""A cache for compiled XSL stylesheets."""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from pathlib import Path
+from typing import NamedTuple
+
+from saxonche import PySaxonProcessor, PyXdmValue, PyXslt30Processor, PyXsltExecutable
+
+StylesheetKey = tuple[str, ...]
+
+
+class CacheStats(NamedTuple):
+    """Counters of a stylesheet cache.
+
+    Attributes:
+        hits (int): Number of lookups served from the cache.
+        misses (int): Number of lookups which compiled the stylesheet.
+        evictions (int): Number of executables dropped to stay within `maxsize`.
+        size (int): Number of currently cached executables.
+        maxsize (int): The maximum number of cached executables.
+    """
+
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    maxsize: int
+
+
+def stylesheet_key(xslt: str | Path) -> StylesheetKey:
+    """Build the cache key of a stylesheet.
+
+    Stylesheet texts are keyed by a hash of their content, stylesheet files by their
+    resolved path, modification time and size, so an edited file is compiled again.
+
+    Args:
+        xslt (str | Path): The XSL stylesheet.
+
+    Returns:
+        StylesheetKey: The cache key.
+    """
+    if isinstance(xslt, str):
+        return ("text", hashlib.sha256(xslt.encode("utf-8")).hexdigest())
+
+    path = xslt.resolve()
+    stat = path.stat()
+    return ("path", str(path), str(stat.st_mtime_ns), str(stat.st_size))
+
+
+class StylesheetCache:
+    """A LRU cache of compiled XSL stylesheets.
+
+    Compiled executables belong to the processor which compiled them, so the cache
+    owns its processor; documents transformed with a cached executable must be parsed
+    with `StylesheetCache.processor`. The cache also keeps XDM values, which are
+    converted once per processor, see `xdm_value`.
+    """
+
+    maxsize: int
+    value_maxsize: int
+
+    def __init__(
+        self,
+        maxsize: int = 128,
+        processor: PySaxonProcessor | None = None,
+        value_maxsize: int = 1024,
+    ) -> None:
+        """Initialize a StylesheetCache.
+
+        Args:
+            maxsize (int): The maximum number of cached executables.
+            processor (PySaxonProcessor | None): The processor to compile with; created lazily if omitted.
+            value_maxsize (int): The maximum number of cached XDM values.
+
+        Raises:
+            ValueError: When `maxsize` is smaller than one.
+        """
+        if maxsize < 1:
+            raise ValueError("The maxsize of a stylesheet cache must be at least one.")
+
+        self.maxsize = maxsize
+        self.value_maxsize = value_maxsize
+        self._processor = processor
+        self._xsl_proc: PyXslt30Processor | None = None
+        self._executables: OrderedDict[StylesheetKey, PyXsltExecutable] = OrderedDict()
+        self._values: OrderedDict[Hashable, PyXdmValue] = OrderedDict()
+        self._lock = threading.RLock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def processor(self) -> PySaxonProcessor:
+        """The processor the cached executables belong to.
+
+        Returns:
+            PySaxonProcessor: The processor.
+        """
+        with self._lock:
+            if self._processor is None:
+                self._processor = PySaxonProcessor(license=False)
+            return self._processor
+
+    def get(self, xslt: str | Path) -> PyXsltExecutable:
+        """Return the compiled executable of a stylesheet, compiling it on a cache miss.
+
+        The returned executable is shared; clone it before setting parameters on it.
+
+        Args:
+            xslt (str | Path): The XSL stylesheet.
+
+        Returns:
+            PyXsltExecutable: The compiled stylesheet.
+        """
+        key = stylesheet_key(xslt)
+
+        with self._lock:
+            executable = self._executables.get(key)
+            if executable is not None:
+                self._hits += 1
+                self._executables.move_to_end(key)
+                return executable
+
+            self._misses += 1
+            executable = self._compile(xslt)
+            self._executables[key] = executable
+
+            while len(self._executables) > self.maxsize:
+                self._executables.popitem(last=False)
+                self._evictions += 1
+
+            return executable
+
+    def xdm_value(
+        self, key: Hashable, convert: Callable[[PySaxonProcessor], PyXdmValue]
+    ) -> PyXdmValue:
+        """Return a XDM value, converting it only the first time its key is seen.
+
+        XDM values are immutable and can be set on any executable of the processor,
+        so e.g. dynamic params with recurring values are converted once.
+
+        Args:
+            key (Hashable): The key of the value.
+            convert (Callable[[PySaxonProcessor], PyXdmValue]): Creates the value with the processor of the cache.
+
+        Returns:
+            PyXdmValue: The cached or converted value.
+        """
+        with self._lock:
+            value = self._values.get(key)
+            if value is not None:
+                self._values.move_to_end(key)
+                return value
+
+        # Large values may take a while, so stylesheet lookups are not blocked meanwhile
+        value = convert(self.processor)
+
+        with self._lock:
+            value = self._values.setdefault(key, value)
+            while len(self._values) > self.value_maxsize:
+                self._values.popitem(last=False)
+            return value
+
+    def invalidate(self, xslt: str | Path) -> bool:
+        """Drop a stylesheet from the cache.
+
+        For stylesheet files every cached version of the file is dropped.
+
+        Args:
+            xslt (str | Path): The XSL stylesheet.
+
+        Returns:
+            bool: Whether a cached executable was dropped.
+        """
+        with self._lock:
+            if isinstance(xslt, str):
+                return self._executables.pop(stylesheet_key(xslt), None) is not None
+
+            path = str(xslt.resolve())
+            keys = [key for key in self._executables if key[0] == "path" and key[1] == path]
+            for key in keys:
+                del self._executables[key]
+            return bool(keys)
+
+    def clear(self) -> None:
+        """Drop all cached executables and values and reset the counters."""
+        with self._lock:
+            self._executables.clear()
+            self._values.clear()
+            self._hits = self._misses = self._evictions = 0
+
+    @property
+    def stats(self) -> CacheStats:
+        """The current counters of the cache.
+
+        Returns:
+            CacheStats: The counters.
+        """
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                size=len(self._executables),
+                maxsize=self.maxsize,
+            )
+
+    def __len__(self) -> int:
+        """The number of cached executables."""
+        return len(self._executables)
+
+    def _compile(self, xslt: str | Path) -> PyXsltExecutable:
+        if self._xsl_proc is None:
+            self._xsl_proc = self.processor.new_xslt30_processor()
+
+        return (
+            self._xsl_proc.compile_stylesheet(stylesheet_text=xslt)
+            if isinstance(xslt, str)
+            else self._xsl_proc.compile_stylesheet(stylesheet_file=str(xslt))
+        )  # type: ignore
@@ -0,0 +1,157 @@
+"""Module for the file-to-file XSL step."""
+
+from collections.abc import Callable, Iterable, Iterator
+from pathlib import Path
+
+from saxonche import PyXsltExecutable
+
+from py_ductus.instrumentation import (
+    Observer,
+    current_observer,
+    item_observer,
+    phase_timer,
+    timed_items,
+)
+from py_ductus.steps.xsl.cache import StylesheetCache
+from py_ductus.steps.xsl.session import SaxonSession, current_session
+from py_ductus.steps.xsl.types import XSLParam
+from py_ductus.steps.xsl.xsl import XSLBase
+
+
+class XSLFile(XSLBase):
+    """A XSL step, which transforms files on disk into files on disk.
+
+    The input values are paths of XML files. Saxon parses the inputs and writes
+    the results itself, so the documents never pass through Python objects; the
+    step returns the paths of the written results. Results are written to a
+    temporary file next to their target first, so failed transformations leave no
+    partial output behind.
+
+    The output is either a directory, in which results are named like their
+    inputs, or a path template with the fields `{stem}`, `{suffix}`, `{name}` and
+    `{parent}` of the input path, e.g. `"out/{stem}.html"`.
+    """
+
+    _name: str = "xsl_file"
+    output: str | Path
+
+    def __init__(
+        self,
+        xslt: str | Path,
+        output: str | Path,
+        params: XSLParam | list[XSLParam] | None = None,
+        dynamic_params: (Callable[[], XSLParam] | list[Callable[[], XSLParam]] | None) = None,
+        session: SaxonSession | None = None,
+    ):
+        """Initialize a file-to-file XSL step.
+
+        Args:
+            xslt (str | Path): The XSL stylesheet.
+            output (str | Path): The output directory, or a path template for the results.
+            params (XSLParam | list[XSLParam] | None): The parameters for the XSL transformation.
+            dynamic_params (Callable[[], XSLParam] | list[Callable[[], XSLParam]] | None): Dynamic parameters for the XSL transformation, which are evaluated for each input file.
+            session (SaxonSession | None): The Saxon session to run in; the current session is used if omitted.
+        """
+        super().__init__(xslt=xslt, params=params, dynamic_params=dynamic_params, session=session)
+        self.output = output
+
+    def __call__(self, values: Iterable[str | Path]) -> Iterable[str]:
+        """Transform the input files.
+
+        Args:
+            values (list[str | Path]): The paths of the input files.
+
+        Returns:
+            list[str]: The paths of the result files.
+
+        Raises:
+            PySaxonApiError: When an input can not be parsed or the XSL transformation fails.
+        """
+        if isinstance(values, str | Path):
+            return next(self.stream([values]))
+
+        return list(self.stream(values))
+
+    def stream(self, values: Iterable[str | Path]) -> Iterator[str]:
+        """Transform the input files lazily.
+
+        Args:
+            values (Iterable[str | Path]): The paths of the input files.
+
+        Returns:
+            Iterator[str]: The paths of the result files.
+
+        Raises:
+            PySaxonApiError: When an input can not be parsed or the XSL transformation fails.
+        """
+        session = self.session or current_session()
+        observer = current_observer()
+
+        with phase_timer(observer, self.name, "compile"):
+            xslt_executable = session.executable(self.xslt)
+        cache = session.cache
+
+        self._apply_params(cache=cache, xsl_exec=xslt_executable)
+
+        def apply(value: str | Path) -> str:
+            return self._transform_file(
+                source=Path(value), cache=cache, xsl_exec=xslt_executable, observer=observer
+            )
+
+        if (items := item_observer(observer)) is not None:
+            return timed_items(
+                items, self.name, values, apply, size=lambda value: Path(value).stat().st_size
+            )
+        return (apply(value) for value in values)
+
+    def output_path(self, source: str | Path) -> Path:
+        """Return the path of the result of an input file.
+
+        Args:
+            source (str | Path): The path of the input file.
+
+        Returns:
+            Path: The path of the result file.
+        """
+        source = Path(source)
+        if "{" in str(self.output):
+            return Path(
+                str(self.output).format(
+                    stem=source.stem, suffix=source.suffix, name=source.name, parent=source.parent
+                )
+            )
+        return Path(self.output) / source.name
+
+    def fingerprint(self, deterministic: bool = False) -> str | None:
+        """Return None, the results are paths and do not reflect the content of the inputs.
+
+        Args:
+            deterministic (bool): Unused.
+
+        Returns:
+            str | None: None, results of file-to-file steps can not be cached.
+        """
+        return None
+
+    def _transform_file(
+        self,
+        source: Path,
+        cache: StylesheetCache,
+        xsl_exec: PyXsltExecutable,
+        observer: Observer | None = None,
+    ) -> str:
+        target = self.output_path(source)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        partial = target.with_name(f".{target.name}.part")
+
+        self._apply_dynamic_params(cache=cache, xsl_exec=xsl_exec)
+
+        # Saxon parses while transforming, so this phase includes parsing and serialization
+        try:
+            with phase_timer(observer, self.name, "transform"):
+                xsl_exec.transform_to_file(source_file=str(source), output_file=str(partial))  # type: ignore
+            partial.replace(target)
+        finally:
+            partial.unlink(missing_ok=True)
+
+        return str(target)
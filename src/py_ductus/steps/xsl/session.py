@@ -0,0 +1,206 @@
+"""Long-lived Saxon sessions shared by XSL steps."""
+
+import os
+import threading
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Self
+
+from saxonche import PySaxonProcessor, PyXsltExecutable
+
+from py_ductus.steps.xsl.cache import StylesheetCache
+
+
+class SaxonSession:
+    """A Saxon processor with its compiled stylesheets, kept warm across calls.
+
+    Steps running in the same session share one `PySaxonProcessor`, its
+    `PyXslt30Processor` and the compiled executables. Use the session as a context
+    manager or call `close()` to release them.
+    """
+
+    cache_size: int
+    recycle_after: int | None
+
+    def __init__(self, cache_size: int = 128, recycle_after: int | None = None) -> None:
+        """Initialize a SaxonSession.
+
+        Args:
+            cache_size (int): The maximum number of compiled stylesheets kept in the session.
+            recycle_after (int | None): Replace the processor and drop all compiled stylesheets after this many step calls, to bound the native memory of long-running workers.
+
+        Raises:
+            ValueError: When `recycle_after` is smaller than one.
+        """
+        if recycle_after is not None and recycle_after < 1:
+            raise ValueError("A session must be recycled after at least one call.")
+
+        self.cache_size = cache_size
+        self.recycle_after = recycle_after
+        self._cache: StylesheetCache | None = None
+        self._pid = os.getpid()
+        self._calls = 0
+        self._closed = False
+        self._lock = threading.RLock()
+
+    @property
+    def cache(self) -> StylesheetCache:
+        """The compiled stylesheets of the session.
+
+        Returns:
+            StylesheetCache: The stylesheet cache.
+
+        Raises:
+            RuntimeError: When the session is closed.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The Saxon session is closed.")
+            if self._pid != os.getpid():
+                # A forked worker must not use the processor of its parent
+                self._cache = None
+                self._pid = os.getpid()
+            if self._cache is None:
+                self._cache = StylesheetCache(
+                    maxsize=self.cache_size, processor=PySaxonProcessor(license=False)
+                )
+            return self._cache
+
+    @property
+    def processor(self) -> PySaxonProcessor:
+        """The processor of the session.
+
+        Returns:
+            PySaxonProcessor: The processor.
+        """
+        return self.cache.processor
+
+    @property
+    def closed(self) -> bool:
+        """Whether the session is closed.
+
+        Returns:
+            bool: True if the session is closed.
+        """
+        return self._closed
+
+    def executable(self, xslt: str | Path) -> PyXsltExecutable:
+        """Return a private copy of a compiled stylesheet.
+
+        Every call counts as one use of the session; when `recycle_after` uses are
+        reached, the session is recycled before the stylesheet is looked up.
+
+        Args:
+            xslt (str | Path): The XSL stylesheet.
+
+        Returns:
+            PyXsltExecutable: A clone of the cached executable, which may be parametrized freely.
+        """
+        return self.executables([xslt])[0]
+
+    def executables(self, xslts: Sequence[str | Path]) -> list[PyXsltExecutable]:
+        """Return private copies of several compiled stylesheets as one use of the session.
+
+        The executables are guaranteed to belong to the same processor, so nodes can be
+        passed between them.
+
+        Args:
+            xslts (Sequence[str | Path]): The XSL stylesheets.
+
+        Returns:
+            list[PyXsltExecutable]: Clones of the cached executables, in order.
+        """
+        with self._lock:
+            if self.recycle_after is not None and self._calls >= self.recycle_after:
+                self.recycle()
+            self._calls += 1
+            return [self.cache.get(xslt).clone() for xslt in xslts]  # type: ignore
+
+    def recycle(self) -> None:
+        """Drop the processor and all compiled stylesheets; they are recreated on next use."""
+        with self._lock:
+            self._cache = None
+            self._calls = 0
+
+    def close(self) -> None:
+        """Close the session and release its processor."""
+        with self._lock:
+            self._cache = None
+            self._closed = True
+
+    def __getstate__(self) -> dict[str, Any]:
+        """Pickle only the settings of the session; processors can not leave their process."""
+        return {"cache_size": self.cache_size, "recycle_after": self.recycle_after}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        """Restore an unpickled session with a fresh processor."""
+        self.__init__(**state)  # type: ignore
+
+    def __enter__(self) -> Self:
+        """Enter the session context.
+
+        Returns:
+            SaxonSession: The session itself.
+        """
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Close the session when leaving the context."""
+        self.close()
+
+
+_default_session: SaxonSession | None = None
+_default_lock = threading.Lock()
+_current_session: ContextVar[SaxonSession | None] = ContextVar("current_session", default=None)
+
+
+def default_session() -> SaxonSession:
+    """Return the process-wide session, which is used when no other session is active.
+
+    Returns:
+        SaxonSession: The default session.
+    """
+    global _default_session  # noqa: PLW0603
+
+    with _default_lock:
+        if _default_session is None or _default_session.closed:
+            _default_session = SaxonSession()
+        return _default_session
+
+
+def current_session() -> SaxonSession:
+    """Return the session activated with `use_session`, or the default session.
+
+    Returns:
+        SaxonSession: The current session.
+    """
+    return _current_session.get() or default_session()
+
+
+@contextmanager
+def use_session(session: SaxonSession | None) -> Iterator[SaxonSession]:
+    """Activate a session for all steps without an own session.
+
+    Args:
+        session (SaxonSession | None): The session to activate; the current session is kept if None.
+
+    Yields:
+        SaxonSession: The active session.
+    """
+    if session is None:
+        yield current_session()
+        return
+
+    token = _current_session.set(session)
+    try:
+        yield session
+    finally:
+        _current_session.reset(token)
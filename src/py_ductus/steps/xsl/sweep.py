@@ -0,0 +1,197 @@
+"""Module for the XSL parameter sweep step."""
+
+from collections.abc import Callable, Iterable, Iterator
+from functools import partial
+from pathlib import Path
+from typing import Any
+from weakref import WeakKeyDictionary
+
+from saxonche import PyXdmValue, PyXsltExecutable
+
+from py_ductus.common.document import Document
+from py_ductus.common.encoding import Buffer
+from py_ductus.instrumentation import Observer, current_observer, phase_timer
+from py_ductus.steps.xsl.cache import StylesheetCache
+from py_ductus.steps.xsl.session import SaxonSession, current_session
+from py_ductus.steps.xsl.types import XSLParam, applies_itself, param_list
+from py_ductus.steps.xsl.xsl import XSL, BoundStep, XMLInput, XMLOutput, convert_params
+
+
+class XSLSweep(XSL):
+    """A XSL step, which renders every input value once per parameter set.
+
+    The step produces one result per (value, param set), ordered by value first,
+    i.e. for two values and the sets `a` and `b` the results are `value 1 + a`,
+    `value 1 + b`, `value 2 + a`, `value 2 + b`. Each value is parsed once, the
+    stylesheet is compiled once and every param set is converted to XDM values
+    once per processor.
+    """
+
+    _name: str = "xsl_sweep"
+    param_sets: list[XSLParam | list[XSLParam]]
+
+    def __init__(  # noqa: PLR0913
+        self,
+        xslt: str | Path,
+        param_sets: list[XSLParam | list[XSLParam]],
+        params: XSLParam | list[XSLParam] | None = None,
+        dynamic_params: (Callable[[], XSLParam] | list[Callable[[], XSLParam]] | None) = None,
+        session: SaxonSession | None = None,
+        *,
+        output_encoding: str | None = None,
+    ):
+        """Initialize a XSL sweep step.
+
+        Args:
+            xslt (str | Path): The XSL stylesheet.
+            param_sets (list[XSLParam | list[XSLParam]]): The parameter sets, one result is produced per set.
+            params (XSLParam | list[XSLParam] | None): Parameters shared by all sets; a set overrides params of the same name.
+            dynamic_params (Callable[[], XSLParam] | list[Callable[[], XSLParam]] | None): Dynamic parameters for the XSL transformation, which are evaluated for each result.
+            session (SaxonSession | None): The Saxon session to run in; the current session is used if omitted.
+            output_encoding (str | None): The encoding of bytes results, e.g. "utf-8"; results are `str` if omitted.
+
+        Raises:
+            ValueError: When no param set is given.
+        """
+        if not param_sets:
+            raise ValueError("A XSL sweep needs at least one param set.")
+
+        super().__init__(
+            xslt=xslt,
+            params=params,
+            dynamic_params=dynamic_params,
+            session=session,
+            output_encoding=output_encoding,
+        )
+        self.param_sets = param_sets
+        self._converted_sets: WeakKeyDictionary[
+            StylesheetCache, list[list[tuple[str, PyXdmValue]]]
+        ] = WeakKeyDictionary()
+
+    def __call__(self, values: Iterable[XMLInput]) -> Iterable[XMLOutput]:
+        """Apply the XSL transformation to the input values, once per param set.
+
+        Args:
+            values (list[str | bytes | Document]): The input values; a single value gives one result per param set, too.
+
+        Returns:
+            list[str | bytes | Document]: The transformed values, `len(param_sets)` per input value.
+
+        Raises:
+            StepError: When the XSL transformation fails.
+        """
+        if isinstance(values, str | Buffer | Document):
+            return list(self.stream([values]))
+
+        return list(self.stream(values))
+
+    def stream(self, values: Iterable[XMLInput]) -> Iterator[XMLOutput]:
+        """Apply the XSL transformation lazily to the input values, once per param set.
+
+        Args:
+            values (Iterable[str | bytes | Document]): The input values.
+
+        Returns:
+            Iterator[str | bytes | Document]: The transformed values, `len(param_sets)` per input value.
+
+        Raises:
+            StepError: When the XSL transformation fails.
+        """
+        return self.bind().stream(values)
+
+    def bind(self) -> BoundStep:
+        """Resolve the session and parametrize one clone of the stylesheet per set once, for several streams of values.
+
+        Returns:
+            BoundStep: A step, which renders the values of every stream with the same executables.
+        """
+        session = self.session or current_session()
+        observer = current_observer()
+
+        with phase_timer(observer, self.name, "compile"):
+            xslt_executable = session.executable(self.xslt)
+        cache = session.cache
+
+        # One parametrized clone per set, so no set inherits the params of another
+        executables = []
+        for params, converted in zip(self.param_sets, self._set_params(cache), strict=True):
+            executable: PyXsltExecutable = xslt_executable.clone()  # type: ignore
+            self._apply_params(cache=cache, xsl_exec=executable)
+            for name, value in converted:
+                executable.set_parameter(name, value)  # type: ignore
+            for param in param_list(params):
+                if applies_itself(param):
+                    param.apply_param(cache.processor, executable)
+            executables.append(executable)
+
+        return BoundStep(
+            self.name,
+            partial(self._sweep, cache=cache, executables=executables, observer=observer),
+        )
+
+    def prepare(self, session: SaxonSession | None = None) -> None:
+        """Compile the stylesheet and convert the params and param sets ahead of the first call.
+
+        Args:
+            session (SaxonSession | None): The session to compile in, unless the step has an own session; the current session is used if omitted.
+
+        Raises:
+            PySaxonApiError: When the stylesheet does not compile.
+        """
+        session = self.session or session or current_session()
+        super().prepare(session)
+        self._set_params(session.cache)
+
+    def fingerprint(self, deterministic: bool = False) -> str | None:
+        """Return None, a sweep produces several results per value, which can not be cached.
+
+        Args:
+            deterministic (bool): Unused.
+
+        Returns:
+            str | None: None.
+        """
+        return None
+
+    def _sweep(
+        self,
+        values: Iterable[XMLInput],
+        cache: StylesheetCache,
+        executables: list[PyXsltExecutable],
+        observer: Observer | None,
+    ) -> Iterator[XMLOutput]:
+        for value in values:
+            node = self._parse(input_value=value, proc=cache.processor, observer=observer)
+            for executable in executables:
+                yield self._serialize(
+                    node=node,
+                    input_value=value,
+                    cache=cache,
+                    xsl_exec=executable,
+                    observer=observer,
+                )
+
+    def _set_params(self, cache: StylesheetCache) -> list[list[tuple[str, PyXdmValue]]]:
+        converted = self._converted_sets.get(cache)
+        if converted is None:
+            # Params with an own apply_param are applied per clone in `stream`
+            converted = [
+                convert_params(
+                    [param for param in param_list(params) if not applies_itself(param)],
+                    cache.processor,
+                )
+                for params in self.param_sets
+            ]
+            self._converted_sets[cache] = converted
+        return converted
+
+    def __getstate__(self) -> dict[str, Any]:
+        """Pickle the step without its converted params; they belong to a processor."""
+        state = super().__getstate__()
+        del state["_converted_sets"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        """Restore an unpickled step."""
+        super().__setstate__(state)
+        self._converted_sets = WeakKeyDictionary()
@@ -1,7 +1,12 @@
-"""Param types for XSL steps."""
+"""Param types for XSL steps.
+
+Params may carry a `key`, under which their converted XDM value is memoized per
+processor when they are returned by dynamic params; see `param_key`.
+"""
 
 from builtins import bool, float
-from typing import Generic, Protocol, TypeVar, runtime_checkable
+from collections.abc import Hashable
+from typing import Any, Generic, Protocol, TypeVar, runtime_checkable
 
 from saxonche import (
     PySaxonProcessor,
@@ -10,7 +15,7 @@ from saxonche import (
     PyXdmMap,
     PyXdmValue,
     PyXslt30Processor,
-    create_xdm_dict,
+    PyXsltExecutable,
 )
 
 AtomicType = str | int | float | bool
@@ -50,12 +55,14 @@ class XSLParam(Protocol, Generic[TXdmValue_co, TAtomic]):
         """
         ...
 
-    def apply_param(self, proc: PySaxonProcessor, xsl_proc: PyXslt30Processor) -> None:
+    def apply_param(
+        self, proc: PySaxonProcessor, xsl_proc: PyXslt30Processor | PyXsltExecutable
+    ) -> None:
         """Apply the parameter to the processor.
 
         Args:
             proc (PySaxonProcessor): The processor to apply the parameter to.
-            xsl_proc (PyXslt30Processor): The processor to apply the parameter to.
+            xsl_proc (PyXslt30Processor | PyXsltExecutable): The processor or executable to apply the parameter to.
         """
         ...
 
@@ -65,16 +72,19 @@ class XSLAtomicParam(XSLParam):
 
     name: str | None
     value: AtomicType | PyXdmValue
+    key: Hashable | None
 
-    def __init__(self, name: str | None, value: AtomicType) -> None:
+    def __init__(self, name: str | None, value: AtomicType, key: Hashable | None = None) -> None:
         """Initialize a XSLAtomicParam.
 
         Args:
             name (str): The name of the parameter.
             value (AtomicType): The value of the parameter.
+            key (Hashable | None): Identifies the value, so its conversion can be memoized.
         """
         self.name = name
         self.value = value
+        self.key = key
 
     def convert_to_saxon(self, proc: PySaxonProcessor) -> PyXdmAtomicValue | PyXdmValue:
         """Convert the parameter to a Saxon parameter.
@@ -97,15 +107,17 @@ class XSLAtomicParam(XSLParam):
             return self.value
         raise TypeError(f"Unsupported type {type(self.value)}")
 
-    def apply_param(self, proc: PySaxonProcessor, xsl_proc: PyXslt30Processor) -> None:
+    def apply_param(
+        self, proc: PySaxonProcessor, xsl_proc: PyXslt30Processor | PyXsltExecutable
+    ) -> None:
         """Apply the parameter to the processor.
 
         Args:
             proc (PySaxonProcessor): The processor to apply the parameter to.
-            xsl_proc (PyXslt30Processor): The processor to apply the parameter to.
+            xsl_proc (PyXslt30Processor | PyXsltExecutable): The processor or executable to apply the parameter to.
         """
         if self.name is not None:
-            xsl_proc.set_parameter(self.name, self.convert_to_saxon(proc))
+            xsl_proc.set_parameter(self.name, self.convert_to_saxon(proc))  # type: ignore
 
 
 class XSLArrayParam(XSLParam):
@@ -113,16 +125,21 @@ class XSLArrayParam(XSLParam):
 
     name: str | None
     value: list[AtomicType]
+    key: Hashable | None
 
-    def __init__(self, name: str | None, value: list[AtomicType]) -> None:
+    def __init__(
+        self, name: str | None, value: list[AtomicType], key: Hashable | None = None
+    ) -> None:
         """Initialize a XSLArray.
 
         Args:
             name (str): The name of the parameter.
             value (list[XSLAtomicParam]): The value of the parameter.
+            key (Hashable | None): Identifies the value, so its conversion can be memoized.
         """
         self.name = name
         self.value = value
+        self.key = key
 
     def convert_to_saxon(self, proc: PySaxonProcessor) -> PyXdmArray:
         """Convert the parameter to a Saxon parameter.
@@ -137,33 +154,46 @@ class XSLArrayParam(XSLParam):
             [XSLAtomicParam(value=val, name=None).convert_to_saxon(proc=proc) for val in self.value]
         )
 
-    def apply_param(self, proc: PySaxonProcessor, xsl_proc: PyXslt30Processor) -> None:
+    def apply_param(
+        self, proc: PySaxonProcessor, xsl_proc: PyXslt30Processor | PyXsltExecutable
+    ) -> None:
         """Apply the parameter to the processor.
 
         Args:
             proc (PySaxonProcessor): The processor to apply the parameter to.
-            xsl_proc (PyXslt30Processor): The processor to apply the parameter to.
+            xsl_proc (PyXslt30Processor | PyXsltExecutable): The processor or executable to apply the parameter to.
         """
         if self.name is not None:
-            xsl_proc.set_parameter(self.name, self.convert_to_saxon(proc))
+            xsl_proc.set_parameter(self.name, self.convert_to_saxon(proc))  # type: ignore
+
 
+class XSLMapParam(XSLParam):
+    """A (saxon) XSL Map Parameter.
 
-# Note this is not used yet, because create_xdm_dict seems to be buggy
-class XSLMapParam:
-    """A (saxon) XSL Map Parameter."""
+    The keys of the map are strings; values may be atomic values, lists of atomic
+    values (arrays) or nested maps.
+    """
 
-    name: str
+    name: str | None
     value: dict[str, AtomicType | list[AtomicType]]
+    key: Hashable | None
 
-    def __init__(self, name: str, value: dict[str, AtomicType | list[AtomicType]]) -> None:
+    def __init__(
+        self,
+        name: str | None,
+        value: dict[str, AtomicType | list[AtomicType]],
+        key: Hashable | None = None,
+    ) -> None:
         """Initialize a XSLMapParam.
 
         Args:
             name (str): The name of the parameter.
             value (dict[str, AtomicType | list[AtomicType]]): The value of the parameter.
+            key (Hashable | None): Identifies the value, so its conversion can be memoized.
         """
         self.name = name
         self.value = value
+        self.key = key
 
     def convert_to_saxon(self, proc: PySaxonProcessor) -> PyXdmMap:
         """Convert the parameter to a Saxon parameter.
@@ -174,25 +204,101 @@ class XSLMapParam:
         Returns:
             PyXdmMap: The Saxon parameter.
         """
-        xdm_data_dict = create_xdm_dict(
-            proc,
-            {
-                key: (
-                    XSLArrayParam(value=value, name=None).convert_to_saxon(proc=proc)
-                    if isinstance(value, list)
-                    else XSLAtomicParam(value=value, name=None).convert_to_saxon(proc=proc)
-                )
-                for key, value in self.value.items()
-            },
+        # create_xdm_dict and make_map crash the processor, make_map2 takes str keys
+        return proc.make_map2(  # type: ignore
+            {key: _convert_value(value, proc) for key, value in self.value.items()}
         )
 
-        return proc.make_map(xdm_data_dict)  # type: ignore
-
-    def apply_param(self, proc: PySaxonProcessor, xsl_proc: PyXslt30Processor) -> None:
+    def apply_param(
+        self, proc: PySaxonProcessor, xsl_proc: PyXslt30Processor | PyXsltExecutable
+    ) -> None:
         """Apply the parameter to the processor.
 
         Args:
             proc (PySaxonProcessor): The processor to apply the parameter to.
-            xsl_proc (PyXslt30Processor): The processor to apply the parameter to.
+            xsl_proc (PyXslt30Processor | PyXsltExecutable): The processor or executable to apply the parameter to.
         """
-        xsl_proc.set_parameter(self.name, self.convert_to_saxon(proc))
+        if self.name is not None:
+            xsl_proc.set_parameter(self.name, self.convert_to_saxon(proc))  # type: ignore
+
+
+def param_key(param: XSLParam) -> Hashable | None:
+    """Return the key under which the converted value of a param can be memoized.
+
+    Params with an explicit `key` are keyed by it, params with an atomic value by
+    the value itself. Other params, e.g. arrays without a key, are not memoized,
+    since building a key from their value would cost about as much as converting it.
+    Params with an own `apply_param` are not memoized either, they apply themselves.
+
+    Args:
+        param (XSLParam): The param.
+
+    Returns:
+        Hashable | None: The key, or None if the param can not be memoized.
+    """
+    if applies_itself(param):
+        return None
+    key = getattr(param, "key", None)
+    if key is not None:
+        return (type(param).__name__, "key", key)
+    if isinstance(param.value, str | int | float | bool):
+        return (type(param).__name__, type(param.value).__name__, param.value)
+    return None
+
+
+def param_list(params: XSLParam | list[XSLParam] | None) -> list[XSLParam]:
+    """Return the params of a step as a list.
+
+    Args:
+        params (XSLParam | list[XSLParam] | None): A param, a list of params or None.
+
+    Returns:
+        list[XSLParam]: The params.
+    """
+    if params is None:
+        return []
+    return params if isinstance(params, list) else [params]
+
+
+def params_fingerprint(params: XSLParam | list[XSLParam] | None, kind: str = "") -> str | None:
+    """Return the part of a step fingerprint which identifies its params.
+
+    Args:
+        params (XSLParam | list[XSLParam] | None): A param, a list of params or None.
+        kind (str): A prefix distinguishing e.g. evaluated dynamic params from static params.
+
+    Returns:
+        str | None: The text to digest, or None if a param has a value which is no plain Python value.
+    """
+    parts = []
+    for param in param_list(params):
+        if not isinstance(param.value, str | int | float | bool | list | dict):
+            return None
+        parts.append(f"\0{kind}{type(param).__name__}:{param.name}={param.value!r}")
+    return "".join(parts)
+
+
+def applies_itself(param: XSLParam) -> bool:
+    """Return whether a param overrides `apply_param` of the built-in param types.
+
+    Such params are applied with their own `apply_param` instead of setting their
+    converted value on the executable.
+
+    Args:
+        param (XSLParam): The param.
+
+    Returns:
+        bool: True if the param has an own `apply_param`.
+    """
+    return type(param).apply_param not in _BUILT_IN_APPLY
+
+
+_BUILT_IN_APPLY = (XSLAtomicParam.apply_param, XSLArrayParam.apply_param, XSLMapParam.apply_param)
+
+
+def _convert_value(value: Any, proc: PySaxonProcessor) -> PyXdmValue:
+    if isinstance(value, dict):
+        return XSLMapParam(value=value, name=None).convert_to_saxon(proc=proc)
+    if isinstance(value, list):
+        return XSLArrayParam(value=value, name=None).convert_to_saxon(proc=proc)
+    return XSLAtomicParam(value=value, name=None).convert_to_saxon(proc=proc)
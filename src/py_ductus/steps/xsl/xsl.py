@@ -1,115 +1,577 @@
 """Module for the XSL step."""
 
-from collections.abc import Callable, Iterable
+import hashlib
+import time
+from collections.abc import Callable, Iterable, Iterator
+from functools import partial
 from pathlib import Path
+from typing import Any
+from weakref import WeakKeyDictionary
 
-from saxonche import PySaxonProcessor, PyXslt30Processor, PyXsltExecutable
+from saxonche import PySaxonProcessor, PyXdmNode, PyXdmValue, PyXsltExecutable
 
+from py_ductus.common.document import Document
+from py_ductus.common.encoding import Buffer, decode_xml, encode_xml
+from py_ductus.instrumentation import (
+    Observer,
+    current_observer,
+    item_observer,
+    phase_timer,
+    timed_items,
+)
 from py_ductus.steps.error import StepError
-from py_ductus.steps.xsl.types import XSLAtomicParam, XSLParam
+from py_ductus.steps.xsl.cache import StylesheetCache
+from py_ductus.steps.xsl.session import SaxonSession, current_session
+from py_ductus.steps.xsl.types import (
+    XSLParam,
+    applies_itself,
+    param_key,
+    param_list,
+    params_fingerprint,
+)
 
 AtomicType = str | int | float | bool
+XMLInput = str | Buffer | Document
+XMLOutput = str | bytes | Document
 
 
-class XSL:
-    """A XSL step.
+class XSLBase:
+    """The stylesheet, params and session shared by XSL steps.
 
-    This step applies a XSL transformation to the input values.
+    Subclasses define which values they transform and what they return; the base
+    compiles the stylesheet in the session and converts the static params once
+    per processor.
     """
 
     _name: str = "xsl"
-    dynamic_params: Callable[[], XSLAtomicParam] | list[Callable[..., XSLAtomicParam]] | None
+    dynamic_params: Callable[[], XSLParam] | list[Callable[..., XSLParam]] | None
     proc_params: XSLParam | list[XSLParam] | None
+    session: SaxonSession | None
     xslt: str | Path
 
     def __init__(
         self,
         xslt: str | Path,
         params: XSLParam | list[XSLParam] | None = None,
-        dynamic_params: (
-            Callable[[], XSLAtomicParam] | list[Callable[[], XSLAtomicParam]] | None
-        ) = None,
+        dynamic_params: (Callable[[], XSLParam] | list[Callable[[], XSLParam]] | None) = None,
+        session: SaxonSession | None = None,
     ):
         """Initialize a XSL step.
 
-        Initialize a XSL step with the stylesheet and parameters.
-
         Args:
             xslt (str | Path): The XSL stylesheet.
             params (XSLParam | list[XSLParam] | None): The parameters for the XSL transformation.
-            dynamic_params (Callable[[], XslAtomicParam] | list[Callable[[], XslAtomicParam]] | None): Dynamic parameters for the XSL transformation, which are evaluated for each input value.
+            dynamic_params (Callable[[], XSLParam] | list[Callable[[], XSLParam]] | None): Dynamic parameters for the XSL transformation, which are evaluated for each input value.
+            session (SaxonSession | None): The Saxon session to run in; the current session is used if omitted.
         """
         self.xslt = xslt
         self.proc_params = params
         self.dynamic_params = dynamic_params
+        self.session = session
+        self._converted_params: WeakKeyDictionary[StylesheetCache, list[tuple[str, PyXdmValue]]] = (
+            WeakKeyDictionary()
+        )
+
+    def prepare(self, session: SaxonSession | None = None) -> None:
+        """Compile the stylesheet and convert the static params ahead of the first call.
+
+        Args:
+            session (SaxonSession | None): The session to compile in, unless the step has an own session; the current session is used if omitted.
+
+        Raises:
+            PySaxonApiError: When the stylesheet does not compile.
+        """
+        session = self.session or session or current_session()
+        session.executable(self.xslt)
+        self._static_params(session.cache)
+
+    def _apply_params(self, cache: StylesheetCache, xsl_exec: PyXsltExecutable) -> None:
+        for name, value in self._static_params(cache):
+            xsl_exec.set_parameter(name, value)  # type: ignore
+        for param in param_list(self.proc_params):
+            if applies_itself(param):
+                param.apply_param(cache.processor, xsl_exec)
+
+    def _static_params(self, cache: StylesheetCache) -> list[tuple[str, PyXdmValue]]:
+        # Static params are converted once per processor; XDM values can be shared by executables
+        values = self._converted_params.get(cache)
+        if values is not None:
+            return values
+
+        params = [param for param in param_list(self.proc_params) if not applies_itself(param)]
+        values = convert_params(params, cache.processor)
+        self._converted_params[cache] = values
+        return values
+
+    def __getstate__(self) -> dict[str, Any]:
+        """Pickle the step without its converted params; they belong to a processor."""
+        state = self.__dict__.copy()
+        del state["_converted_params"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        """Restore an unpickled step."""
+        self.__dict__.update(state)
+        self._converted_params = WeakKeyDictionary()
+
+    def _apply_dynamic_params(self, cache: StylesheetCache, xsl_exec: PyXsltExecutable) -> None:
+        if self.dynamic_params is None:
+            return
+
+        dynamic_params = (
+            self.dynamic_params if isinstance(self.dynamic_params, list) else [self.dynamic_params]
+        )
+        for dynamic_param in dynamic_params:
+            param = dynamic_param()
+            if param.name is None:
+                continue
+
+            # Recurring values are converted once per processor
+            key = param_key(param)
+            if key is None:
+                param.apply_param(cache.processor, xsl_exec)
+            else:
+                value = cache.xdm_value(key, param.convert_to_saxon)
+                xsl_exec.set_parameter(param.name, value)  # type: ignore
+
+    @property
+    def name(self) -> str:
+        """The name of the step.
+
+        Returns:
+            str: The name of the step.
+        """
+        return self._name
+
+
+class XSL(XSLBase):
+    """A XSL step.
+
+    This step applies a XSL transformation to the input values. Input values may
+    also be `Document`s, which are parsed at most once per processor; their
+    results are derived documents, which record the time spent by the step.
+
+    Inputs may be bytes-like, e.g. `bytes`, `memoryview`s or memory-mapped
+    files, which are decoded once in the encoding they declare. With an
+    `output_encoding`, results are bytes in that encoding (documents keep them as
+    their `data`), and their XML declaration names it.
+    """
+
+    _name: str = "xsl"
+    output_encoding: str | None
+
+    def __init__(
+        self,
+        xslt: str | Path,
+        params: XSLParam | list[XSLParam] | None = None,
+        dynamic_params: (Callable[[], XSLParam] | list[Callable[[], XSLParam]] | None) = None,
+        session: SaxonSession | None = None,
+        output_encoding: str | None = None,
+    ):
+        """Initialize a XSL step.
+
+        Initialize a XSL step with the stylesheet and parameters.
+
+        Args:
+            xslt (str | Path): The XSL stylesheet.
+            params (XSLParam | list[XSLParam] | None): The parameters for the XSL transformation.
+            dynamic_params (Callable[[], XSLParam] | list[Callable[[], XSLParam]] | None): Dynamic parameters for the XSL transformation, which are evaluated for each input value.
+            session (SaxonSession | None): The Saxon session to run in; the current session is used if omitted.
+            output_encoding (str | None): The encoding of bytes results, e.g. "utf-8"; results are `str` if omitted.
+        """
+        super().__init__(xslt=xslt, params=params, dynamic_params=dynamic_params, session=session)
+        self.output_encoding = output_encoding
 
-    def __call__(self, values: Iterable[str]) -> Iterable[str]:
+    def __call__(self, values: Iterable[XMLInput]) -> Iterable[XMLOutput]:
         """Apply the XSL transformation to the input values.
 
         Args:
-            values (list[str]): The input values.
+            values (list[str | bytes | Document]): The input values.
 
         Returns:
-            list[str]: The transformed values.
+            list[str | bytes | Document]: The transformed values.
 
         Raises:
             StepError: When the XSL transformation fails.
         """
-        with PySaxonProcessor(license=False) as proc:
-            xsl_proc = proc.new_xslt30_processor()
+        if isinstance(values, str | Buffer | Document):
+            return next(self.stream([values]))  # type: ignore
 
-            self._apply_params(proc=proc, xsl_proc=xsl_proc)
+        return list(self.stream(values))
 
-            xslt_executable: PyXsltExecutable = (
-                xsl_proc.compile_stylesheet(stylesheet_text=self.xslt)
-                if isinstance(self.xslt, str)
-                else xsl_proc.compile_stylesheet(stylesheet_file=str(self.xslt))
-            )  # type: ignore
+    def stream(self, values: Iterable[XMLInput]) -> Iterator[XMLOutput]:
+        """Apply the XSL transformation lazily to the input values.
 
-            result: str | list[str]
-            if isinstance(values, str):
-                result = self._apply_xslt(input_value=values, proc=proc, xsl_exec=xslt_executable)
-            else:
-                result = [
-                    self._apply_xslt(input_value=value, proc=proc, xsl_exec=xslt_executable)
-                    for value in values
-                ]
+        The session and the stylesheet are resolved when `stream` is called, the
+        values are transformed one at a time while the iterator is consumed.
 
-        return result
+        Args:
+            values (Iterable[str | bytes | Document]): The input values.
 
-    def _apply_params(self, proc: PySaxonProcessor, xsl_proc: PyXslt30Processor) -> None:
-        if self.proc_params is None:
-            return
+        Returns:
+            Iterator[str | bytes | Document]: The transformed values.
+
+        Raises:
+            StepError: When the XSL transformation fails.
+        """
+        return self.bind().stream(values)
 
-        if isinstance(self.proc_params, list):
-            for param in self.proc_params:
-                param.apply_param(proc, xsl_proc)
-        else:
-            self.proc_params.apply_param(proc, xsl_proc)
+    def bind(self) -> "BoundStep":
+        """Resolve the session and parametrize a clone of the stylesheet once, for several streams of values.
 
-    def _apply_dynamic_params(self, proc: PySaxonProcessor, xsl_proc: PyXslt30Processor) -> None:
-        if self.dynamic_params is None:
-            return
+        Returns:
+            BoundStep: A step, which transforms the values of every stream with the same executable.
+        """
+        session = self.session or current_session()
+        observer = current_observer()
 
-        if isinstance(self.dynamic_params, list):
-            for param in self.dynamic_params:
-                param().apply_param(proc, xsl_proc)
-        else:
-            self.dynamic_params().apply_param(proc, xsl_proc)
+        with phase_timer(observer, self.name, "compile"):
+            xslt_executable = session.executable(self.xslt)
+        cache = session.cache
 
-    def _apply_xslt(
-        self, input_value: str, proc: PySaxonProcessor, xsl_exec: PyXsltExecutable
-    ) -> str:
-        self._apply_dynamic_params(proc=proc, xsl_proc=xsl_exec)  # type: ignore
+        self._apply_params(cache=cache, xsl_exec=xslt_executable)
+
+        apply = partial(self._apply_xslt, cache=cache, xsl_exec=xslt_executable, observer=observer)
+        return BoundStep(self.name, partial(_apply_each, apply, self.name, observer))
+
+    def fingerprint(self, deterministic: bool = False) -> str | None:
+        """Return a fingerprint of the stylesheet and the params of the step.
+
+        Stylesheets included or imported by a stylesheet file are not part of the
+        fingerprint.
+
+        Args:
+            deterministic (bool): Whether dynamic params are declared deterministic, i.e. always return the same param; they are evaluated once and identified by their name and value then.
 
-        result: str | None = xsl_exec.transform_to_string(  # type: ignore
-            xdm_node=proc.parse_xml(xml_text=input_value)
+        Returns:
+            str | None: The fingerprint, or None if the step has dynamic params which are not declared deterministic, or params which are no plain Python values.
+        """
+        if self.dynamic_params is not None and not deterministic:
+            return None
+
+        digest = hashlib.sha256()
+        digest.update(
+            self.xslt.encode("utf-8") if isinstance(self.xslt, str) else self.xslt.read_bytes()
+        )
+
+        if self.output_encoding is not None:
+            digest.update(f"\0output_encoding:{self.output_encoding}".encode())
+
+        dynamic_params = (
+            self.dynamic_params if isinstance(self.dynamic_params, list) else [self.dynamic_params]
         )
+        # Deterministic params always return the same param, so it stands for every call
+        evaluated = [
+            dynamic_param() for dynamic_param in dynamic_params if dynamic_param is not None
+        ]
+
+        static = params_fingerprint(self.proc_params)
+        dynamic = params_fingerprint(evaluated, kind="dynamic:")
+        if static is None or dynamic is None:
+            return None
+
+        digest.update(f"{static}{dynamic}".encode())
+        return digest.hexdigest()
+
+    def _apply_params(self, cache: StylesheetCache, xsl_exec: PyXsltExecutable) -> None:
+        super()._apply_params(cache=cache, xsl_exec=xsl_exec)
+        if self.output_encoding is not None:
+            # SaxonC decodes serialized results as UTF-8; they are encoded in Python afterwards
+            xsl_exec.set_property("!encoding", "UTF-8")  # type: ignore
+
+    def _apply_xslt(
+        self,
+        input_value: XMLInput,
+        cache: StylesheetCache,
+        xsl_exec: PyXsltExecutable,
+        observer: Observer | None = None,
+    ) -> XMLOutput:
+        started = time.perf_counter()
+        result = self._serialize(
+            node=self._parse(input_value=input_value, proc=cache.processor, observer=observer),
+            input_value=input_value,
+            cache=cache,
+            xsl_exec=xsl_exec,
+            observer=observer,
+        )
+        return _record_timing(result, self.name, started)
+
+    def _parse(
+        self,
+        input_value: XMLInput,
+        proc: PySaxonProcessor,
+        observer: Observer | None = None,
+    ) -> PyXdmNode:
+        if isinstance(input_value, Document):
+            if input_value.parsed_by(proc):
+                return input_value.node(proc)
+            with phase_timer(observer, self.name, "parse"):
+                return input_value.node(proc)
+
+        with phase_timer(observer, self.name, "parse"):
+            text = input_value if isinstance(input_value, str) else decode_xml(input_value)
+            return proc.parse_xml(xml_text=text)
+
+    def _serialize(
+        self,
+        node: PyXdmNode,
+        input_value: XMLInput,
+        cache: StylesheetCache,
+        xsl_exec: PyXsltExecutable,
+        observer: Observer | None = None,
+    ) -> XMLOutput:
+        self._apply_dynamic_params(cache=cache, xsl_exec=xsl_exec)
+
+        # Saxon serializes while transforming, so this phase includes the serialization
+        with phase_timer(observer, self.name, "transform"):
+            result: str | None = xsl_exec.transform_to_string(xdm_node=node)  # type: ignore
 
         if result is None:
-            raise StepError(step=self, value=input_value)
+            raise StepError(step=self, value=input_value)  # type: ignore
+
+        if self.output_encoding is None:
+            return input_value.derive(result) if isinstance(input_value, Document) else result
+
+        data = encode_xml(result, self.output_encoding)
+        if isinstance(input_value, Document):
+            return input_value.derive(data=data, encoding=self.output_encoding)
+        return data
+
+    def _transform_node(
+        self,
+        node: PyXdmNode,
+        input_value: XMLInput,
+        cache: StylesheetCache,
+        xsl_exec: PyXsltExecutable,
+        observer: Observer | None = None,
+    ) -> PyXdmNode:
+        self._apply_dynamic_params(cache=cache, xsl_exec=xsl_exec)
 
-        return result
+        # Unlike transform_to_value, this wraps the result in a document node
+        with phase_timer(observer, self.name, "transform"):
+            xsl_exec.set_global_context_item(xdm_item=node)  # type: ignore
+            result = xsl_exec.apply_templates_returning_value(xdm_value=node)  # type: ignore
+
+        if result is None or not isinstance(result.head, PyXdmNode):
+            raise StepError(step=self, value=input_value)  # type: ignore
+
+        return result.head
+
+
+class BoundStep:
+    """A XSL step with resolved executables, which may stream several runs of values.
+
+    Returned by the `bind` method of XSL steps, e.g. for `Route`, which feeds every
+    run of matching values through the same executables instead of cloning and
+    parametrizing them per run.
+    """
+
+    _name: str
+
+    def __init__(self, name: str, run: Callable[[Iterable[XMLInput]], Iterator[XMLOutput]]) -> None:
+        """Initialize a bound step.
+
+        Args:
+            name (str): The name of the bound step.
+            run (Callable[[Iterable[XMLInput]], Iterator[XMLOutput]]): Transforms a stream of values lazily.
+        """
+        self._name = name
+        self._run = run
+
+    def __call__(self, values: Iterable[XMLInput]) -> Iterable[XMLOutput]:
+        """Transform the input values.
+
+        Args:
+            values (list[str | bytes | Document]): The input values.
+
+        Returns:
+            list[str | bytes | Document]: The transformed values.
+
+        Raises:
+            StepError: When a XSL transformation fails.
+        """
+        return list(self.stream(values))
+
+    def stream(self, values: Iterable[XMLInput]) -> Iterator[XMLOutput]:
+        """Transform the input values lazily.
+
+        Args:
+            values (Iterable[str | bytes | Document]): The input values.
+
+        Returns:
+            Iterator[str | bytes | Document]: The transformed values.
+
+        Raises:
+            StepError: When a XSL transformation fails.
+        """
+        return self._run(values)
+
+    @property
+    def name(self) -> str:
+        """The name of the step.
+
+        Returns:
+            str: The name of the step.
+        """
+        return self._name
+
+
+def _apply_each(
+    apply: Callable[[XMLInput], XMLOutput],
+    name: str,
+    observer: Observer | None,
+    values: Iterable[XMLInput],
+) -> Iterator[XMLOutput]:
+    if (items := item_observer(observer)) is not None:
+        return timed_items(items, name, values, apply)
+    return (apply(value) for value in values)
+
+
+def _record_timing(result: XMLOutput, step: str, started: float) -> XMLOutput:
+    if isinstance(result, Document):
+        result.timings[step] = time.perf_counter() - started
+    return result
+
+
+def convert_params(
+    params: XSLParam | list[XSLParam] | None, proc: PySaxonProcessor
+) -> list[tuple[str, PyXdmValue]]:
+    """Convert params to XDM values, which can be set on any executable of the processor.
+
+    Args:
+        params (XSLParam | list[XSLParam] | None): The params to convert; params without a name are skipped.
+        proc (PySaxonProcessor): The processor to create the values with.
+
+    Returns:
+        list[tuple[str, PyXdmValue]]: The names and converted values of the params.
+    """
+    return [
+        (param.name, param.convert_to_saxon(proc))
+        for param in param_list(params)
+        if param.name is not None
+    ]
+
+
+class XSLChain:
+    """A run of XSL steps, which passes parsed result trees from one step to the next.
+
+    Each value is parsed once by the first step and serialized once by the last
+    step; the steps in between work on the in-memory result of their predecessor.
+    `process()` builds chains from adjacent XSL steps automatically.
+    """
+
+    _name: str = "xsl_chain"
+    steps: list[XSL]
+    session: SaxonSession | None
+
+    def __init__(self, steps: list[XSL], session: SaxonSession | None = None):
+        """Initialize a XSL chain.
+
+        Args:
+            steps (list[XSL]): The XSL steps to apply in order.
+            session (SaxonSession | None): The Saxon session to run in; the current session is used if omitted.
+
+        Raises:
+            ValueError: When the chain has no steps.
+        """
+        if not steps:
+            raise ValueError("A XSL chain needs at least one step.")
+
+        self.steps = steps
+        self.session = session
+
+    def __call__(self, values: Iterable[XMLInput]) -> Iterable[XMLOutput]:
+        """Apply the XSL transformations to the input values.
+
+        Args:
+            values (list[str | bytes | Document]): The input values.
+
+        Returns:
+            list[str | bytes | Document]: The transformed values.
+
+        Raises:
+            StepError: When a XSL transformation fails.
+        """
+        if isinstance(values, str | Buffer | Document):
+            return next(self.stream([values]))  # type: ignore
+
+        return list(self.stream(values))
+
+    def stream(self, values: Iterable[XMLInput]) -> Iterator[XMLOutput]:
+        """Apply the XSL transformations lazily to the input values.
+
+        Args:
+            values (Iterable[str | bytes | Document]): The input values.
+
+        Returns:
+            Iterator[str | bytes | Document]: The transformed values.
+
+        Raises:
+            StepError: When a XSL transformation fails.
+        """
+        return self.bind().stream(values)
+
+    def bind(self) -> "BoundStep":
+        """Resolve the session and parametrize clones of the stylesheets once, for several streams of values.
+
+        Returns:
+            BoundStep: A step, which transforms the values of every stream with the same executables.
+        """
+        session = self.session or current_session()
+        observer = current_observer()
+
+        with phase_timer(observer, self.name, "compile"):
+            executables = session.executables([step.xslt for step in self.steps])
+        cache = session.cache
+
+        for step, xslt_executable in zip(self.steps, executables, strict=True):
+            step._apply_params(cache=cache, xsl_exec=xslt_executable)
+
+        apply = partial(self._apply_chain, cache=cache, executables=executables, observer=observer)
+        return BoundStep(self.name, partial(_apply_each, apply, self.name, observer))
+
+    def prepare(self, session: SaxonSession | None = None) -> None:
+        """Compile the stylesheets and convert the static params ahead of the first call.
+
+        Args:
+            session (SaxonSession | None): The session to compile in, unless the chain has an own session; the current session is used if omitted.
+
+        Raises:
+            PySaxonApiError: When a stylesheet does not compile.
+        """
+        session = self.session or session or current_session()
+        for step in self.steps:
+            step.prepare(session)
+
+    def _apply_chain(
+        self,
+        input_value: XMLInput,
+        cache: StylesheetCache,
+        executables: list[PyXsltExecutable],
+        observer: Observer | None = None,
+    ) -> XMLOutput:
+        started = time.perf_counter()
+        node = self.steps[0]._parse(
+            input_value=input_value, proc=cache.processor, observer=observer
+        )
+
+        for step, xslt_executable in zip(self.steps[:-1], executables[:-1], strict=True):
+            node = step._transform_node(
+                node=node,
+                input_value=input_value,
+                cache=cache,
+                xsl_exec=xslt_executable,
+                observer=observer,
+            )
+
+        result = self.steps[-1]._serialize(
+            node=node,
+            input_value=input_value,
+            cache=cache,
+            xsl_exec=executables[-1],
+            observer=observer,
+        )
+        return _record_timing(result, self.name, started)
 
     @property
     def name(self) -> str:
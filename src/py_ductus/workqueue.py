@@ -0,0 +1,488 @@
+"""A durable work queue in a SQLite file, for pipeline runs which survive interruptions.
+
+Every input value is stored as an item, together with the number of pipeline
+steps already applied to it and its intermediate value. Workers lease batches of
+items, apply the remaining steps and commit the results; a checkpoint is stored
+after every step. Leases expire, so the items of a crashed worker are picked up
+again by others. Any number of worker processes may share a queue file on a
+local file system; SQLite locking is not reliable on network file systems.
+"""
+
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from types import TracebackType
+from typing import Any, NamedTuple, Self
+
+from py_ductus.common import serialization
+from py_ductus.common.document import Document
+from py_ductus.common.encoding import Buffer
+from py_ductus.instrumentation import Observer
+from py_ductus.main import chain_xsl_steps, process
+from py_ductus.steps.alternative import FallbackHandler
+from py_ductus.steps.protocol import Step, StepAlternative
+from py_ductus.steps.xsl.session import SaxonSession
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    key TEXT UNIQUE,
+    value TEXT NOT NULL,
+    payload TEXT,
+    stage INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    owner TEXT,
+    expires REAL
+);
+CREATE INDEX IF NOT EXISTS items_state ON items (state, id);
+"""
+_INSERT_BATCH = 1000
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+
+class WorkItem(NamedTuple):
+    """A leased item of a work queue.
+
+    Attributes:
+        id (int): The id of the item.
+        value (TContent): The original value, or the intermediate value after `stage` steps.
+        stage (int): The number of steps already applied to the value.
+        attempts (int): The number of failed attempts to process the item.
+    """
+
+    id: int
+    value: Any
+    stage: int
+    attempts: int
+
+
+class WorkQueue:
+    """A durable queue of the values of a pipeline run, stored in a SQLite file.
+
+    Values and results are stored as JSON, see `py_ductus.common.serialization`,
+    which also encodes e.g. the `Decimal`s of XPath results and `Path`s;
+    `Document`s are stored as their text, bytes-like values, e.g. encoded results,
+    as blobs and read back as `bytes`.
+    Every method runs in its own transaction, and commits of a worker whose lease
+    has expired in the meantime are ignored, so every item is completed once.
+    """
+
+    path: Path
+    lease_seconds: float
+    owner: str
+
+    def __init__(self, path: str | Path, lease_seconds: float = 300.0) -> None:
+        """Open a WorkQueue, creating its file if missing.
+
+        Args:
+            path (str | Path): The SQLite file of the queue.
+            lease_seconds (float): How long leased items are reserved for a worker without a checkpoint.
+        """
+        self.path = Path(path)
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            self.path, timeout=60, isolation_level=None, check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(_SCHEMA)
+
+    def add(self, values: Iterable[Any], key: Callable[[Any], str] | None = None) -> int:
+        """Add values to the queue.
+
+        Args:
+            values (Iterable[TContent]): The values.
+            key (Callable[[TContent], str] | None): Identifies values; values whose key is already in the queue are skipped, so a feed can be added again after an interruption.
+
+        Returns:
+            int: The number of added values.
+
+        Raises:
+            TypeError: When a value can not be stored.
+        """
+        added = 0
+        values = iter(values)
+        while batch := list(islice(values, _INSERT_BATCH)):
+            rows = [(key(value) if key else None, _dump(value)) for value in batch]
+            with self._transaction() as connection:
+                before = connection.total_changes
+                connection.executemany(
+                    "INSERT OR IGNORE INTO items (key, value) VALUES (?, ?)", rows
+                )
+                added += connection.total_changes - before
+        return added
+
+    def lease(self, batch_size: int) -> list[WorkItem]:
+        """Reserve pending items, or items whose lease expired, for this queue's owner.
+
+        Args:
+            batch_size (int): The maximum number of items.
+
+        Returns:
+            list[WorkItem]: The leased items, empty if no item is left.
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            rows = connection.execute(
+                "SELECT id, value, payload, stage, attempts FROM items"
+                " WHERE state = ? OR (state = ? AND expires < ?) ORDER BY id LIMIT ?",
+                (PENDING, LEASED, now, batch_size),
+            ).fetchall()
+            connection.executemany(
+                "UPDATE items SET state = ?, owner = ?, expires = ? WHERE id = ?",
+                [(LEASED, self.owner, now + self.lease_seconds, row[0]) for row in rows],
+            )
+
+        return [
+            WorkItem(
+                id=row[0],
+                value=_load(row[2] if row[3] else row[1]),
+                stage=row[3],
+                attempts=row[4],
+            )
+            for row in rows
+        ]
+
+    def checkpoint(self, stage: int, values: dict[int, Any]) -> int:
+        """Store intermediate values of leased items and renew their lease.
+
+        Args:
+            stage (int): The number of steps applied to the values.
+            values (dict[int, TContent]): The intermediate values by item id.
+
+        Returns:
+            int: The number of items still leased by this owner, which were updated.
+        """
+        expires = time.time() + self.lease_seconds
+        return self._update_leased(
+            "UPDATE items SET payload = ?, stage = ?, expires = ?"
+            " WHERE id = ? AND state = ? AND owner = ?",
+            [(_dump(value), stage, expires, item_id) for item_id, value in values.items()],
+        )
+
+    def complete(self, stage: int, results: dict[int, Any]) -> int:
+        """Store the results of leased items and mark them as done.
+
+        Args:
+            stage (int): The number of steps of the pipeline.
+            results (dict[int, TContent]): The results by item id.
+
+        Returns:
+            int: The number of items still leased by this owner, which were completed.
+        """
+        return self._update_leased(
+            "UPDATE items SET payload = ?, stage = ?, state = 'done', owner = NULL, expires = NULL"
+            " WHERE id = ? AND state = ? AND owner = ?",
+            [(_dump(result), stage, item_id) for item_id, result in results.items()],
+        )
+
+    def fail(self, item: WorkItem, error: Exception, max_attempts: int = 3) -> None:
+        """Record a failed attempt of a leased item.
+
+        The item is released for another attempt, or marked as failed after
+        `max_attempts` attempts; its checkpoint is kept.
+
+        Args:
+            item (WorkItem): The item.
+            error (Exception): The error of the attempt.
+            max_attempts (int): The number of attempts before the item is marked as failed.
+        """
+        state = FAILED if item.attempts + 1 >= max_attempts else PENDING
+        self._update_leased(
+            "UPDATE items SET state = ?, attempts = attempts + 1, error = ?, owner = NULL,"
+            " expires = NULL WHERE id = ? AND state = ? AND owner = ?",
+            [(state, f"{type(error).__name__}: {error}", item.id)],
+        )
+
+    def release(self, items: Sequence[WorkItem]) -> None:
+        """Return leased items to the queue without counting an attempt.
+
+        Args:
+            items (Sequence[WorkItem]): The items.
+        """
+        self._update_leased(
+            "UPDATE items SET state = 'pending', owner = NULL, expires = NULL"
+            " WHERE id = ? AND state = ? AND owner = ?",
+            [(item.id,) for item in items],
+        )
+
+    def retry_failed(self) -> int:
+        """Return failed items to the queue, resetting their attempts.
+
+        Returns:
+            int: The number of items returned.
+        """
+        with self._transaction() as connection:
+            return connection.execute(
+                "UPDATE items SET state = ?, attempts = 0 WHERE state = ?", (PENDING, FAILED)
+            ).rowcount
+
+    def counts(self) -> dict[str, int]:
+        """Return the number of items per state.
+
+        Returns:
+            dict[str, int]: The counts of the states "pending", "leased", "done" and "failed".
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT state, COUNT(*) FROM items GROUP BY state"
+            ).fetchall()
+        return {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0} | dict(rows)
+
+    def results(self) -> Iterator[Any]:
+        """Iterate over the results of the completed items, in the order the values were added.
+
+        Returns:
+            Iterator[TContent]: The results.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT payload FROM items WHERE state = ? ORDER BY id", (DONE,)
+            ).fetchall()
+        return (_load(row[0]) for row in rows)
+
+    def errors(self) -> dict[int, str]:
+        """Return the last error of every failed item.
+
+        Returns:
+            dict[int, str]: The errors by item id.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id, error FROM items WHERE state = ? ORDER BY id", (FAILED,)
+            ).fetchall()
+        return dict(rows)
+
+    def close(self) -> None:
+        """Close the connection to the queue file."""
+        with self._lock:
+            self._connection.close()
+
+    def _update_leased(self, statement: str, rows: list[tuple[Any, ...]]) -> int:
+        with self._transaction() as connection:
+            before = connection.total_changes
+            connection.executemany(statement, [(*row, LEASED, self.owner) for row in rows])
+            return connection.total_changes - before
+
+    def _transaction(self) -> "_Transaction":
+        return _Transaction(self._connection, self._lock)
+
+    def __enter__(self) -> Self:
+        """Enter the queue context.
+
+        Returns:
+            WorkQueue: The queue itself.
+        """
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Close the queue when leaving the context."""
+        self.close()
+
+
+class _Transaction:
+    """A write transaction, which takes the database lock up front to avoid deadlocks."""
+
+    def __init__(self, connection: sqlite3.Connection, lock: threading.Lock) -> None:
+        self._connection = connection
+        self._lock = lock
+
+    def __enter__(self) -> sqlite3.Connection:
+        self._lock.acquire()
+        try:
+            self._connection.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            self._lock.release()
+            raise
+        return self._connection
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        try:
+            self._connection.execute("ROLLBACK" if exc_type is not None else "COMMIT")
+        finally:
+            self._lock.release()
+
+
+def run_worker(  # noqa: PLR0913
+    queue: WorkQueue,
+    steps: Iterable[Step | StepAlternative],
+    *,
+    batch_size: int = 64,
+    max_attempts: int = 3,
+    session: SaxonSession | None = None,
+    on_fallback: FallbackHandler | None = None,
+    observer: Observer | None = None,
+) -> int:
+    """Process the items of a queue until no item is left.
+
+    Adjacent XSL steps are chained as in `process`; a checkpoint is stored after
+    every step of the resulting plan, and items resume after their last
+    checkpoint. Every step must produce one result per value. When a step fails
+    for a batch, its values are retried one at a time, and only the failing items
+    count an attempt.
+
+    Args:
+        queue (WorkQueue): The queue.
+        steps (Iterable[Step | StepAlternative]): The steps of the pipeline; must be the same for all workers and runs of a queue.
+        batch_size (int): The number of items leased at once.
+        max_attempts (int): The number of attempts before an item is marked as failed.
+        session (SaxonSession | None): The Saxon session for steps without an own session.
+        on_fallback (FallbackHandler | None): Called for every value routed to the fallback step of an alternative.
+        observer (Observer | None): Receives per-step metrics.
+
+    Returns:
+        int: The number of items completed by this worker.
+    """
+    plan = chain_xsl_steps(steps)
+    completed = 0
+
+    def apply(step: Step | StepAlternative, values: list[Any]) -> list[Any]:
+        results = list(
+            process(
+                values, steps=[step], session=session, on_fallback=on_fallback, observer=observer
+            )
+        )
+        if len(results) != len(values):
+            raise ValueError("Every step of a queued pipeline must produce one result per value.")
+        return [result.text if isinstance(result, Document) else result for result in results]
+
+    while items := queue.lease(batch_size):
+        pending = {item.id: item for item in items}
+        values = {item.id: item.value for item in items}
+
+        for index, step in enumerate(plan):
+            ids = [item_id for item_id in values if pending[item_id].stage <= index]
+            if not ids:
+                continue
+
+            try:
+                results = dict(zip(ids, apply(step, [values[i] for i in ids]), strict=True))
+            except Exception:
+                results = {}
+                for item_id in ids:
+                    try:
+                        [results[item_id]] = apply(step, [values[item_id]])
+                    except Exception as error:
+                        queue.fail(pending[item_id], error, max_attempts=max_attempts)
+                        del values[item_id]
+
+            if index + 1 < len(plan):
+                _store(queue, index + 1, results, values, pending, max_attempts=max_attempts)
+            values.update(results)
+
+        completed += _store(
+            queue, len(plan), values, values, pending, max_attempts=max_attempts, final=True
+        )
+
+    return completed
+
+
+def run_workers(  # noqa: PLR0913
+    path: str | Path,
+    steps: Sequence[Step | StepAlternative],
+    *,
+    workers: int,
+    batch_size: int = 64,
+    max_attempts: int = 3,
+    lease_seconds: float = 300.0,
+) -> int:
+    """Process the items of a queue file in a pool of worker processes.
+
+    More workers, e.g. on other machines sharing the same local disk, can join the
+    run at any time with `run_worker`.
+
+    Args:
+        path (str | Path): The SQLite file of the queue.
+        steps (Sequence[Step | StepAlternative]): The steps of the pipeline.
+        workers (int): The number of worker processes.
+        batch_size (int): The number of items leased at once.
+        max_attempts (int): The number of attempts before an item is marked as failed.
+        lease_seconds (float): How long leased items are reserved for a worker without a checkpoint.
+
+    Returns:
+        int: The number of items completed.
+
+    Raises:
+        ValueError: When `workers` is smaller than one.
+    """
+    if workers < 1:
+        raise ValueError("workers must be at least one.")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_work, path, list(steps), batch_size, max_attempts, lease_seconds)
+            for _ in range(workers)
+        ]
+        return sum(future.result() for future in futures)
+
+
+def _work(
+    path: str | Path,
+    steps: list[Step | StepAlternative],
+    batch_size: int,
+    max_attempts: int,
+    lease_seconds: float,
+) -> int:
+    with WorkQueue(path, lease_seconds=lease_seconds) as queue:
+        return run_worker(queue, steps, batch_size=batch_size, max_attempts=max_attempts)
+
+
+def _store(  # noqa: PLR0913
+    queue: WorkQueue,
+    stage: int,
+    results: dict[int, Any],
+    values: dict[int, Any],
+    pending: dict[int, WorkItem],
+    *,
+    max_attempts: int,
+    final: bool = False,
+) -> int:
+    save = queue.complete if final else queue.checkpoint
+    try:
+        return save(stage, results)
+    except (TypeError, ValueError):
+        # Results which can not be stored fail their item instead of the worker
+        for item_id in list(results):
+            try:
+                _dump(results[item_id])
+            except (TypeError, ValueError) as error:
+                queue.fail(pending[item_id], error, max_attempts=max_attempts)
+                results.pop(item_id)
+                values.pop(item_id, None)
+        return save(stage, results)
+
+
+def _dump(value: Any) -> str | bytes:
+    if isinstance(value, Buffer):
+        # SQLite keeps blobs as they are, also in the text columns
+        return bytes(value)
+    return serialization.dumps(value.text if isinstance(value, Document) else value)
+
+
+def _load(stored: str | bytes) -> Any:
+    return stored if isinstance(stored, bytes) else serialization.loads(stored)
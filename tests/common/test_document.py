@@ -0,0 +1,116 @@
+"""Test the document envelope."""
+
+import hashlib
+import pickle
+from pathlib import Path
+
+import pytest
+from saxonche import PySaxonProcessor
+
+from py_ductus.common.document import Document
+
+
+def test_document_derives_representations_from_text() -> None:
+    """Test that bytes and hash are derived from the text."""
+    document = Document(text="<a>ä</a>", origin="memory")
+
+    assert document.data == "<a>ä</a>".encode()
+    assert document.content_hash == hashlib.sha256(document.data).hexdigest()
+    assert str(document) == "<a>ä</a>"
+
+
+def test_document_reads_file_lazily(tmp_path: Path) -> None:
+    """Test that a file document reads its file on first access only."""
+    path = tmp_path / "doc.xml"
+    path.write_bytes(b"<a>1</a>")
+    document = Document.from_file(path)
+    path.write_bytes(b"<a>2</a>")
+
+    assert document.origin == str(path)
+    assert document.text == "<a>2</a>"
+    path.write_bytes(b"<a>3</a>")
+    assert document.text == "<a>2</a>"
+
+
+def test_document_needs_content() -> None:
+    """Test that a document without text, bytes or file is rejected."""
+    with pytest.raises(ValueError, match="needs"):
+        Document()
+
+
+def test_document_parses_once_per_processor() -> None:
+    """Test that the node is kept for the processor which parsed it."""
+    processor = PySaxonProcessor(license=False)
+    document = Document(data=b"<a/>")
+
+    node = document.node(processor)
+
+    assert document.parsed_by(processor)
+    assert document.node(processor) is node
+
+
+def test_derived_document_keeps_metadata() -> None:
+    """Test that derived documents copy origin, metadata and timings."""
+    document = Document(text="<a/>", origin="feed.xml", metadata={"route": "a"})
+    document.timings["xsl"] = 1.0
+
+    derived = document.derive("<b/>")
+    derived.metadata["route"] = "b"
+
+    assert derived.origin == "feed.xml"
+    assert derived.timings == {"xsl": 1.0}
+    assert document.metadata == {"route": "a"}
+    assert not derived.failed
+
+
+def test_document_can_be_pickled_without_node() -> None:
+    """Test that pickled documents keep their content and metadata but drop their node."""
+    processor = PySaxonProcessor(license=False)
+    document = Document(text="<a/>", origin="feed.xml", metadata={"id": 1})
+    document.node(processor)
+
+    restored = pickle.loads(pickle.dumps(document))
+
+    assert restored.text == "<a/>"
+    assert restored.metadata == {"id": 1}
+    assert not restored.parsed_by(processor)
+
+
+def test_document_keeps_buffers_until_bytes_are_needed() -> None:
+    """Test that views are decoded and hashed in place and copied only for `data`."""
+    data = '<?xml version="1.0" encoding="ISO-8859-1"?><a>é</a>'.encode("latin-1")
+    view = memoryview(bytearray(data))
+    document = Document(data=view)
+
+    assert document.text.endswith("<a>é</a>")
+    assert document.size == len(data)
+    assert document.peek(5) == b"<?xml"
+    assert document.content_hash == hashlib.sha256(data).hexdigest()
+    assert pickle.loads(pickle.dumps(document)).text == document.text
+    assert document.data == data
+    assert isinstance(document.data, bytes)
+
+
+def test_file_document_is_parsed_from_its_file(tmp_path: Path) -> None:
+    """Test that Saxon parses file documents itself, in the declared encoding."""
+    path = tmp_path / "latin.xml"
+    path.write_bytes('<?xml version="1.0" encoding="ISO-8859-1"?><a>é</a>'.encode("latin-1"))
+    document = Document.from_file(path)
+    processor = PySaxonProcessor(license=False)
+
+    assert document.node(processor).string_value == "é"
+    assert document.size == path.stat().st_size
+
+
+def test_document_copy_shares_its_node() -> None:
+    """Test that a copy reuses the parsed node, but has its own metadata and error."""
+    processor = PySaxonProcessor(license=False)
+    document = Document(text="<a/>", metadata={"index": 1})
+    node = document.node(processor)
+
+    copy = document.copy()
+    copy.metadata["index"] = 2
+    copy.error = ValueError("fail")
+
+    assert copy.node(processor) is node
+    assert (document.metadata["index"], document.error) == (1, None)
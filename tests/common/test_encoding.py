@@ -0,0 +1,57 @@
+"""Test decoding and encoding of XML buffers."""
+
+import codecs
+import mmap
+from pathlib import Path
+
+from py_ductus.common.encoding import decode_xml, encode_xml, xml_encoding
+
+LATIN = '<?xml version="1.0" encoding="ISO-8859-1"?><a>é</a>'
+
+
+def test_xml_encoding_prefers_byte_order_mark() -> None:
+    """Test that byte order marks win over declarations, which win over nothing."""
+    assert xml_encoding(LATIN.encode("latin-1")) == "ISO-8859-1"
+    assert xml_encoding(codecs.BOM_UTF8 + LATIN.encode()) == "utf-8-sig"
+    assert xml_encoding(LATIN.encode("utf-16")) == "utf-16"
+    assert xml_encoding(b"<a/>") is None
+
+
+def test_decode_xml_honors_declared_encoding(tmp_path: Path) -> None:
+    """Test that bytes, views and memory maps are decoded in their declared encoding."""
+    data = LATIN.encode("latin-1")
+    path = tmp_path / "latin.xml"
+    path.write_bytes(data)
+
+    assert decode_xml(data) == LATIN
+    assert decode_xml(memoryview(bytearray(data))) == LATIN
+    assert decode_xml(LATIN.encode("utf-16")) == LATIN
+    assert decode_xml(codecs.BOM_UTF8 + b"<a>\xc3\xa9</a>") == "<a>é</a>"
+    assert decode_xml(b"<a>\xe9</a>", default="latin-1") == "<a>é</a>"
+    with path.open("rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        assert decode_xml(mapped) == LATIN
+
+
+def test_encode_xml_updates_declaration() -> None:
+    """Test that the declaration names the encoding and other characters become references."""
+    text = '<?xml version="1.0" encoding="UTF-8"?><a>é€</a>'
+
+    assert encode_xml(text, "utf-8") == text.encode()
+    assert encode_xml(text, "ISO-8859-1") == (
+        b'<?xml version="1.0" encoding="ISO-8859-1"?><a>\xe9&#8364;</a>'
+    )
+    assert encode_xml("<a>é</a>", "UTF-16").decode("utf-16") == "<a>é</a>"
+
+
+def test_encode_xml_declares_other_encodings() -> None:
+    """Test that documents without an encoding declaration get one unless they are UTF-8 or UTF-16."""
+    assert encode_xml("<a>é</a>", "utf-8") == "<a>é</a>".encode()
+    assert encode_xml("<a>é</a>", "ISO-8859-1") == (
+        b'<?xml version="1.0" encoding="ISO-8859-1"?><a>\xe9</a>'
+    )
+    assert encode_xml('<?xml version="1.0" standalone="yes"?><a/>', "cp1252") == (
+        b'<?xml version="1.0" encoding="cp1252" standalone="yes"?><a/>'
+    )
+    assert encode_xml("<a>é</a>", "utf-16-le").decode("utf-16-le") == (
+        '<?xml version="1.0" encoding="utf-16-le"?><a>é</a>'
+    )
@@ -5,8 +5,11 @@ from pathlib import Path
 from typing import Generic
 
 import pytest
+from saxonche import PySaxonProcessor, PyXdmAtomicValue
 
 from py_ductus.common import types
+from py_ductus.steps.error import StepError
+from py_ductus.steps.xsl import XSLAtomicParam
 
 
 class ValidFakeStep(Generic[types.TContent]):
@@ -48,6 +51,56 @@ class FailingFakeStep(Generic[types.TContent]):
         return 1 / 0  # type: ignore
 
 
+class RaisingFakeStep(Generic[types.TContent]):
+    """A fake step, which raises a StepError for every value."""
+
+    def __init__(self) -> None:
+        """Initialize the step."""
+        self._name = "raising_fake_step"
+
+    def __call__(self, values: Iterable[types.TContent]) -> Iterable[types.TContent]:
+        """Process values with the step."""
+        for value in values:
+            raise StepError(step=self, value=value)
+        return values
+
+    @property
+    def name(self) -> str:
+        """The name of the step."""
+        return self._name
+
+
+class SelectiveFailingFakeStep(Generic[types.TContent]):
+    """A fake step, which fails for batches containing the value "fail"."""
+
+    def __init__(self) -> None:
+        """Initialize the step."""
+        self._name = "selective_failing_fake_step"
+
+    def __call__(self, values: Iterable[types.TContent]) -> Iterable[types.TContent]:
+        """Process values with the step."""
+        values = list(values)
+        if "fail" in values:
+            raise ValueError("fail")
+        return [f"main:{value}" for value in values]  # type: ignore
+
+    @property
+    def name(self) -> str:
+        """The name of the step."""
+        return self._name
+
+
+class CountingParam(XSLAtomicParam):
+    """An atomic param, which counts its conversions."""
+
+    conversions = 0
+
+    def convert_to_saxon(self, proc: PySaxonProcessor) -> PyXdmAtomicValue:
+        """Convert the parameter and count the conversion."""
+        CountingParam.conversions += 1
+        return super().convert_to_saxon(proc)  # type: ignore
+
+
 @pytest.fixture()
 def xml_xsl_sample(tmp_path: Path) -> tuple[str, str, Path]:
     """Return a sample XML and XSL file."""
@@ -0,0 +1,68 @@
+"""Test the per-value execution of step alternatives."""
+
+from collections.abc import Iterator
+from pathlib import Path
+
+from py_ductus.common.document import Document
+from py_ductus.main import process
+from py_ductus.steps import xsl
+from py_ductus.steps.alternative import FallbackCounter, apply_alternative
+from py_ductus.steps.error import StepError
+from py_ductus.steps.protocol import StepAlternative
+from tests.conftest import RaisingFakeStep, SelectiveFailingFakeStep, ValidFakeStep
+
+
+def test_only_failing_values_fall_back() -> None:
+    """Test that the results of the main step are kept for values which succeed."""
+    alternative = StepAlternative(main=SelectiveFailingFakeStep(), fallback=ValidFakeStep())
+    counter = FallbackCounter()
+
+    result = list(apply_alternative(alternative, ["a", "fail", "b"], on_fallback=counter))
+
+    assert result == ["main:a", "fail", "main:b"]
+    assert counter.count == 1
+    assert counter.errors == {"ValueError": 1}
+
+
+def test_streaming_main_step_resumes_after_failure(xml_xsl_sample: tuple[str, str, Path]):
+    """Test that a streaming main step continues with the values after a failing one."""
+    xml, xslt, _ = xml_xsl_sample
+    consumed: list[str] = []
+
+    def values() -> Iterator[str]:
+        for value in [xml, "<not-xml", xml]:
+            consumed.append(value)
+            yield value
+
+    alternative = StepAlternative(main=xsl.XSL(xslt=xslt), fallback=ValidFakeStep())
+    counter = FallbackCounter()
+    result = iter(process(values(), steps=[alternative], stream=True, on_fallback=counter))
+
+    assert next(result) == xml
+    assert consumed == [xml]
+    assert list(result) == ["<not-xml", xml]
+    assert counter.count == 1
+
+
+def test_broken_streaming_main_step_falls_back_for_all_values(
+    xml_xsl_sample: tuple[str, str, Path],
+):
+    """Test that all values fall back when the main step can not start."""
+    xml, _, _ = xml_xsl_sample
+    alternative = StepAlternative(main=xsl.XSL(xslt="<not-a-stylesheet"), fallback=ValidFakeStep())
+    counter = FallbackCounter()
+
+    assert process([xml, xml], steps=[alternative], on_fallback=counter) == [xml, xml]
+    assert counter.count == 2  # noqa: PLR2004
+
+
+def test_documents_carry_the_error_of_the_main_step() -> None:
+    """Test that documents routed to the fallback step know why."""
+    alternative = StepAlternative(main=RaisingFakeStep(), fallback=ValidFakeStep())
+    document = Document(text="<foo/>")
+
+    [result] = apply_alternative(alternative, [document])
+
+    assert isinstance(result.error, StepError)
+    assert result.failed
+    assert document.error is None
@@ -0,0 +1,122 @@
+"""Test the fan-out branch step."""
+
+from collections.abc import Iterable
+from pathlib import Path
+
+import pytest
+
+from py_ductus.common.document import Document
+from py_ductus.main import process
+from py_ductus.steps import xsl
+from py_ductus.steps.branch import Branch
+from py_ductus.steps.protocol import StepAlternative
+from py_ductus.steps.xsl.session import SaxonSession
+from tests.conftest import RaisingFakeStep, SelectiveFailingFakeStep, ValidFakeStep
+
+
+class NodeRecordingFakeStep:
+    """A fake step, which records the node objects of the documents it receives."""
+
+    def __init__(self, session: SaxonSession) -> None:
+        """Initialize the step."""
+        self._name = "node_recording_fake_step"
+        self.session = session
+        self.nodes: list[object] = []
+
+    def __call__(self, values: Iterable[Document]) -> Iterable[Document]:
+        """Process values with the step."""
+        values = list(values)
+        self.nodes.extend(value.node(self.session.processor) for value in values)
+        return values
+
+    @property
+    def name(self) -> str:
+        """The name of the step."""
+        return self._name
+
+
+class UpperFakeStep:
+    """A fake step, which upper-cases text values."""
+
+    def __init__(self) -> None:
+        """Initialize the step."""
+        self._name = "upper_fake_step"
+
+    def __call__(self, values: Iterable[str]) -> Iterable[str]:
+        """Process values with the step."""
+        return [value.upper() for value in values]
+
+    @property
+    def name(self) -> str:
+        """The name of the step."""
+        return self._name
+
+
+def test_branch_joins_results_as_tuples() -> None:
+    """Test that every value is processed by all branches and joined in input order."""
+    branch = Branch(
+        [SelectiveFailingFakeStep(), [ValidFakeStep(), SelectiveFailingFakeStep()]],
+        chunk_size=2,
+    )
+
+    result = process(["a", "b", "c"], steps=[branch])
+
+    assert result == [("main:a", "main:a"), ("main:b", "main:b"), ("main:c", "main:c")]
+    assert branch.name == (
+        "branch(selective_failing_fake_step,valid_fake_step+selective_failing_fake_step)"
+    )
+
+
+def test_branch_joins_results_as_dicts(xml_xsl_sample: tuple[str, str, Path]) -> None:
+    """Test that named branches produce dicts and text values stay text."""
+    xml, xslt, _ = xml_xsl_sample
+    branch = Branch({"html": xsl.XSL(xslt=xslt), "raw": ValidFakeStep()}, share_parse=True)
+
+    result = process([xml], steps=[branch], stream=True)
+
+    assert list(result) == [{"html": xml, "raw": xml}]
+
+
+def test_branches_share_the_parsed_node(xml_xsl_sample: tuple[str, str, Path]) -> None:
+    """Test that all branches see the node parsed once by the branch step."""
+    xml, _, _ = xml_xsl_sample
+    session = SaxonSession()
+    first, second = NodeRecordingFakeStep(session), NodeRecordingFakeStep(session)
+
+    [(one, two)] = Branch([first, second], share_parse=True, session=session)([Document(text=xml)])
+
+    assert first.nodes[0] is second.nodes[0]
+    assert one is two
+
+
+def test_branch_passes_values_unchanged_by_default() -> None:
+    """Test that branches receive the values themselves, not shared documents."""
+    result = Branch([UpperFakeStep(), UpperFakeStep()])(["<a/>"])
+
+    assert result == [("<A/>", "<A/>")]
+
+
+def test_branch_fallbacks_do_not_mark_other_branches() -> None:
+    """Test that the error of a fallback in one branch stays out of the shared document."""
+    alternative = StepAlternative(main=RaisingFakeStep(), fallback=ValidFakeStep())
+    document = Document(text="<a/>")
+
+    [(failed, passed)] = Branch([alternative, ValidFakeStep()], share_parse=True)([document])
+
+    assert failed.failed
+    assert passed.error is None
+    assert document.error is None
+
+
+def test_branch_raises_errors_of_branches() -> None:
+    """Test that a failing branch fails the step."""
+    branch = Branch([ValidFakeStep(), SelectiveFailingFakeStep()])
+
+    with pytest.raises(ValueError, match="fail"):
+        branch(["a", "fail"])
+
+
+def test_branch_rejects_missing_branches() -> None:
+    """Test that a branch step needs branches."""
+    with pytest.raises(ValueError, match="at least one branch"):
+        Branch([])
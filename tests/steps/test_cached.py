@@ -0,0 +1,164 @@
+"""Test the on-disk result cache for steps."""
+
+import pickle
+from collections.abc import Callable
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+from py_ductus.common.document import Document
+from py_ductus.main import process
+from py_ductus.steps import xsl
+from py_ductus.steps.cached import CachedStep, DiskStore, Fingerprinted
+from tests.conftest import ValidFakeStep
+
+
+def test_cached_step_skips_known_values(tmp_path: Path, xml_xsl_sample: tuple[str, str, Path]):
+    """Test that values are only transformed once."""
+    xml, xslt, _ = xml_xsl_sample
+    store = DiskStore(tmp_path / "cache")
+    step = CachedStep(xsl.XSL(xslt=xslt), store=store)
+
+    assert process([xml, xml], steps=[step]) == [xml, xml]
+    assert (step.hits, step.misses) == (0, 2)
+
+    again = CachedStep(xsl.XSL(xslt=xslt), store=DiskStore(tmp_path / "cache"))
+    assert again([xml, "<other/>"]) == [xml, xsl.XSL(xslt=xslt)("<other/>")]
+    assert (again.hits, again.misses) == (1, 1)
+
+
+def test_xsl_fingerprint_depends_on_params(xml_xsl_sample_with_params: tuple[str, str, Path]):
+    """Test that the fingerprint of a XSL step covers its stylesheet and params."""
+    _, xslt, xsl_path = xml_xsl_sample_with_params
+    step = xsl.XSL(xslt=xslt, params=xsl.XSLAtomicParam(name="param1", value="a"))
+
+    assert isinstance(step, Fingerprinted)
+    assert step.fingerprint() == xsl.XSL(xslt=xsl_path, params=step.proc_params).fingerprint()
+    assert step.fingerprint() != xsl.XSL(xslt=xslt).fingerprint()
+    assert (
+        step.fingerprint()
+        != xsl.XSL(xslt=xslt, params=xsl.XSLAtomicParam(name="param1", value="b")).fingerprint()
+    )
+
+
+def test_dynamic_params_are_uncacheable_unless_deterministic(
+    tmp_path: Path, xml_xsl_sample_with_params: tuple[str, str, Path]
+):
+    """Test that steps with dynamic params are only cached when declared deterministic."""
+    xml, xslt, _ = xml_xsl_sample_with_params
+
+    def dynamic_param() -> xsl.XSLAtomicParam:
+        return xsl.XSLAtomicParam(name="param1", value="dynamic")
+
+    step = xsl.XSL(xslt=xslt, dynamic_params=dynamic_param)
+    store = DiskStore(tmp_path)
+
+    uncached = CachedStep(step, store=store)
+    assert not uncached.cacheable
+    uncached([xml])
+    assert store.size == 0
+
+    cached = CachedStep(step, store=store, deterministic=True)
+    assert cached.cacheable
+    cached([xml])
+    assert store.size > 0
+
+
+def test_deterministic_dynamic_params_are_fingerprinted_by_value(
+    tmp_path: Path, xml_xsl_sample_with_params: tuple[str, str, Path]
+):
+    """Test that dynamic params made at one definition site do not share cached results."""
+    xml, xslt, _ = xml_xsl_sample_with_params
+    store = DiskStore(tmp_path)
+
+    def make_param(lang: str) -> Callable[[], xsl.XSLAtomicParam]:
+        return lambda: xsl.XSLAtomicParam(name="param1", value=lang)
+
+    steps = [
+        CachedStep(xsl.XSL(xslt=xslt, dynamic_params=make_param(lang)), store, deterministic=True)
+        for lang in ["de", "en"]
+    ]
+
+    assert list(steps[0]([xml])) != list(steps[1]([xml]))
+    assert "en" in next(iter(steps[1]([xml])))
+    assert steps[1].hits == 1
+
+
+def test_cached_step_stores_results_which_are_no_json(tmp_path: Path):
+    """Test that paths and decimals are cached, and results of other types are passed on."""
+    step = CachedStep(ValidFakeStep(), store=DiskStore(tmp_path), fingerprint="fake-v1")
+    values = [Path("out/a.xml"), [Decimal("1.5"), {"a": b"\x00"}]]
+
+    assert step(values) == values
+    assert step(values) == values
+    assert step.hits == 2  # noqa: PLR2004
+
+    unencodable = [lambda: None]
+    assert step(unencodable) == unencodable
+    assert step(unencodable) == unencodable
+    assert step.hits == 2  # noqa: PLR2004
+
+
+def test_cached_step_recomputes_entries_of_other_formats(tmp_path: Path):
+    """Test that entries which are no tagged JSON, e.g. pickles, are not read."""
+    store = DiskStore(tmp_path)
+    step = CachedStep(ValidFakeStep(), store=store, fingerprint="fake-v1")
+    step(["a"])
+    [path] = list(tmp_path.glob("??/*"))
+    path.write_bytes(pickle.dumps("b"))
+
+    assert step(["a"]) == ["a"]
+    assert (step.hits, step.misses) == (0, 2)
+
+
+def test_step_without_fingerprint_needs_explicit_one(tmp_path: Path):
+    """Test that steps without a fingerprint method need an explicit fingerprint."""
+    with pytest.raises(TypeError, match="fingerprint"):
+        CachedStep(ValidFakeStep(), store=DiskStore(tmp_path))
+
+    step = CachedStep(ValidFakeStep(), store=DiskStore(tmp_path), fingerprint="fake-v1")
+    assert step(["a", 1]) == ["a", 1]
+    assert step(["a", 1]) == ["a", 1]
+    assert step.hits == 2  # noqa: PLR2004
+
+
+def test_disk_store_evicts_least_recently_used(tmp_path: Path):
+    """Test that the store stays within its size budget."""
+    store = DiskStore(tmp_path, max_bytes=25)
+    store.put("aa01", b"x" * 10)
+    store.put("aa02", b"x" * 10)
+    assert store.get("aa01") is not None
+
+    store.put("aa03", b"x" * 10)
+
+    assert store.size <= 25  # noqa: PLR2004
+    assert store.get("aa03") == b"x" * 10
+    assert store.get("aa02") is None
+
+
+def test_cached_step_keys_documents_by_content(
+    tmp_path: Path, xml_xsl_sample: tuple[str, str, Path]
+):
+    """Test that cached results of documents are derived from their inputs."""
+    xml, xslt, _ = xml_xsl_sample
+    step = CachedStep(xsl.XSL(xslt=xslt), store=DiskStore(tmp_path / "cache"))
+    step([Document(text=xml)])
+
+    [result] = step([Document(data=xml.encode(), origin="feed.xml")])
+
+    assert step.hits == 1
+    assert isinstance(result, Document)
+    assert (result.text, result.origin) == (xml, "feed.xml")
+
+
+def test_cached_step_stores_bytes(tmp_path: Path, xml_xsl_sample: tuple[str, str, Path]):
+    """Test that bytes values and results are cached."""
+    xml, xslt, _ = xml_xsl_sample
+    step = CachedStep(xsl.XSL(xslt=xslt, output_encoding="utf-8"), store=DiskStore(tmp_path))
+
+    first = step([xml.encode()])
+    second = step([xml.encode()])
+
+    assert first == second == [xml.encode()]
+    assert (step.hits, step.misses) == (1, 1)
@@ -0,0 +1,44 @@
+"""Test the step errors."""
+
+import pickle
+
+from py_ductus.common.document import Document
+from py_ductus.steps.error import StepError, StepTimeoutError
+from tests.conftest import ValidFakeStep
+
+
+def test_step_error_can_be_pickled() -> None:
+    """Test that a StepError survives pickling, e.g. from a worker process."""
+    error = StepError(step=ValidFakeStep(), value="<foo/>")
+
+    restored = pickle.loads(pickle.dumps(error))
+
+    assert isinstance(restored, StepError)
+    assert str(restored) == str(error)
+    assert restored.step_name == "valid_fake_step"
+    assert restored.value == "<foo/>"
+
+
+def test_step_timeout_error_can_be_pickled() -> None:
+    """Test that a StepTimeoutError keeps its timeout through pickling."""
+    error = StepTimeoutError(step=ValidFakeStep(), value="<foo/>", timeout=2.5)
+
+    restored = pickle.loads(pickle.dumps(error))
+
+    assert isinstance(restored, StepTimeoutError)
+    assert str(restored) == str(error)
+    assert restored.timeout == error.timeout
+
+
+def test_step_timeout_error_describes_large_values() -> None:
+    """Test that documents and buffers are described instead of dumped into the message."""
+    text = f"<a>{'x' * 1000}</a>"
+
+    for value, description in [
+        (Document(text=text), "<Document of size 1007>"),
+        (Document(text=text, origin="feed.xml"), "<Document from feed.xml>"),
+        (text.encode(), "<bytes of 1007 bytes>"),
+    ]:
+        error = StepTimeoutError(step=ValidFakeStep(), value=value, timeout=1.0)
+
+        assert str(error).endswith(f"for input value {description}.")
@@ -1,6 +1,6 @@
 """Test the step protocol using fake steps."""
 
-from py_ductus.steps.protocol import Step
+from py_ductus.steps.protocol import Step, StreamingStep
 from tests.conftest import InvalidFakeStep, ValidFakeStep
 
 
@@ -17,3 +17,8 @@ def test_if_invalid_step_is_invalid() -> None:
     step = InvalidFakeStep()
     assert not isinstance(step, Step)  # type: ignore
     assert not hasattr(step, "name")
+
+
+def test_if_valid_step_is_not_streaming() -> None:
+    """Test that a step without a stream method is no streaming step."""
+    assert not isinstance(ValidFakeStep(), StreamingStep)
@@ -0,0 +1,102 @@
+"""Test the record splitter and merger steps."""
+
+import io
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import pytest
+
+from py_ductus.main import process
+from py_ductus.steps import xsl
+from py_ductus.steps.records import RecordMerger, RecordSplitter
+
+
+@pytest.fixture
+def feed(tmp_path: Path) -> Path:
+    """Return a feed with nested records."""
+    path = tmp_path / "feed.xml"
+    path.write_text(
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        "<feed><header>h</header><records>"
+        '<record id="1">a</record><record id="2">b</record><record id="3">c</record>'
+        "</records></feed>"
+    )
+    return path
+
+
+def test_splitter_yields_records(feed: Path) -> None:
+    """Test that every record becomes a value of its own."""
+    result = RecordSplitter()([feed])
+
+    assert result == [
+        '<record id="1">a</record>',
+        '<record id="2">b</record>',
+        '<record id="3">c</record>',
+    ]
+
+
+def test_splitter_yields_batches(feed: Path) -> None:
+    """Test that records are grouped into wrapped micro-batches."""
+    result = RecordSplitter(batch_size=2, batch_root="batch")([str(feed)])
+
+    assert result == [
+        '<batch><record id="1">a</record><record id="2">b</record></batch>',
+        '<batch><record id="3">c</record></batch>',
+    ]
+
+
+def test_splitter_matches_local_name_in_namespace() -> None:
+    """Test that records in a namespace are matched by their local name and stay well-formed."""
+    source = io.BytesIO(b'<feed xmlns="urn:feed"><record>a</record><record>b</record></feed>')
+
+    result = RecordSplitter()([source])
+
+    assert [ET.fromstring(record).tag for record in result] == ["{urn:feed}record"] * 2
+
+
+def test_splitter_rejects_empty_batches() -> None:
+    """Test that batches hold at least one record."""
+    with pytest.raises(ValueError, match="at least one"):
+        RecordSplitter(batch_size=0)
+
+
+def test_merger_writes_values_into_one_document(tmp_path: Path) -> None:
+    """Test that the merger wraps the values and drops their XML declarations."""
+    output = tmp_path / "out" / "merged.xml"
+    merger = RecordMerger(output=output, root="items", attributes={"source": "feed"})
+
+    result = merger(['<?xml version="1.0" encoding="UTF-8"?><item>a</item>', "<item>b</item>"])
+
+    assert result == [str(output)]
+    root = ET.parse(output).getroot()
+    assert root.tag == "items"
+    assert root.get("source") == "feed"
+    assert [item.text for item in root] == ["a", "b"]
+    assert list(output.parent.iterdir()) == [output]
+
+
+def test_merger_decodes_bytes(tmp_path: Path) -> None:
+    """Test that bytes-like values are decoded in their declared encoding."""
+    output = tmp_path / "merged.xml"
+    latin = '<?xml version="1.0" encoding="ISO-8859-1"?><item>é</item>'.encode("latin-1")
+
+    RecordMerger(output=output)([b"<item>a</item>", latin])
+
+    assert [item.text for item in ET.parse(output).getroot()] == ["a", "é"]
+
+
+def test_split_transform_merge_pipeline(
+    feed: Path, xml_xsl_sample: tuple[str, str, Path], tmp_path: Path
+):
+    """Test a streamed pipeline from one huge document to one merged document."""
+    _, xslt, _ = xml_xsl_sample
+    output = tmp_path / "merged.xml"
+
+    result = process(
+        [feed],
+        steps=[RecordSplitter(), xsl.XSL(xslt=xslt), RecordMerger(output=output)],
+        stream=True,
+    )
+
+    assert list(result) == [str(output)]
+    assert [record.get("id") for record in ET.parse(output).getroot()] == ["1", "2", "3"]
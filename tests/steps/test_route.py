@@ -0,0 +1,118 @@
+"""Test the routing step and its predicates."""
+
+import pickle
+from pathlib import Path
+
+from saxonche import PySaxonProcessor
+
+from py_ductus.common.document import Document
+from py_ductus.main import process
+from py_ductus.pipeline import Pipeline
+from py_ductus.steps import xsl
+from py_ductus.steps.route import RootElement, Route, XPathPredicate, root_element
+from py_ductus.steps.xsl.session import SaxonSession
+from tests.conftest import SelectiveFailingFakeStep
+
+
+def test_route_keeps_order_of_matching_and_other_values() -> None:
+    """Test that only matching values go through the steps and the order is kept."""
+    route = Route(lambda value: value.startswith("x"), SelectiveFailingFakeStep())
+
+    result = process(["x1", "a", "x2", "x3", "b"], steps=[route], stream=True)
+
+    assert list(result) == ["main:x1", "a", "main:x2", "main:x3", "b"]
+    assert (route.matched, route.skipped) == (3, 2)
+    assert route.name == "route(selective_failing_fake_step)"
+
+
+def test_root_element_sniffs_name_and_namespace() -> None:
+    """Test that the root element is found behind the prolog, with its namespace."""
+    xml = '<?xml version="1.0"?><!-- <fake/> --><!DOCTYPE a><n:a xmlns:n="urn:a"><b/></n:a>'
+
+    assert root_element(xml) == ("urn:a", "a")
+    assert root_element(xml.encode()) == ("urn:a", "a")
+    assert RootElement("a", namespace="urn:a")(Document(text=xml))
+    assert not RootElement("a", namespace="")(xml)
+    assert not RootElement("b")(xml)
+    assert root_element("no markup") is None
+
+
+def test_root_element_reads_only_the_head_of_files(tmp_path: Path) -> None:
+    """Test that documents backed by files are sniffed without reading them."""
+    path = tmp_path / "doc.xml"
+    path.write_text('<feed xmlns="urn:feed">' + "<record/>" * 1000 + "</feed>")
+    document = Document.from_file(path)
+
+    assert RootElement("feed", namespace="urn:feed", peek=64)(document)
+    assert document.size == path.stat().st_size
+
+
+def test_xpath_predicate_parses_documents_once(xml_xsl_sample: tuple[str, str, Path]) -> None:
+    """Test that routed documents are transformed from the node parsed by the predicate."""
+    xml, xslt, _ = xml_xsl_sample
+    session = SaxonSession()
+    predicate = XPathPredicate("/foo = 'bar'")
+    documents = [Document(text=xml), Document(text="<foo>baz</foo>")]
+
+    result = list(process(documents, steps=[Route(predicate, xsl.XSL(xslt=xslt))], session=session))
+
+    assert documents[0].parsed_by(session.processor)
+    assert [str(value) for value in result] == [xml, "<foo>baz</foo>"]
+    assert isinstance(result[0], Document)
+    assert result[1] is documents[1]
+
+
+def test_xpath_predicate_on_text() -> None:
+    """Test that text values are parsed by the processor of the predicate."""
+    session = SaxonSession()
+    predicate = XPathPredicate("count(//item) > 1", session=session)
+
+    assert predicate("<items><item/><item/></items>")
+    assert not predicate("<items><item/></items>")
+    assert isinstance(session.processor, PySaxonProcessor)
+
+
+def test_xpath_predicate_on_buffers() -> None:
+    """Test that bytes-like values are decoded in their declared encoding."""
+    predicate = XPathPredicate("/a = 'é'")
+    latin = '<?xml version="1.0" encoding="ISO-8859-1"?><a>é</a>'.encode("latin-1")
+
+    assert predicate(latin)
+    assert predicate(memoryview(latin))
+    assert not predicate(b"<a/>")
+
+
+def test_xpath_predicate_can_be_pickled() -> None:
+    """Test that a pickled predicate creates its own XPath processors."""
+    predicate = XPathPredicate("/x:a", namespaces={"x": "urn:x"})
+    assert predicate('<a xmlns="urn:x"/>')
+
+    restored = pickle.loads(pickle.dumps(predicate))
+
+    assert restored('<a xmlns="urn:x"/>')
+    assert not restored("<a/>")
+
+
+def test_route_is_prepared_by_pipeline(xml_xsl_sample: tuple[str, str, Path]) -> None:
+    """Test that pipelines compile the stylesheets of routed steps."""
+    xml, xslt, _ = xml_xsl_sample
+    session = SaxonSession()
+    pipeline = Pipeline([Route(RootElement("foo"), xsl.XSL(xslt=xslt))], session=session)
+
+    assert len(session.cache) == 1
+    assert pipeline([xml, "<bar/>"]) == [xml, "<bar/>"]
+
+
+def test_route_binds_xsl_steps_once_per_stream(xml_xsl_sample: tuple[str, str, Path]) -> None:
+    """Test that all runs of matching values share the executables of the sub-pipeline."""
+    xml, xslt, _ = xml_xsl_sample
+    session = SaxonSession(recycle_after=2)
+    route = Route(RootElement("foo"), [xsl.XSL(xslt=xslt), xsl.XSL(xslt=xslt)])
+    values = [xml, "<bar/>"] * 3
+
+    with xsl.use_session(session):
+        cache = session.cache
+        assert route(values) == values
+
+    assert session.cache is cache
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
@@ -0,0 +1,103 @@
+"""Test the per-value time budgets of steps."""
+
+import time
+from collections.abc import Iterable
+
+import pytest
+
+from py_ductus.instrumentation import MetricsCollector
+from py_ductus.main import process
+from py_ductus.steps.alternative import FallbackCounter
+from py_ductus.steps.error import StepError, StepTimeoutError
+from py_ductus.steps.protocol import StepAlternative
+from py_ductus.steps.timeout import TimeoutStep
+from tests.conftest import ValidFakeStep
+
+TIMEOUT = 0.5
+
+
+class SleepingFakeStep:
+    """A fake step, which sleeps for values named "slow"."""
+
+    def __init__(self) -> None:
+        """Initialize the step."""
+        self._name = "sleeping_fake_step"
+
+    def __call__(self, values: Iterable[str]) -> Iterable[str]:
+        """Process values with the step."""
+        results = []
+        for value in values:
+            if value == "slow":
+                time.sleep(30)
+            if value == "fail":
+                raise ValueError(value)
+            results.append(f"done:{value}")
+        return results
+
+    @property
+    def name(self) -> str:
+        """The name of the step."""
+        return self._name
+
+
+def test_timeout_step_processes_values_in_worker() -> None:
+    """Test that values within the budget are processed by the wrapped step."""
+    with TimeoutStep(SleepingFakeStep(), timeout=5) as step:
+        assert step.name == "timeout(sleeping_fake_step)"
+        assert step(["a", "b"]) == ["done:a", "done:b"]
+
+
+def test_timeout_step_cancels_slow_value_and_recovers() -> None:
+    """Test that a slow value raises a StepTimeoutError and the next value gets a new worker."""
+    with TimeoutStep(SleepingFakeStep(), timeout=TIMEOUT) as step:
+        with pytest.raises(StepTimeoutError) as info:
+            step(["slow"])
+
+        assert info.value.timeout == TIMEOUT
+        assert info.value.value == "slow"
+        assert step(["a"]) == ["done:a"]
+
+
+def test_timeout_step_raises_errors_of_wrapped_step() -> None:
+    """Test that errors of the wrapped step reach the caller and keep the worker alive."""
+    with TimeoutStep(SleepingFakeStep(), timeout=5) as step:
+        with pytest.raises(ValueError, match="fail"):
+            step(["fail"])
+
+        assert step(["a"]) == ["done:a"]
+
+
+def test_timeout_step_rejects_non_positive_timeout() -> None:
+    """Test that a timeout must be positive."""
+    with pytest.raises(ValueError, match="positive"):
+        TimeoutStep(ValidFakeStep(), timeout=0)
+
+
+def test_timed_out_values_fall_back_and_are_reported() -> None:
+    """Test that timed out values go to the fallback step and show up in the metrics."""
+    step = TimeoutStep(SleepingFakeStep(), timeout=TIMEOUT)
+    alternative = StepAlternative(main=step, fallback=ValidFakeStep())
+    counter = FallbackCounter()
+    collector = MetricsCollector(slowest=1)
+
+    try:
+        result = process(
+            ["a", "slow", "b"], steps=[alternative], on_fallback=counter, observer=collector
+        )
+    finally:
+        step.close()
+
+    assert result == ["done:a", "slow", "done:b"]
+    assert counter.errors == {"StepTimeoutError": 1}
+    metrics = collector.steps[step.name]
+    assert metrics.timeouts == 1
+    assert [event.item for event in metrics.slowest] == ["slow"]
+    assert metrics.slowest[0].timed_out
+
+
+def test_timeout_error_is_a_step_error() -> None:
+    """Test that timeouts can be handled like other step errors."""
+    error = StepTimeoutError(step=ValidFakeStep(), value="<foo/>", timeout=1.5)
+
+    assert isinstance(error, StepError)
+    assert "1.5s" in str(error)
@@ -0,0 +1,72 @@
+"""Test the XPath step."""
+
+from decimal import Decimal
+
+import pytest
+from saxonche import PySaxonApiError
+
+from py_ductus.common.document import Document
+from py_ductus.main import process
+from py_ductus.steps import xsl
+from py_ductus.steps.protocol import PreparableStep, StreamingStep
+from py_ductus.steps.xpath import XPath
+from py_ductus.steps.xsl.session import SaxonSession
+
+ORDER = '<order xmlns="urn:o"><item price="2.5">a</item><item price="4">b</item></order>'
+
+
+def test_if_xpath_is_a_valid_step() -> None:
+    """Test that the XPath step follows the step protocols."""
+    step = XPath("count(//*)")
+
+    assert isinstance(step, StreamingStep)
+    assert isinstance(step, PreparableStep)
+    assert step.name == "xpath"
+
+
+def test_xpath_returns_atomized_items() -> None:
+    """Test that nodes and atomic values are returned as Python values."""
+    step = XPath("(//o:item, sum(//@price), count(//o:item), true())", namespaces={"o": "urn:o"})
+
+    assert step([ORDER, "<order/>"]) == [["a", "b", 6.5, 2, True], [0, 0, True]]
+
+
+def test_xpath_returns_first_item() -> None:
+    """Test that `first` returns a single value or None per input value."""
+    step = XPath("//item/@price/xs:decimal(.)", namespaces={"": "urn:o"}, first=True)
+
+    assert step([ORDER, "<order/>"]) == [Decimal("2.5"), None]
+    assert step(ORDER) == Decimal("2.5")
+
+
+def test_xpath_binds_params() -> None:
+    """Test that params are bound to variables, also maps and arrays."""
+    step = XPath(
+        "map { 'label': $label || count(//*), 'sizes': array { $sizes?* ! (. * 2) } }",
+        params=[
+            xsl.XSLAtomicParam("label", "n="),
+            xsl.XSLArrayParam("sizes", [1, 2]),
+        ],
+        first=True,
+    )
+
+    assert step("<a><b/></a>") == {"label": "n=2", "sizes": [2, 4]}
+
+
+def test_xpath_compiles_once_per_session() -> None:
+    """Test that the expression is compiled once and documents are parsed once."""
+    with SaxonSession() as session:
+        step = XPath("string(/a)", session=session, first=True)
+        step.prepare()
+        document = Document(text="<a>x</a>")
+
+        assert process([document, Document(text="<a>y</a>")], steps=[step]) == ["x", "y"]
+        assert step([document]) == ["x"]
+        assert document.parsed_by(session.processor)
+        assert session.cache.stats.misses == 1
+
+
+def test_xpath_raises_on_invalid_expression() -> None:
+    """Test that expressions which do not compile raise."""
+    with pytest.raises(PySaxonApiError):
+        XPath("count(//*")(["<a/>"])
@@ -0,0 +1,62 @@
+"""Test the XQuery step."""
+
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from py_ductus.common.document import Document
+from py_ductus.main import process
+from py_ductus.steps import xsl
+from py_ductus.steps.protocol import StreamingStep
+from py_ductus.steps.xquery import XQuery
+from py_ductus.steps.xsl.session import SaxonSession
+
+QUERY = """
+declare variable $factor external;
+for $b in //b
+order by xs:integer($b) descending
+return xs:integer($b) * $factor
+"""
+
+
+def test_if_xquery_is_a_valid_step() -> None:
+    """Test that the XQuery step follows the streaming step protocol."""
+    step = XQuery("count(//*)")
+
+    assert isinstance(step, StreamingStep)
+    assert step.name == "xquery"
+
+
+def test_xquery_runs_query_file_with_params(tmp_path: Path) -> None:
+    """Test that queries from files bind params to external variables."""
+    query = tmp_path / "query.xq"
+    query.write_text(QUERY)
+    step = XQuery(query, params=xsl.XSLAtomicParam("factor", 10))
+
+    assert step(["<a><b>1</b><b>3</b></a>", "<a/>"]) == [[30, 10], []]
+    assert (
+        step.fingerprint() == XQuery(query, params=xsl.XSLAtomicParam("factor", 10)).fingerprint()
+    )
+    assert step.fingerprint() != XQuery(query, params=xsl.XSLAtomicParam("factor", 2)).fingerprint()
+
+
+def test_xquery_declares_namespaces_and_reuses_documents() -> None:
+    """Test that declared namespaces apply and parsed documents are reused."""
+    with SaxonSession() as session:
+        step = XQuery("//x:b/string()", namespaces={"x": "urn:x"}, first=True, session=session)
+        document = Document(text='<a xmlns="urn:x"><b>z</b></a>')
+        document.node(session.processor)
+
+        assert process([document, Document(text="<a/>")], steps=[step]) == ["z", None]
+
+
+def test_xquery_runs_in_threads() -> None:
+    """Test that every thread runs its own query processor."""
+    step = XQuery("sum(//b)", first=True)
+    values = [f"<a><b>{index}</b><b>1</b></a>" for index in range(20)]
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(step, values))
+
+    assert results == [index + 1 for index in range(20)]
+    assert pickle.loads(pickle.dumps(step))(values[:1]) == [1]
@@ -0,0 +1,101 @@
+"""Test the stylesheet cache."""
+
+import os
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+from saxonche import PySaxonProcessor, PyXdmValue
+
+from py_ductus.steps import xsl
+
+
+def test_cache_counts_hits_and_misses(xml_xsl_sample: tuple[str, str, Path]):
+    """Test that a stylesheet is only compiled once."""
+    _, xslt, _ = xml_xsl_sample
+    cache = xsl.StylesheetCache()
+
+    executable = cache.get(xslt)
+    assert cache.get(xslt) is executable
+
+    stats = cache.stats
+    assert stats.hits == 1
+    assert stats.misses == 1
+    assert stats.size == 1
+
+
+def test_cache_evicts_least_recently_used(xml_xsl_sample: tuple[str, str, Path]):
+    """Test that the cache stays within its maxsize."""
+    _, xslt, xsl_path = xml_xsl_sample
+    cache = xsl.StylesheetCache(maxsize=1)
+
+    cache.get(xslt)
+    cache.get(xsl_path)
+
+    assert len(cache) == 1
+    assert cache.stats.evictions == 1
+    assert not cache.invalidate(xslt)
+    assert cache.invalidate(xsl_path)
+
+
+def test_cache_recompiles_changed_file(xml_xsl_sample: tuple[str, str, Path]):
+    """Test that a modified stylesheet file is not served from the cache."""
+    _, xslt, xsl_path = xml_xsl_sample
+    cache = xsl.StylesheetCache()
+
+    cache.get(xsl_path)
+    xsl_path.write_text(xslt + "\n")
+    os.utime(xsl_path, ns=(0, 0))
+    cache.get(xsl_path)
+
+    assert cache.stats.misses == 2  # noqa: PLR2004
+    assert cache.invalidate(xsl_path)
+    assert len(cache) == 0
+
+
+def test_cache_clear(xml_xsl_sample: tuple[str, str, Path]):
+    """Test that clearing the cache resets it."""
+    _, xslt, _ = xml_xsl_sample
+    cache = xsl.StylesheetCache()
+    cache.get(xslt)
+    cache.clear()
+
+    assert cache.stats == xsl.CacheStats(hits=0, misses=0, evictions=0, size=0, maxsize=128)
+
+
+def test_cache_rejects_invalid_maxsize():
+    """Test that a cache needs room for at least one stylesheet."""
+    with pytest.raises(ValueError, match="maxsize"):
+        xsl.StylesheetCache(maxsize=0)
+
+
+def test_xsl_steps_share_compiled_stylesheet(xml_xsl_sample: tuple[str, str, Path]):
+    """Test that XSL steps with the same stylesheet reuse the compiled executable."""
+    xml, xslt, _ = xml_xsl_sample
+
+    xsl.XSL(xslt=xslt)([xml])
+    misses = xsl.default_session().cache.stats.misses
+    xsl.XSL(xslt=xslt)([xml])
+    xsl.XSL(xslt=xslt)([xml])
+
+    assert xsl.default_session().cache.stats.misses == misses
+
+
+def test_cache_memoizes_xdm_values():
+    """Test that XDM values are converted once per key, within `value_maxsize`."""
+    cache = xsl.StylesheetCache(value_maxsize=1)
+    conversions: list[str] = []
+
+    def convert(value: str) -> Callable[[PySaxonProcessor], PyXdmValue]:
+        def make(proc: PySaxonProcessor) -> PyXdmValue:
+            conversions.append(value)
+            return proc.make_string_value(value)
+
+        return make
+
+    first = cache.xdm_value("a", convert("a"))
+    assert cache.xdm_value("a", convert("a")) is first
+    cache.xdm_value("b", convert("b"))
+    cache.xdm_value("a", convert("a"))
+
+    assert conversions == ["a", "b", "a"]
@@ -0,0 +1,70 @@
+"""Test the file-to-file XSL step."""
+
+from pathlib import Path
+
+import pytest
+from saxonche import PySaxonApiError
+
+from py_ductus.main import chain_xsl_steps, process
+from py_ductus.steps import xsl
+from py_ductus.steps.protocol import StreamingStep
+
+
+def test_xsl_file_writes_to_output_directory(
+    tmp_path: Path, xml_xsl_sample_with_params: tuple[str, str, Path]
+):
+    """Test that results are written to the output directory, named like their inputs."""
+    xml, xslt, _ = xml_xsl_sample_with_params
+    sources = [tmp_path / "in" / f"doc{index}.xml" for index in range(3)]
+    sources[0].parent.mkdir()
+    for source in sources:
+        source.write_text(xml)
+
+    step = xsl.XSLFile(
+        xslt=xslt, output=tmp_path / "out", params=xsl.XSLAtomicParam(name="param1", value="bar")
+    )
+    results = step(sources)
+
+    assert isinstance(step, StreamingStep)
+    assert results == [str(tmp_path / "out" / source.name) for source in sources]
+    assert all("<root>bar</root>" in Path(result).read_text() for result in results)
+
+
+def test_xsl_file_with_path_template(tmp_path: Path, xml_xsl_sample: tuple[str, str, Path]):
+    """Test that output paths can be built from a template."""
+    xml, xslt, _ = xml_xsl_sample
+    source = tmp_path / "doc.xml"
+    source.write_text(xml)
+
+    step = xsl.XSLFile(xslt=xslt, output=str(tmp_path / "{stem}.out{suffix}"))
+
+    [result] = step([source])
+
+    assert result == str(tmp_path / "doc.out.xml")
+    assert Path(result).read_text() == xml
+
+
+def test_xsl_file_leaves_no_partial_output(tmp_path: Path, xml_xsl_sample: tuple[str, str, Path]):
+    """Test that failed transformations do not leave output files."""
+    _, xslt, _ = xml_xsl_sample
+    source = tmp_path / "broken.xml"
+    source.write_text("<foo>")
+
+    with pytest.raises(PySaxonApiError):
+        xsl.XSLFile(xslt=xslt, output=tmp_path / "out")([source])
+
+    assert list((tmp_path / "out").iterdir()) == []
+
+
+def test_xsl_file_is_not_chained(tmp_path: Path, xml_xsl_sample: tuple[str, str, Path]):
+    """Test that file steps are kept out of XSL chains and work in process()."""
+    xml, xslt, _ = xml_xsl_sample
+    source = tmp_path / "doc.xml"
+    source.write_text(xml)
+    steps = [
+        xsl.XSLFile(xslt=xslt, output=tmp_path / "a"),
+        xsl.XSLFile(xslt=xslt, output="{parent}/../b/{name}"),
+    ]
+
+    assert chain_xsl_steps(steps) == steps
+    assert Path(process([source], steps=steps)[0]).read_text() == xml  # type: ignore
@@ -0,0 +1,69 @@
+"""Test the Saxon session."""
+
+from pathlib import Path
+
+import pytest
+
+from py_ductus.main import process
+from py_ductus.steps import xsl
+from py_ductus.steps.protocol import StepAlternative
+from tests.conftest import ValidFakeStep
+
+
+def test_xsl_steps_share_session_stylesheets(xml_xsl_sample: tuple[str, str, Path]):
+    """Test that XSL steps in one session reuse the compiled stylesheet."""
+    xml, xslt, _ = xml_xsl_sample
+
+    with xsl.SaxonSession() as session:
+        xsl.XSL(xslt=xslt, session=session)([xml])
+        xsl.XSL(xslt=xslt, session=session)([xml])
+        assert process([xml], steps=[xsl.XSL(xslt=xslt)], session=session) == [xml]
+
+        assert session.cache.stats.misses == 1
+        assert session.cache.stats.hits == 2  # noqa: PLR2004
+
+    assert session.closed
+
+
+def test_closed_session_raises(xml_xsl_sample: tuple[str, str, Path]):
+    """Test that a closed session can not be used anymore."""
+    xml, xslt, _ = xml_xsl_sample
+    session = xsl.SaxonSession()
+    session.close()
+
+    with pytest.raises(RuntimeError, match="closed"):
+        xsl.XSL(xslt=xslt, session=session)([xml])
+
+
+def test_session_recycles_processor(xml_xsl_sample: tuple[str, str, Path]):
+    """Test that a session replaces its processor after the configured number of calls."""
+    xml, xslt, _ = xml_xsl_sample
+    step = xsl.XSL(xslt=xslt)
+
+    with xsl.SaxonSession(recycle_after=2) as session:
+        process([xml], steps=[step], session=session)
+        process([xml], steps=[step], session=session)
+        processor = session.processor
+        assert process([xml], steps=[step], session=session) == [xml]
+
+        assert session.processor is not processor
+        assert session.cache.stats.misses == 1
+
+
+def test_use_session_activates_session():
+    """Test that use_session switches the current session."""
+    with xsl.SaxonSession() as session, xsl.use_session(session):
+        assert xsl.current_session() is session
+
+    assert xsl.current_session() is xsl.default_session()
+
+
+def test_streamed_results_use_process_session(xml_xsl_sample: tuple[str, str, Path]):
+    """Test that lazily consumed results still run in the session passed to process."""
+    xml, xslt, _ = xml_xsl_sample
+
+    with xsl.SaxonSession() as session:
+        alternative = StepAlternative(main=xsl.XSL(xslt=xslt), fallback=ValidFakeStep())
+        result = process([xml], steps=[alternative], session=session, stream=True)
+        assert list(result) == [xml]
+        assert session.cache.stats.misses == 1
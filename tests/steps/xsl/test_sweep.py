@@ -0,0 +1,102 @@
+"""Test the XSL sweep step."""
+
+import pickle
+from pathlib import Path
+
+import pytest
+from saxonche import PySaxonProcessor, PyXslt30Processor, PyXsltExecutable
+
+from py_ductus.main import chain_xsl_steps, process
+from py_ductus.steps import xsl
+from tests.conftest import CountingParam
+
+
+def test_sweep_renders_every_value_per_param_set(
+    xml_xsl_sample_with_params: tuple[str, str, Path],
+):
+    """Test that a sweep produces one result per value and param set, value first."""
+    xml, xslt, _ = xml_xsl_sample_with_params
+    step = xsl.XSLSweep(
+        xslt=xslt,
+        param_sets=[
+            xsl.XSLAtomicParam(name="param1", value="de"),
+            [xsl.XSLAtomicParam(name="param1", value="en")],
+            [],
+        ],
+    )
+
+    results = step([xml, xml.replace("bar", "baz")])
+
+    assert [str(result).split("<root>")[1].split("</root>")[0] for result in results] == [
+        "de",
+        "en",
+        "default1",
+        "de",
+        "en",
+        "default1",
+    ]
+
+
+def test_sweep_applies_params_with_own_apply_param(
+    xml_xsl_sample_with_params: tuple[str, str, Path],
+):
+    """Test that params overriding apply_param, e.g. nodes parsed from files, are applied per set."""
+    xml, xslt, xsl_path = xml_xsl_sample_with_params
+
+    class FileParam(xsl.XSLAtomicParam):
+        def apply_param(
+            self, proc: PySaxonProcessor, xsl_proc: PyXslt30Processor | PyXsltExecutable
+        ) -> None:
+            node = proc.parse_xml(xml_file_name=str(self.value))
+            xsl_proc.set_parameter(str(self.name), node)  # type: ignore
+
+    for language in ("de", "en"):
+        (xsl_path.parent / f"{language}.xml").write_text(f"<language>{language}</language>")
+    step = xsl.XSLSweep(
+        xslt=xslt,
+        param_sets=[
+            FileParam(name="param1", value=str(xsl_path.parent / "de.xml")),
+            [FileParam(name="param1", value=str(xsl_path.parent / "en.xml"))],
+            [],
+        ],
+    )
+
+    results = step(xml)
+
+    assert [str(result).split("<root>")[1].split("</root>")[0] for result in results] == [
+        "de",
+        "en",
+        "default1",
+    ]
+
+
+def test_sweep_converts_param_sets_once(xml_xsl_sample_with_params: tuple[str, str, Path]):
+    """Test that param sets are converted once, not per value or call."""
+    xml, xslt, _ = xml_xsl_sample_with_params
+    CountingParam.conversions = 0
+    step = xsl.XSLSweep(
+        xslt=xslt,
+        param_sets=[CountingParam(name="param1", value=language) for language in ("de", "en")],
+    )
+
+    with xsl.SaxonSession() as session:
+        for _ in range(3):
+            assert len(process([xml, xml], steps=[step], session=session)) == 2 * 2  # type: ignore
+
+    assert CountingParam.conversions == len(step.param_sets)
+
+
+def test_sweep_is_not_chained_and_pickles(xml_xsl_sample: tuple[str, str, Path]):
+    """Test that sweeps stay out of XSL chains and can be sent to worker processes."""
+    xml, xslt, _ = xml_xsl_sample
+    steps = [xsl.XSL(xslt=xslt), xsl.XSLSweep(xslt=xslt, param_sets=[[], []])]
+    steps[1](xml)
+
+    assert chain_xsl_steps(steps) == steps
+    assert pickle.loads(pickle.dumps(steps[1]))(xml) == [xml, xml]
+
+
+def test_sweep_needs_param_sets():
+    """Test that a sweep without param sets is rejected."""
+    with pytest.raises(ValueError, match="param set"):
+        xsl.XSLSweep(xslt="", param_sets=[])
@@ -1,9 +1,17 @@
 """Test the XSL types."""
 
 import pytest
-from saxonche import PySaxonProcessor, PyXdmArray, PyXdmAtomicValue
+from saxonche import (
+    PySaxonProcessor,
+    PyXdmArray,
+    PyXdmAtomicValue,
+    PyXdmMap,
+    PyXslt30Processor,
+    PyXsltExecutable,
+)
 
 from py_ductus.steps import xsl
+from py_ductus.steps.xsl import types
 
 
 def test_if_atomic_is_valid_type():
@@ -71,3 +79,37 @@ def test_if_array_convert_returns_xdm_array(input_value: list[str | bool | int |
         sax_array = test_type.convert_to_saxon(proc)
         assert isinstance(test_type.convert_to_saxon(proc), PyXdmArray)
         assert sax_array.size == 1  # type: ignore
+
+
+def test_map_convert_returns_xdm_map():
+    """Test that the map convert returns a XdmMap with nested values."""
+    test_type = xsl.XSLMapParam(value={"a": "x", "b": [1, 2], "c": {"d": True}}, name="test")
+    assert isinstance(test_type, xsl.XSLParam)
+
+    with PySaxonProcessor(license=False) as proc:
+        xdm_map = test_type.convert_to_saxon(proc)
+        assert isinstance(xdm_map, PyXdmMap)
+        assert xdm_map.map_size == len(test_type.value)  # type: ignore
+
+
+def test_param_key():
+    """Test that atomic and explicitly keyed params can be memoized."""
+    assert types.param_key(xsl.XSLAtomicParam(name="a", value=1)) != types.param_key(
+        xsl.XSLAtomicParam(name="a", value=True)
+    )
+    assert types.param_key(xsl.XSLArrayParam(name="a", value=[1, 2])) is None
+    assert types.param_key(xsl.XSLArrayParam(name="a", value=[1, 2], key="table")) is not None
+
+
+def test_params_with_own_apply_param_are_not_memoized():
+    """Test that params overriding apply_param apply themselves."""
+
+    class OwnParam(xsl.XSLAtomicParam):
+        def apply_param(
+            self, proc: PySaxonProcessor, xsl_proc: PyXslt30Processor | PyXsltExecutable
+        ) -> None:
+            pass
+
+    assert not types.applies_itself(xsl.XSLMapParam(name="a", value={}))
+    assert types.applies_itself(OwnParam(name="a", value=1))
+    assert types.param_key(OwnParam(name="a", value=1)) is None
@@ -1,10 +1,23 @@
 """Test the XSL step."""
 
+import mmap
 import xml.etree.ElementTree as ET  # noqa: N817
 from pathlib import Path
 
+import pytest
+from saxonche import (
+    PySaxonApiError,
+    PySaxonProcessor,
+    PyXdmArray,
+    PyXslt30Processor,
+    PyXsltExecutable,
+)
+
+from py_ductus.common.document import Document
+from py_ductus.instrumentation import MetricsCollector
+from py_ductus.main import process
 from py_ductus.steps import xsl
-from py_ductus.steps.protocol import Step
+from py_ductus.steps.protocol import Step, StreamingStep
 
 
 def test_if_xsl_is_a_valid_step():
@@ -66,3 +79,147 @@ def test_xsl_step_applied_with_dynamic_param(xml_xsl_sample_with_params: tuple[s
     text_2 = tree_2.text
 
     assert text_1 == text_2
+
+
+def test_xsl_step_streams(xml_xsl_sample: tuple[str, str, Path]):
+    """Test that the XSL step transforms lazily when streaming."""
+    xml, xslt, _ = xml_xsl_sample
+    step = xsl.XSL(xslt=xslt)
+
+    result = step.stream(iter([xml, "<not-xml"]))
+
+    assert isinstance(step, StreamingStep)
+    assert next(result) == xml
+    with pytest.raises(PySaxonApiError):
+        next(result)
+
+
+def test_xsl_chain_passes_nodes(xml_xsl_sample_with_params: tuple[str, str, Path]):
+    """Test that a XSL chain gives the same result as its steps applied one by one."""
+    xml, xslt, _ = xml_xsl_sample_with_params
+    first = xsl.XSL(xslt=xslt, params=xsl.XSLAtomicParam(name="param1", value="bar"))
+    second = xsl.XSL(xslt=xslt.replace("<root>", "<wrapped>").replace("</root>", "</wrapped>"))
+
+    chain = xsl.XSLChain(steps=[first, second])
+
+    assert chain([xml, xml]) == second(first([xml, xml]))
+    assert isinstance(chain, Step)
+
+
+def test_xsl_step_applied_with_map_param():
+    """Test that map params can be used as lookup tables."""
+    xslt = """<xsl:stylesheet version="3.0" xmlns:xsl="http://www.w3.org/1999/XSL/Transform">
+        <xsl:param name="labels" as="map(*)"/>
+        <xsl:template match="/foo"><label><xsl:value-of select="$labels(string(.))"/></label></xsl:template>
+    </xsl:stylesheet>"""
+    step = xsl.XSL(xslt=xslt, params=xsl.XSLMapParam(name="labels", value={"bar": "Bar!"}))
+
+    assert "<label>Bar!</label>" in step("<foo>bar</foo>")
+
+
+def test_xsl_step_memoizes_dynamic_params(xml_xsl_sample_with_params: tuple[str, str, Path]):
+    """Test that recurring dynamic param values are converted once per processor."""
+    xml, _, xsl_path = xml_xsl_sample_with_params
+    conversions: list[str] = []
+
+    class KeyedParam(xsl.XSLArrayParam):
+        def convert_to_saxon(self, proc: PySaxonProcessor) -> PyXdmArray:
+            conversions.append(str(self.key))
+            return super().convert_to_saxon(proc)
+
+    step = xsl.XSL(
+        xslt=xsl_path,
+        dynamic_params=lambda: KeyedParam(name="param1", value=["a", "b"], key="table"),
+    )
+
+    with xsl.SaxonSession() as session, xsl.use_session(session):
+        results = step([xml, xml, xml])
+
+    assert all(isinstance(result, str) and "a b" in result for result in results)
+    assert conversions == ["table"]
+
+
+def test_xsl_step_applies_params_with_own_apply_param(
+    xml_xsl_sample_with_params: tuple[str, str, Path],
+):
+    """Test that params overriding apply_param are applied with it, static or dynamic."""
+    xml, _, xsl_path = xml_xsl_sample_with_params
+
+    class UpperParam(xsl.XSLAtomicParam):
+        def apply_param(
+            self, proc: PySaxonProcessor, xsl_proc: PyXslt30Processor | PyXsltExecutable
+        ) -> None:
+            value = proc.make_string_value(str(self.value).upper())
+            xsl_proc.set_parameter(str(self.name), value)  # type: ignore
+
+    static = xsl.XSL(xslt=xsl_path, params=UpperParam(name="param1", value="static"))
+    dynamic = xsl.XSL(xslt=xsl_path, dynamic_params=lambda: UpperParam(name="param1", value="dyn"))
+
+    assert [result for result in static([xml]) if isinstance(result, str) and "STATIC" in result]
+    assert [result for result in dynamic([xml]) if isinstance(result, str) and "DYN" in result]
+
+
+def test_xsl_step_reports_slowest_values(xml_xsl_sample: tuple[str, str, Path]):
+    """Test that the XSL step reports the duration and size of every value to item observers."""
+    xml, xslt, _ = xml_xsl_sample
+    collector = MetricsCollector(slowest=2)
+    values = [xml, xml.replace("bar", "baz"), xml.replace("bar", "qux")]
+
+    process(values, steps=[xsl.XSL(xslt=xslt)], observer=collector)
+
+    slowest = collector.steps["xsl"].slowest
+    assert len(slowest) == len(values) - 1
+    assert slowest[0].seconds >= slowest[1].seconds
+    assert {event.size for event in slowest} == {len(xml)}
+
+
+def test_xsl_step_derives_documents(xml_xsl_sample: tuple[str, str, Path]):
+    """Test that documents are transformed into derived documents with the step timing."""
+    xml, xslt, _ = xml_xsl_sample
+    document = Document(text=xml, origin="feed.xml", metadata={"id": 1})
+
+    [result] = process([document], steps=[xsl.XSL(xslt=xslt), xsl.XSL(xslt=xslt)])
+
+    assert isinstance(result, Document)
+    assert result.text == xml
+    assert result.origin == "feed.xml"
+    assert result.metadata == {"id": 1}
+    assert list(result.timings) == ["xsl_chain"]
+
+
+LATIN_OUTPUT_XSLT = """<xsl:stylesheet version="3.0" xmlns:xsl="http://www.w3.org/1999/XSL/Transform">
+    <xsl:output encoding="ISO-8859-1"/>
+    <xsl:template match="/"><b><xsl:value-of select="."/></b></xsl:template>
+</xsl:stylesheet>"""
+
+
+def test_xsl_step_accepts_buffers(tmp_path: Path):
+    """Test that bytes, views and memory maps are parsed in their declared encoding."""
+    data = '<?xml version="1.0" encoding="ISO-8859-1"?><a>é</a>'.encode("latin-1")
+    path = tmp_path / "latin.xml"
+    path.write_bytes(data)
+    step = xsl.XSL(xslt=LATIN_OUTPUT_XSLT, output_encoding="utf-8")
+
+    with path.open("rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        results = [
+            *process([data], steps=[step]),
+            *process([memoryview(data)], steps=[step]),
+            *process([mapped], steps=[step]),
+        ]
+
+    assert results == ['<?xml version="1.0" encoding="UTF-8"?><b>é</b>'.encode()] * 3
+
+
+def test_xsl_step_encodes_output(xml_xsl_sample: tuple[str, str, Path]):
+    """Test that results are encoded in the output encoding, also at the end of a chain."""
+    _, xslt, _ = xml_xsl_sample
+    latin = xsl.XSL(xslt=LATIN_OUTPUT_XSLT, output_encoding="ISO-8859-1")
+    document = Document(text="<a>é€</a>", origin="memory")
+
+    [result] = process([document], steps=[xsl.XSL(xslt=xslt), latin])
+
+    assert isinstance(result, Document)
+    assert result.encoding == "ISO-8859-1"
+    assert result.data == b'<?xml version="1.0" encoding="ISO-8859-1"?><b>\xe9&#8364;</b>'
+    assert result.text.endswith("<b>é&#8364;</b>")
+    assert latin.fingerprint() != xsl.XSL(xslt=LATIN_OUTPUT_XSLT).fingerprint()
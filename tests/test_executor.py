@@ -0,0 +1,33 @@
+"""Test the executor.py file."""
+
+import asyncio
+import threading
+
+from py_ductus.executor import SaxonExecutor, default_executor
+from py_ductus.steps.xsl import SaxonSession, current_session, default_session
+
+
+def test_executor_runs_threads_in_own_sessions():
+    """Test that functions run in a worker thread with the session of that thread."""
+
+    async def main(executor: SaxonExecutor) -> tuple[SaxonSession, int]:
+        return await executor.run(lambda: (current_session(), threading.get_ident()))
+
+    with SaxonExecutor(max_workers=1) as executor:
+        first, thread = asyncio.run(main(executor))
+        second, _ = asyncio.run(main(executor))
+
+        assert thread != threading.get_ident()
+        assert first is second
+        assert first is not default_session()
+
+    assert first.closed
+
+
+def test_default_executor_is_replaced_after_shutdown():
+    """Test that a shut down default executor is replaced."""
+    executor = default_executor()
+    assert default_executor() is executor
+
+    executor.shutdown()
+    assert default_executor() is not executor
@@ -0,0 +1,87 @@
+"""Test the instrumentation of pipelines."""
+
+from pathlib import Path
+
+from py_ductus.common.document import Document
+from py_ductus.instrumentation import (
+    MetricsCollector,
+    Observer,
+    PhaseEvent,
+    StepEvent,
+    report_item,
+)
+from py_ductus.main import process
+from py_ductus.steps import xsl
+from py_ductus.steps.protocol import StepAlternative
+from tests.conftest import FailingFakeStep, ValidFakeStep
+
+
+def test_collector_is_an_observer():
+    """Test that the collector implements the observer protocol."""
+    assert isinstance(MetricsCollector(), Observer)
+
+
+def test_process_reports_steps_and_phases(xml_xsl_sample: tuple[str, str, Path]):
+    """Test that process reports item counts, sizes and XSL phases."""
+    xml, xslt, _ = xml_xsl_sample
+    collector = MetricsCollector()
+
+    process([xml, xml], steps=[xsl.XSL(xslt=xslt), ValidFakeStep()], observer=collector)
+
+    metrics = collector.steps["xsl"]
+    assert metrics.calls == 1
+    assert metrics.items_in == metrics.items_out == 2  # noqa: PLR2004
+    assert metrics.bytes_in == 2 * len(xml)
+    assert metrics.wall_time >= 0
+    assert set(metrics.phases) == {"compile", "parse", "transform"}
+    assert metrics.phase_counts["parse"] == 2  # noqa: PLR2004
+    assert collector.steps["valid_fake_step"].items_out == 2  # noqa: PLR2004
+
+
+def test_streaming_process_reports_when_exhausted(xml_xsl_sample: tuple[str, str, Path]):
+    """Test that lazily processed steps are reported once their results are consumed."""
+    xml, xslt, _ = xml_xsl_sample
+    collector = MetricsCollector()
+    alternative = StepAlternative(main=FailingFakeStep(), fallback=ValidFakeStep())  # type: ignore
+
+    result = process(
+        iter([xml]), steps=[xsl.XSL(xslt=xslt), alternative], stream=True, observer=collector
+    )
+    assert collector.steps == {}
+
+    assert list(result) == [xml]
+    assert collector.steps["xsl"].items_out == 1
+    assert collector.steps["FailingFakeStep/valid_fake_step"].items_in == 1
+
+
+def test_collector_exports_openmetrics():
+    """Test the OpenMetrics text export."""
+    collector = MetricsCollector()
+    collector.on_step(StepEvent('x"sl', 1.5, 1.0, 2, 2, 10, 12))
+    collector.on_phase(PhaseEvent('x"sl', "parse", 0.25))
+
+    text = collector.to_openmetrics()
+
+    assert "# TYPE py_ductus_step_wall_seconds counter" in text
+    assert 'py_ductus_step_wall_seconds_total{step="x\\"sl"} 1.5' in text
+    assert 'py_ductus_step_out_bytes_total{step="x\\"sl"} 12' in text
+    assert 'py_ductus_phase_seconds_total{step="x\\"sl",phase="parse"} 0.25' in text
+    assert text.endswith("# EOF\n")
+
+
+def test_collector_labels_documents_by_their_beginning():
+    """Test that documents without an origin are labelled by their first bytes and reset starts over."""
+    collector = MetricsCollector(slowest=2)
+
+    report_item(collector, "xsl", Document(data=b"<a>" + b"x" * 10_000 + b"</a>"), 1.0)
+    report_item(collector, "xsl", Document(text="<b>é</b>", encoding="latin-1"), 0.5)
+
+    assert [event.item for event in collector.steps["xsl"].slowest] == [
+        "<a>" + "x" * 77,
+        "<b>é</b>",
+    ]
+
+    collector.reset()
+    report_item(collector, "xsl", Document(text="<c/>"), 0.5)
+
+    assert [event.item for event in collector.steps["xsl"].slowest] == ["<c/>"]
@@ -1,10 +1,13 @@
 """Test the main.py file."""
 
+import asyncio
+from collections.abc import AsyncIterable, AsyncIterator, Iterator
 from pathlib import Path
 
-from py_ductus.main import process
+from py_ductus.executor import SaxonExecutor
+from py_ductus.main import aprocess, process
 from py_ductus.steps import xsl
-from py_ductus.steps.protocol import StepAlternative
+from py_ductus.steps.protocol import AsyncStep, Step, StepAlternative
 from tests.conftest import FailingFakeStep, ValidFakeStep
 
 
@@ -34,3 +37,88 @@ def test_process_with_xsl_and_fake_alternative(xml_xsl_sample: tuple[str, str, P
         xml,
         xml,
     ]
+
+
+def test_process_streams_values(xml_xsl_sample: tuple[str, str, Path]):
+    """Test that streaming yields results before the whole input is read."""
+    xml, xslt, _ = xml_xsl_sample
+    consumed: list[int] = []
+
+    def values() -> Iterator[str]:
+        for index in range(3):
+            consumed.append(index)
+            yield xml
+
+    result = process(values(), steps=[xsl.XSL(xslt=xslt), ValidFakeStep()], stream=True)
+
+    assert isinstance(result, Iterator)
+    assert next(result) == xml
+    assert consumed == [0]
+    assert list(result) == [xml, xml]
+
+
+def test_process_streams_with_alternative(xml_xsl_sample: tuple[str, str, Path]):
+    """Test that alternatives fall back in streaming mode."""
+    xml, xslt, _ = xml_xsl_sample
+    step = xsl.XSL(xslt=xslt)
+    alternative = StepAlternative(main=FailingFakeStep(), fallback=ValidFakeStep())  # type: ignore
+
+    assert list(process(iter([xml, xml]), steps=[step, alternative], stream=True)) == [xml, xml]
+
+
+def test_process_with_adjacent_xsl_steps(xml_xsl_sample_with_params: tuple[str, str, Path]):
+    """Test that adjacent XSL steps give the same result as applied one by one."""
+    xml, xslt, _ = xml_xsl_sample_with_params
+    first = xsl.XSL(xslt=xslt, params=xsl.XSLAtomicParam(name="param1", value="bar"))
+    second = xsl.XSL(xslt=xslt.replace("$param1", "concat(., '!')"))
+
+    assert process([xml, xml], steps=[first, second, ValidFakeStep()]) == second(first([xml, xml]))
+
+
+class UpperAsyncStep:
+    """A fake async step."""
+
+    _name = "upper_async_step"
+
+    async def astream(self, values: AsyncIterable[str]) -> AsyncIterator[str]:
+        """Process values asynchronously."""
+        async for value in values:
+            await asyncio.sleep(0)
+            yield value.upper()
+
+    @property
+    def name(self) -> str:
+        """The name of the step."""
+        return self._name
+
+
+def test_aprocess_with_async_input(xml_xsl_sample: tuple[str, str, Path]):
+    """Test that aprocess reads async iterables and runs sync and async steps."""
+    xml, xslt, _ = xml_xsl_sample
+
+    async def values() -> AsyncIterator[str]:
+        for _ in range(5):
+            yield xml
+
+    async def main() -> list[str]:
+        with SaxonExecutor(max_workers=2) as executor:
+            steps: list[Step | AsyncStep] = [xsl.XSL(xslt=xslt), UpperAsyncStep(), ValidFakeStep()]
+            return await aprocess(values(), steps=steps, executor=executor, chunk_size=2)
+
+    assert asyncio.run(main()) == [xml.upper()] * 5
+
+
+def test_aprocess_serves_concurrent_requests(xml_xsl_sample_with_params: tuple[str, str, Path]):
+    """Test that concurrent calls share the executor and keep their results apart."""
+    xml, xslt, _ = xml_xsl_sample_with_params
+
+    async def request(executor: SaxonExecutor, value: str) -> list[str]:
+        step = xsl.XSL(xslt=xslt, params=xsl.XSLAtomicParam(name="param1", value=value))
+        return await aprocess([xml, xml], steps=[step], executor=executor)
+
+    async def main() -> list[list[str]]:
+        with SaxonExecutor(max_workers=2) as executor:
+            return await asyncio.gather(*(request(executor, f"v{index}") for index in range(6)))
+
+    for index, results in enumerate(asyncio.run(main())):
+        assert all(f"v{index}" in result for result in results)
@@ -0,0 +1,67 @@
+"""Test the parallel execution of pipelines."""
+
+from collections.abc import Generator
+from pathlib import Path
+
+import pytest
+
+from py_ductus.main import process
+from py_ductus.steps import xsl
+from py_ductus.steps.error import StepError
+from tests.conftest import RaisingFakeStep, ValidFakeStep
+
+
+def test_process_with_workers_keeps_order(xml_xsl_sample_with_params: tuple[str, str, Path]):
+    """Test that worker results are returned in input order."""
+    _, xslt, _ = xml_xsl_sample_with_params
+    step = xsl.XSL(xslt=xslt.replace("$param1", "string(/value)"))
+    values = [f"<value>{index}</value>" for index in range(20)]
+
+    result = process(values, steps=[step, ValidFakeStep()], workers=2, chunk_size=3)
+
+    assert result == step(values)
+
+
+def test_process_with_workers_unordered(xml_xsl_sample: tuple[str, str, Path]):
+    """Test that unordered worker results contain all values."""
+    _, xslt, _ = xml_xsl_sample
+    values = [f"<value>{index}</value>" for index in range(10)]
+
+    result = process(values, steps=[xsl.XSL(xslt=xslt)], workers=2, chunk_size=1, ordered=False)
+
+    assert sorted(result) == sorted(str(value) for value in xsl.XSL(xslt=xslt)(values))
+
+
+def test_process_with_workers_raises_step_error(xml_xsl_sample: tuple[str, str, Path]):
+    """Test that a StepError raised in a worker reaches the caller."""
+    xml, _, _ = xml_xsl_sample
+
+    with pytest.raises(StepError) as error:
+        process([xml, xml], steps=[RaisingFakeStep()], workers=1)
+
+    assert error.value.step_name == "raising_fake_step"
+    assert error.value.value == xml
+
+
+def test_process_with_workers_rejects_invalid_chunk_size():
+    """Test that chunks can not be empty."""
+    with pytest.raises(ValueError, match="chunk_size"):
+        process(["<foo/>"], steps=[], workers=1, chunk_size=0)
+
+
+def test_process_with_workers_reports_saxon_errors(xml_xsl_sample: tuple[str, str, Path]):
+    """Test that errors which can not be pickled are reported with their message."""
+    _, xslt, _ = xml_xsl_sample
+
+    with pytest.raises(RuntimeError, match="PySaxonApiError"):
+        process(["<not-xml"], steps=[xsl.XSL(xslt=xslt)], workers=1)
+
+
+def test_process_with_workers_can_be_closed_early(xml_xsl_sample: tuple[str, str, Path]):
+    """Test that closing the results early shuts the pool down without the remaining chunks."""
+    xml, xslt, _ = xml_xsl_sample
+    results = process([xml] * 20, steps=[xsl.XSL(xslt=xslt)], workers=2, chunk_size=1, stream=True)
+
+    assert isinstance(results, Generator)
+    assert next(results) == xml
+    results.close()
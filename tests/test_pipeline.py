@@ -0,0 +1,81 @@
+"""Test the pipeline.py file."""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from py_ductus.pipeline import Pipeline, PipelineError
+from py_ductus.steps.protocol import StepAlternative
+from py_ductus.steps.xsl import XSL, SaxonSession, XSLAtomicParam, XSLChain
+from tests.conftest import CountingParam, InvalidFakeStep, ValidFakeStep
+
+
+def test_pipeline_rejects_invalid_steps():
+    """Test that steps not implementing the Step protocol are rejected up front."""
+    with pytest.raises(TypeError, match="Step 1"):
+        Pipeline([ValidFakeStep(), InvalidFakeStep()])  # type: ignore
+
+
+def test_pipeline_reports_stylesheet_errors_eagerly():
+    """Test that stylesheets are compiled when the pipeline is built."""
+    with SaxonSession() as session, pytest.raises(PipelineError) as error:
+        Pipeline([ValidFakeStep(), XSL(xslt="<xsl:stylesheet/>")], session=session)
+
+    assert error.value.index == 1
+
+
+def test_pipeline_leaves_failing_main_steps_to_fallback(xml_xsl_sample: tuple[str, str, Path]):
+    """Test that the main step of an alternative may fail to compile."""
+    xml, _, _ = xml_xsl_sample
+    alternative = StepAlternative(main=XSL(xslt="<xsl:stylesheet/>"), fallback=ValidFakeStep())
+
+    with SaxonSession() as session:
+        assert Pipeline([alternative], session=session)([xml]) == [xml]
+
+
+def test_pipeline_converts_static_params_once(
+    xml_xsl_sample_with_params: tuple[str, str, Path],
+):
+    """Test that static params are converted when compiling, not per call."""
+    xml, xslt, _ = xml_xsl_sample_with_params
+    CountingParam.conversions = 0
+
+    with SaxonSession() as session:
+        pipeline = Pipeline(
+            [XSL(xslt=xslt, params=CountingParam(name="param1", value="static"))],
+            session=session,
+        )
+        assert CountingParam.conversions == 1
+
+        for _ in range(3):
+            assert "static" in pipeline([xml, xml])[0]  # type: ignore
+
+    assert CountingParam.conversions == 1
+
+
+def test_pipeline_plans_xsl_chains(xml_xsl_sample: tuple[str, str, Path]):
+    """Test that adjacent XSL steps are chained once in the plan."""
+    _, xslt, _ = xml_xsl_sample
+
+    with SaxonSession() as session:
+        pipeline = Pipeline([XSL(xslt=xslt), XSL(xslt=xslt), ValidFakeStep()], session=session)
+
+    assert len(pipeline) == len(pipeline.steps)
+    assert [type(step) for step in pipeline.plan] == [XSLChain, ValidFakeStep]
+
+
+def test_pipeline_runs_concurrently(xml_xsl_sample_with_params: tuple[str, str, Path]):
+    """Test that a pipeline can be called from several threads at once."""
+    xml, xslt, _ = xml_xsl_sample_with_params
+
+    with SaxonSession() as session:
+        pipeline = Pipeline(
+            [XSL(xslt=xslt, params=XSLAtomicParam(name="param1", value="shared"))],
+            session=session,
+        )
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(lambda _: pipeline([xml] * 5), range(8)))
+
+    assert [len(result) for result in results] == [5] * 8  # type: ignore
+    assert all("shared" in value for result in results for value in result)
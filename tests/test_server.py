@@ -0,0 +1,153 @@
+"""Test the local pipeline server."""
+
+import json
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from py_ductus.server import PipelineClient, PipelineServer, ServerError, load_pipelines
+from py_ductus.steps import xsl
+
+
+def test_server_over_unix_socket(tmp_path: Path, xml_xsl_sample: tuple[str, str, Path]) -> None:
+    """Test that documents sent over a Unix socket are transformed by a named pipeline."""
+    xml, xslt, _ = xml_xsl_sample
+    socket_path = tmp_path / "server.sock"
+
+    with PipelineServer({"identity": [xsl.XSL(xslt=xslt)]}, socket_path=socket_path):
+        client = PipelineClient(socket_path=socket_path)
+
+        assert client.pipelines() == ["identity"]
+        assert client.transform("identity", xml) == xml
+        assert client.transform("identity", [xml, xml]) == [xml, xml]
+
+    assert not socket_path.exists()
+
+
+def test_server_over_http_handles_concurrent_requests(
+    xml_xsl_sample_with_params: tuple[str, str, Path],
+) -> None:
+    """Test that concurrent requests over HTTP are served and accounted for."""
+    xml, _, xsl_path = xml_xsl_sample_with_params
+    config = {"params": [{"xslt": str(xsl_path), "params": {"param1": "served"}}]}
+
+    with PipelineServer(load_pipelines(config), max_concurrency=2) as server:
+        assert isinstance(server.address, tuple)
+        _, port = server.address
+        client = PipelineClient(port=port)
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(lambda _: client.transform("params", [xml]), range(8)))
+        stats = client.stats()["params"]
+
+    assert all("<root>served</root>" in result for [result] in results)
+    assert (stats.requests, stats.documents, stats.errors) == (8, 8, 0)
+    assert (stats.in_flight, stats.queued) == (0, 0)
+    assert stats.latency_max >= stats.latency_p50 > 0
+
+
+def test_server_reports_errors(xml_xsl_sample: tuple[str, str, Path]) -> None:
+    """Test that unknown pipelines and failing documents are answered with errors."""
+    _, xslt, _ = xml_xsl_sample
+
+    with PipelineServer({"identity": [xsl.XSL(xslt=xslt)]}) as server:
+        assert isinstance(server.address, tuple)
+        _, port = server.address
+        client = PipelineClient(port=port)
+
+        with pytest.raises(ServerError, match="Unknown pipeline") as unknown:
+            client.transform("missing", "<foo/>")
+        with pytest.raises(ServerError) as failing:
+            client.transform("identity", "<not-xml")
+
+        assert unknown.value.status == 404  # noqa: PLR2004
+        assert failing.value.status == 422  # noqa: PLR2004
+        assert server.stats()["identity"].errors == 1
+
+
+class DuplicatingFakeStep:
+    """A fake step, which produces every value twice."""
+
+    def __init__(self) -> None:
+        """Initialize the step."""
+        self._name = "duplicating_fake_step"
+
+    def __call__(self, values: Iterable[str]) -> Iterable[str]:
+        """Process values with the step."""
+        return [result for value in values for result in (value, value)]
+
+    @property
+    def name(self) -> str:
+        """The name of the step."""
+        return self._name
+
+
+def test_server_rejects_several_results_for_one_document() -> None:
+    """Test that a single document must produce a single result, while batches take any number."""
+    with PipelineServer({"twice": [DuplicatingFakeStep()]}) as server:
+        assert isinstance(server.address, tuple)
+        client = PipelineClient(port=server.address[1])
+
+        with pytest.raises(ServerError, match="produced 2 results") as several:
+            client.transform("twice", "<a/>")
+
+        assert several.value.status == 422  # noqa: PLR2004
+        assert client.transform("twice", ["<a/>"]) == ["<a/>", "<a/>"]
+
+
+def test_server_sends_encoded_results(xml_xsl_sample: tuple[str, str, Path]) -> None:
+    """Test that results encoded by a step are sent in their encoding and decoded in batches."""
+    _, xslt, _ = xml_xsl_sample
+    document = "<?xml version='1.0' encoding='UTF-8'?><foo>grün</foo>"
+
+    with PipelineServer({"latin": [xsl.XSL(xslt=xslt, output_encoding="iso-8859-1")]}) as server:
+        assert isinstance(server.address, tuple)
+        client = PipelineClient(port=server.address[1])
+
+        single = client.transform("latin", document)
+        [batched] = client.transform("latin", [document])
+
+    assert "<foo>grün</foo>" in single
+    assert single == batched
+
+
+def test_server_decodes_encoded_documents(xml_xsl_sample: tuple[str, str, Path]) -> None:
+    """Test that encoded documents are decoded in the encoding they declare."""
+    _, xslt, _ = xml_xsl_sample
+    document = "<?xml version='1.0' encoding='ISO-8859-1'?><foo>grün</foo>".encode("latin-1")
+
+    with PipelineServer({"identity": [xsl.XSL(xslt=xslt)]}) as server:
+        assert isinstance(server.address, tuple)
+        client = PipelineClient(port=server.address[1])
+
+        single = client.transform("identity", document)
+        [batched] = client.transform("identity", [memoryview(document)])
+
+    assert "<foo>grün</foo>" in single
+    assert single == batched
+
+
+def test_server_keeps_files_at_the_socket_path(tmp_path: Path) -> None:
+    """Test that a file at the socket path is not replaced by the socket."""
+    path = tmp_path / "server.sock"
+    path.write_text("data")
+
+    with pytest.raises(FileExistsError):
+        PipelineServer({}, socket_path=path)
+
+    assert path.read_text() == "data"
+
+
+def test_load_pipelines_converts_params(tmp_path: Path) -> None:
+    """Test that configured params become XSL params of the matching type."""
+    config = json.loads('{"p": [{"xslt": "a.xsl", "params": {"a": 1, "b": [1], "c": {"d": 2}}}]}')
+
+    [step] = load_pipelines(config)["p"]
+
+    assert isinstance(step, xsl.XSL)
+    assert [type(param).__name__ for param in step.proc_params] == [  # type: ignore
+        "XSLAtomicParam",
+        "XSLArrayParam",
+        "XSLMapParam",
+    ]
@@ -0,0 +1,106 @@
+"""Test memory-budgeted spilling of intermediate results."""
+
+from collections.abc import Iterable
+from pathlib import Path
+
+import pytest
+
+from py_ductus.common.document import Document
+from py_ductus.main import process
+from py_ductus.spill import MemoryBudget
+from py_ductus.steps import xsl
+from py_ductus.steps.protocol import Step
+from tests.conftest import ValidFakeStep
+
+VALUES = 100
+LIMIT = 2_000
+
+
+class SuffixFakeStep:
+    """A fake step, which appends a suffix to every value."""
+
+    def __init__(self, suffix: str) -> None:
+        """Initialize the step."""
+        self._name = f"suffix_fake_step({suffix})"
+        self.suffix = suffix
+
+    def __call__(self, values: Iterable[str]) -> Iterable[str]:
+        """Process values with the step."""
+        return [f"{value}{self.suffix}" for value in values]
+
+    @property
+    def name(self) -> str:
+        """The name of the step."""
+        return self._name
+
+
+def test_buffer_spills_over_budget(tmp_path: Path) -> None:
+    """Test that a buffer spills to disk and reads its values back in order."""
+    budget = MemoryBudget(LIMIT, directory=tmp_path)
+    values = [f"value {index} " * 10 for index in range(VALUES)]
+
+    buffer = budget.buffer(values)
+
+    assert len(buffer) == VALUES
+    assert budget.spills > 0
+    assert 0 < budget.spilled_items <= VALUES
+    assert 0 < budget.compressed_bytes < budget.spilled_bytes
+    assert budget.peak <= LIMIT + max(len(value) for value in values) * 2
+    assert list(buffer) == values
+    assert budget.held == 0
+
+
+def test_buffer_within_budget() -> None:
+    """Test that a buffer within the budget does not spill."""
+    budget = MemoryBudget(10_000_000)
+
+    assert list(budget.buffer(["a", "b"])) == ["a", "b"]
+    assert budget.spills == 0
+    assert budget.peak > 0
+    assert budget.held == 0
+
+
+def test_buffer_spills_documents() -> None:
+    """Test that documents keep their metadata through a spill."""
+    budget = MemoryBudget(0)
+    documents = [Document(text="<a/>", metadata={"index": index}) for index in range(3)]
+
+    restored = list(budget.buffer(documents))
+
+    assert budget.spilled_items == len(documents)
+    assert [document.text for document in restored] == ["<a/>"] * 3
+    assert [document.metadata["index"] for document in restored] == [0, 1, 2]
+
+
+def test_process_with_memory_budget() -> None:
+    """Test that a budgeted batch run returns the same results as a plain run."""
+    budget = MemoryBudget(LIMIT)
+    values = [f"value {index} " * 10 for index in range(VALUES)]
+    steps: list[Step] = [SuffixFakeStep("!"), ValidFakeStep(), SuffixFakeStep("?")]
+
+    results = process(values, steps=steps, memory_budget=budget)
+
+    assert results == process(values, steps=steps)
+    assert budget.spills > 0
+    assert budget.held == 0
+
+
+def test_process_with_memory_budget_and_xsl(xml_xsl_sample: tuple[str, str, Path]) -> None:
+    """Test that XSL steps read spilled values."""
+    xml, _, xsl_path = xml_xsl_sample
+    budget = MemoryBudget(0)
+
+    steps: list[Step] = [xsl.XSL(xsl_path), ValidFakeStep(), xsl.XSL(xsl_path)]
+
+    results = process([xml] * 3, steps=steps, memory_budget=budget)
+
+    assert results == process([xml] * 3, steps=steps)
+    assert budget.spilled_items > 0
+
+
+def test_memory_budget_requires_batch_mode() -> None:
+    """Test that memory budgets are rejected for streaming runs."""
+    with pytest.raises(ValueError, match="batch"):
+        process(["a"], steps=[ValidFakeStep()], stream=True, memory_budget=MemoryBudget(1))
+    with pytest.raises(ValueError, match="negative"):
+        MemoryBudget(-1)
@@ -0,0 +1,98 @@
+"""Test the staged.py file."""
+
+import gc
+import itertools
+import threading
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+import pytest
+
+from py_ductus.main import process
+from py_ductus.staged import StagedRun
+from py_ductus.steps import xsl
+from py_ductus.steps.error import StepError
+from py_ductus.steps.protocol import Step
+from tests.conftest import RaisingFakeStep, ValidFakeStep
+
+
+def test_staged_process_keeps_results_in_order(xml_xsl_sample_with_params: tuple[str, str, Path]):
+    """Test that staged execution gives the same results as sequential execution."""
+    xml, xslt, _ = xml_xsl_sample_with_params
+    values = [xml.replace("bar", f"bar{index}") for index in range(20)]
+    steps: list[Step] = [
+        xsl.XSL(xslt=xslt, params=xsl.XSLAtomicParam(name="param1", value="staged")),
+        ValidFakeStep(),
+    ]
+
+    assert process(values, steps=steps, staged=True, queue_size=2) == process(values, steps=steps)
+
+
+def test_stages_overlap():
+    """Test that a stage processes a value while its predecessor is still running."""
+    received = threading.Event()
+
+    def first(values: Iterable[int]) -> Iterator[int]:
+        for value in values:
+            yield value
+            # Blocks until the next stage received the value, which needs a concurrent stage
+            assert received.wait(timeout=5)
+
+    def second(values: Iterable[int]) -> Iterator[int]:
+        for value in values:
+            received.set()
+            yield value * 2
+
+    run = StagedRun([1, 2, 3], stages=[("first", first), ("second", second)], queue_size=1)
+
+    assert list(run) == [2, 4, 6]
+
+
+def test_staged_run_applies_backpressure():
+    """Test that a fast producer is bounded by the queue sizes."""
+    consumed = itertools.count()
+
+    def values() -> Iterator[int]:
+        while True:
+            yield next(consumed)
+
+    run = StagedRun(values(), stages=[("identity", lambda values: values)], queue_size=2)
+    assert [next(run) for _ in range(3)] == [0, 1, 2]
+    run.close()
+
+    # Three consumed values, two queues of two and one value held by each thread
+    assert next(consumed) <= 3 + 2 * 2 + 2
+    assert [stats.step for stats in run.stages] == ["identity", "output"]
+    assert all(stats.max_depth <= stats.capacity for stats in run.stages)
+
+
+def test_dropped_staged_run_stops_its_threads():
+    """Test that the threads of a run are stopped when the run is dropped without close()."""
+    running = set(threading.enumerate())
+    run = StagedRun(itertools.count(), stages=[("identity", lambda values: values)], queue_size=2)
+    threads = set(threading.enumerate()) - running
+    assert next(run) == 0
+
+    del run
+    gc.collect()
+
+    for thread in threads:
+        thread.join(timeout=5)
+    assert not any(thread.is_alive() for thread in threads)
+
+
+def test_staged_run_raises_stage_errors():
+    """Test that the error of a stage is raised to the caller."""
+    with pytest.raises(StepError):
+        process(["foo", "bar"], steps=[ValidFakeStep(), RaisingFakeStep()], staged=True)
+
+
+def test_staged_process_exposes_queue_depths(xml_xsl_sample: tuple[str, str, Path]):
+    """Test that streaming staged execution returns the queue states."""
+    xml, xslt, _ = xml_xsl_sample
+
+    run = process([xml] * 5, steps=[xsl.XSL(xslt=xslt)], staged=True, stream=True)
+
+    assert isinstance(run, StagedRun)
+    assert list(run) == [xml] * 5
+    assert [(stats.step, stats.items) for stats in run.stages] == [("xsl", 5), ("output", 5)]
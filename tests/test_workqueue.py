@@ -0,0 +1,172 @@
+"""Test the durable work queue."""
+
+from collections.abc import Iterable
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+from py_ductus.steps import xsl
+from py_ductus.steps.xpath import XPath
+from py_ductus.workqueue import WorkQueue, run_worker, run_workers
+from tests.conftest import SelectiveFailingFakeStep, ValidFakeStep
+
+
+class CountingFakeStep:
+    """A fake step, which counts the values it processes."""
+
+    def __init__(self, fail_after: int | None = None) -> None:
+        """Initialize the step."""
+        self._name = "counting_fake_step"
+        self.seen: list[str] = []
+        self.fail_after = fail_after
+
+    def __call__(self, values: Iterable[str]) -> Iterable[str]:
+        """Process values with the step."""
+        values = list(values)
+        if self.fail_after is not None and len(self.seen) + len(values) > self.fail_after:
+            raise KeyboardInterrupt
+        self.seen.extend(values)
+        return [f"{value}!" for value in values]
+
+    @property
+    def name(self) -> str:
+        """The name of the step."""
+        return self._name
+
+
+def test_worker_completes_all_items(tmp_path: Path) -> None:
+    """Test that results are stored in the order the values were added."""
+    with WorkQueue(tmp_path / "queue.db") as queue:
+        assert queue.add(["a", "b", "c"], key=str) == len("abc")
+        assert queue.add(["a", "d"], key=str) == 1
+
+        assert run_worker(queue, [CountingFakeStep()], batch_size=2) == len("abcd")
+        assert list(queue.results()) == ["a!", "b!", "c!", "d!"]
+        assert queue.counts()["done"] == len("abcd")
+
+
+def test_interrupted_run_resumes_after_checkpoint(tmp_path: Path) -> None:
+    """Test that a resumed run does not redo finished items or finished steps."""
+    path = tmp_path / "queue.db"
+    with WorkQueue(path, lease_seconds=0) as queue:
+        queue.add(["a", "b", "c", "d"])
+        first, crashing = CountingFakeStep(), CountingFakeStep(fail_after=2)
+        with pytest.raises(KeyboardInterrupt):
+            run_worker(queue, [first, crashing], batch_size=2)
+
+    with WorkQueue(path) as queue:
+        first, second = CountingFakeStep(), CountingFakeStep()
+        run_worker(queue, [first, second], batch_size=2)
+
+        assert first.seen == []
+        assert second.seen == ["c!", "d!"]
+        assert list(queue.results()) == ["a!!", "b!!", "c!!", "d!!"]
+
+
+class ObjectFakeStep:
+    """A fake step, which returns objects for values starting with "o"."""
+
+    def __init__(self) -> None:
+        """Initialize the step."""
+        self._name = "object_fake_step"
+
+    def __call__(self, values: Iterable[str]) -> Iterable[object]:
+        """Process values with the step."""
+        return [object() if value.startswith("o") else value for value in values]
+
+    @property
+    def name(self) -> str:
+        """The name of the step."""
+        return self._name
+
+
+def test_failing_items_are_retried_and_marked_failed(tmp_path: Path) -> None:
+    """Test that only failing items count attempts and end up failed."""
+    with WorkQueue(tmp_path / "queue.db") as queue:
+        queue.add(["a", "fail", "b"])
+
+        completed = run_worker(queue, [SelectiveFailingFakeStep()], max_attempts=2)
+
+        assert completed == len(["a", "b"])
+        assert list(queue.results()) == ["main:a", "main:b"]
+        assert queue.counts()["failed"] == 1
+        [error] = queue.errors().values()
+        assert error == "ValueError: fail"
+
+        assert queue.retry_failed() == 1
+        assert queue.counts()["pending"] == 1
+
+
+def test_leases_of_other_workers_are_respected(tmp_path: Path) -> None:
+    """Test that leased items are not leased twice and late commits are ignored."""
+    path = tmp_path / "queue.db"
+    with WorkQueue(path, lease_seconds=60) as first, WorkQueue(path, lease_seconds=60) as second:
+        first.add(["a", "b"])
+        [item, _] = first.lease(batch_size=2)
+
+        assert second.lease(batch_size=2) == []
+        assert second.complete(1, {item.id: "stolen"}) == 0
+        assert first.complete(1, {item.id: "a!"}) == 1
+
+
+def test_run_workers_in_processes(tmp_path: Path, xml_xsl_sample: tuple[str, str, Path]) -> None:
+    """Test that several worker processes share one queue."""
+    xml, xslt, _ = xml_xsl_sample
+    path = tmp_path / "queue.db"
+    with WorkQueue(path) as queue:
+        queue.add([xml] * 10)
+
+    completed = run_workers(path, [xsl.XSL(xslt=xslt), ValidFakeStep()], workers=2, batch_size=3)
+
+    with WorkQueue(path) as queue:
+        assert completed == len(list(queue.results())) == queue.counts()["done"]
+        assert set(queue.results()) == {xml}
+
+
+LATIN_OUTPUT_XSLT = """<xsl:stylesheet version="3.0" xmlns:xsl="http://www.w3.org/1999/XSL/Transform">
+    <xsl:output encoding="ISO-8859-1"/>
+    <xsl:template match="/"><b><xsl:value-of select="."/></b></xsl:template>
+</xsl:stylesheet>"""
+
+
+def test_bytes_values_and_results_are_stored(tmp_path: Path) -> None:
+    """Test that bytes-like values and encoded results are stored as bytes."""
+    step = xsl.XSL(xslt=LATIN_OUTPUT_XSLT, output_encoding="ISO-8859-1")
+    with WorkQueue(tmp_path / "queue.db") as queue:
+        queue.add([b"<a>x</a>", memoryview("<a>é</a>".encode())])
+
+        items = queue.lease(2)
+        assert [item.value for item in items] == [b"<a>x</a>", "<a>é</a>".encode()]
+        queue.release(items)
+
+        assert run_worker(queue, [step]) == 2  # noqa: PLR2004
+        assert list(queue.results()) == [
+            b'<?xml version="1.0" encoding="ISO-8859-1"?><b>x</b>',
+            '<?xml version="1.0" encoding="ISO-8859-1"?><b>é</b>'.encode("latin-1"),
+        ]
+
+
+def test_xpath_results_and_paths_are_stored(tmp_path: Path) -> None:
+    """Test that decimals of XPath results and paths pass through the queue."""
+    with WorkQueue(tmp_path / "queue.db") as queue:
+        queue.add(["<a>1.5</a>", "<a>2</a>"])
+
+        assert run_worker(queue, [XPath("xs:decimal(/a)", first=True)]) == 2  # noqa: PLR2004
+        assert list(queue.results()) == [Decimal("1.5"), Decimal("2")]
+
+    with WorkQueue(tmp_path / "paths.db") as queue:
+        queue.add([Path("in/a.xml")])
+
+        assert [item.value for item in queue.lease(1)] == [Path("in/a.xml")]
+
+
+def test_results_which_can_not_be_stored_fail_their_item(tmp_path: Path) -> None:
+    """Test that an unstorable result fails its item, but not the worker."""
+    with WorkQueue(tmp_path / "queue.db") as queue:
+        queue.add(["a", "object", "b"])
+
+        assert run_worker(queue, [ObjectFakeStep(), ValidFakeStep()], max_attempts=1) == 2  # noqa: PLR2004
+        assert list(queue.results()) == ["a", "b"]
+        [error] = queue.errors().values()
+        assert "can not be encoded" in error